@@ -16,12 +16,15 @@ INGESTION_URL = "http://ingestion-service.ml-services.svc.cluster.local:8002"
 FEATURE_URL = "http://feature-service.ml-services.svc.cluster.local:8001"
 
 MODEL_SERVICES = [
-    {"name": "Linear", "url": "http://model-linear.ml-services.svc.cluster.local:8010"},
-    {"name": "Bagging", "url": "http://model-bagging.ml-services.svc.cluster.local:8011"},
-    {"name": "KNN", "url": "http://model-knn.ml-services.svc.cluster.local:8012"},
-    {"name": "AMFR", "url": "http://model-amfr.ml-services.svc.cluster.local:8013"}
+    {"name": "Linear", "model": "linear_regression", "url": "http://model-linear.ml-services.svc.cluster.local:8010"},
+    {"name": "Bagging", "model": "bagging_regressor", "url": "http://model-bagging.ml-services.svc.cluster.local:8011"},
+    {"name": "KNN", "model": "knn_regressor", "url": "http://model-knn.ml-services.svc.cluster.local:8012"},
+    {"name": "AMFR", "model": "amf_regressor", "url": "http://model-amfr.ml-services.svc.cluster.local:8013"}
 ]
 
+# Optional model service hosting all models (MODEL_NAMES set): one call per observation instead of eight
+MULTI_MODEL_URL = os.getenv("MULTI_MODEL_URL", "")
+
 def log(message):
     """Log with timestamp and flush immediately"""
     print(f"{datetime.datetime.now()}: {message}", flush=True)
@@ -62,6 +65,40 @@ async def call_model_service(session, model_info, features, target):
             "duration": model_duration
         }
 
+async def call_multi_model_service(session, features, target):
+    """Call a multi-model service once; predictions and metrics for every model come back together"""
+    model_start = datetime.datetime.now()
+    try:
+        async with session.post(
+            f"{MULTI_MODEL_URL}/predict_learn",
+            json={"features": features, "target": target},
+            timeout=10
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+        error = None
+    except Exception as e:
+        result, error = {}, str(e)
+    
+    model_duration = (datetime.datetime.now() - model_start).total_seconds()
+    model_results = []
+    for model_info in MODEL_SERVICES:
+        name = model_info["model"]
+        if name in result.get("predictions", {}):
+            model_results.append({
+                "model": model_info["name"],
+                "prediction": result["predictions"][name],
+                "metrics": result["metrics"].get(name, {}),
+                "duration": model_duration
+            })
+        else:
+            model_results.append({
+                "model": model_info["name"],
+                "error": error or result.get("errors", {}).get(name, "model not hosted"),
+                "duration": model_duration
+            })
+    return model_results
+
 async def main():
     start_time = datetime.datetime.now()
     
@@ -85,12 +122,15 @@ async def main():
                 response.raise_for_status()
                 feature_result = await response.json()
             
-            # Step 3: Call all 4 models in parallel
-            tasks = [
-                call_model_service(session, model_info, feature_result['features'], feature_result['target'])
-                for model_info in MODEL_SERVICES
-            ]
-            model_results = await asyncio.gather(*tasks)
+            # Step 3: Call all 4 models in parallel (or once, if they share a multi-model service)
+            if MULTI_MODEL_URL:
+                model_results = await call_multi_model_service(session, feature_result['features'], feature_result['target'])
+            else:
+                tasks = [
+                    call_model_service(session, model_info, feature_result['features'], feature_result['target'])
+                    for model_info in MODEL_SERVICES
+                ]
+                model_results = await asyncio.gather(*tasks)
         
         # All HTTP calls complete - now log everything
         end_time = datetime.datetime.now()
@@ -135,18 +175,29 @@ async def main():
         log("\n=== TESTING PREDICT_MANY ENDPOINT ===")
         try:
             async with aiohttp.ClientSession() as test_session:
-                for model_info in MODEL_SERVICES:
+                if MULTI_MODEL_URL:
                     async with test_session.post(
-                        f"{model_info['url']}/predict_many",
+                        f"{MULTI_MODEL_URL}/predict_many",
                         json={"features": feature_result['features']},
                         timeout=15
                     ) as response:
                         response.raise_for_status()
-                        forecast_result = await response.json()
-                    
-                    log(f"PREDICT_MANY SUCCESS: {model_info['name']} model 5-step forecast:")
-                    for step_data in forecast_result['forecast']:
-                        log(f"  Step {step_data['step']}: {step_data['value']}")
+                        forecasts = (await response.json())["forecasts"]
+                else:
+                    forecasts = {}
+                    for model_info in MODEL_SERVICES:
+                        async with test_session.post(
+                            f"{model_info['url']}/predict_many",
+                            json={"features": feature_result['features']},
+                            timeout=15
+                        ) as response:
+                            response.raise_for_status()
+                            forecasts[model_info['model']] = (await response.json())['forecast']
+            
+            for model_info in MODEL_SERVICES:
+                log(f"PREDICT_MANY SUCCESS: {model_info['name']} model 5-step forecast:")
+                for step_data in forecasts.get(model_info['model'], []):
+                    log(f"  Step {step_data['step']}: {step_data['value']}")
             
             log("=== PREDICT_MANY TEST COMPLETE ===")
             
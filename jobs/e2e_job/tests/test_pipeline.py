@@ -4,6 +4,7 @@ Simple tests for E2E pipeline job.
 Tests basic functionality without complex async mocking.
 """
 
+import asyncio
 import pytest
 import sys
 import os
@@ -11,6 +12,7 @@ import os
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import pipeline
 from pipeline import log
 
 class TestPipelineSimple:
@@ -31,5 +33,68 @@ class TestPipelineSimple:
         import datetime
         assert True  # If we get here, imports worked
 
+class FakeResponse:
+    """Stands in for an aiohttp response used as an async context manager"""
+    
+    def __init__(self, payload):
+        self.payload = payload
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    def raise_for_status(self):
+        pass
+    
+    async def json(self):
+        return self.payload
+
+class FakeSession:
+    """Records posted URLs and replies with a fixed payload, or raises if given an exception"""
+    
+    def __init__(self, reply):
+        self.reply = reply
+        self.posts = []
+    
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return FakeResponse(self.reply)
+
+class TestMultiModelService:
+    """call_multi_model_service against a fake multi-model service"""
+    
+    def test_results_per_model(self, monkeypatch):
+        """Test one call yields a result or error for every configured model"""
+        monkeypatch.setattr(pipeline, "MULTI_MODEL_URL", "http://model-multi:8010")
+        session = FakeSession({
+            "predictions": {"linear_regression": 1.5, "knn_regressor": 2.5},
+            "metrics": {"linear_regression": {"count": 1}, "knn_regressor": {"count": 1}},
+            "errors": {"bagging_regressor": "boom"}
+        })
+        
+        results = asyncio.run(pipeline.call_multi_model_service(session, {"in_1": 1.0}, 2.0))
+        
+        assert session.posts == [("http://model-multi:8010/predict_learn", {"features": {"in_1": 1.0}, "target": 2.0})]
+        by_name = {result["model"]: result for result in results}
+        assert list(by_name) == ["Linear", "Bagging", "KNN", "AMFR"]
+        assert by_name["Linear"]["prediction"] == 1.5
+        assert by_name["KNN"]["metrics"] == {"count": 1}
+        assert by_name["Bagging"]["error"] == "boom"
+        assert by_name["AMFR"]["error"] == "model not hosted"
+    
+    def test_request_failure_reported_for_every_model(self, monkeypatch):
+        """Test a failed call marks every model with the request error"""
+        monkeypatch.setattr(pipeline, "MULTI_MODEL_URL", "http://model-multi:8010")
+        session = FakeSession(ConnectionError("unreachable"))
+        
+        results = asyncio.run(pipeline.call_multi_model_service(session, {"in_1": 1.0}, 2.0))
+        
+        assert [result["error"] for result in results] == ["unreachable"] * 4
+        assert all("prediction" not in result for result in results)
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
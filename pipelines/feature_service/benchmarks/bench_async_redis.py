@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: blocking vs asyncio Redis clients inside async handlers.
+Runs LagFeatureManager against a local Redis stand-in (a minimal RESP server
+emulating the feature scripts) that adds a fixed delay to every reply, then
+fires concurrent add_and_extract calls on one event loop. The blocking client
+serializes them; the asyncio client overlaps their round trips up to
+REDIS_MAX_CONNECTIONS.
+
+Usage: python benchmarks/bench_async_redis.py
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feature_manager
+
+LATENCY = 0.002  # Injected per-reply delay, in seconds
+CONCURRENCY = (1, 10, 50)
+REQUESTS = 500
+SERIES = 100
+
+class RedisStandIn:
+    """Just enough RESP to serve PING, SCRIPT LOAD, EVALSHA and EVAL of the feature scripts"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.lists = {}
+        self.scripts = {}
+        self.handlers = {
+            feature_manager.ADD_AND_EXTRACT_SCRIPT: self._add_and_extract,
+            feature_manager.ADD_AND_EXTRACT_MANY_SCRIPT: self._add_and_extract_many
+        }
+
+    def start(self):
+        """Serve on a background thread's loop; returns the bound port"""
+        ready = threading.Event()
+        port = []
+
+        async def serve():
+            server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+            port.append(server.sockets[0].getsockname()[1])
+            ready.set()
+            await server.serve_forever()
+
+        threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+        ready.wait()
+        return port[0]
+
+    def _push(self, key, value, max_lags):
+        values = self.lists.setdefault(key, [])
+        lags = values[:max_lags]
+        values.insert(0, value)
+        del values[max_lags:]
+        return [lags, min(len(lags) + 1, max_lags)]
+
+    def _add_and_extract(self, keys, args):
+        return self._push(keys[0], args[0], int(args[1]))
+
+    def _add_and_extract_many(self, keys, args):
+        return [self._push(key, value, int(args[0])) for key, value in zip(keys, args[1:])]
+
+    def _execute(self, command):
+        name = command[0].upper()
+        if name == "PING":
+            return "+PONG"
+        if name == "SCRIPT" and command[1].upper() == "LOAD":
+            sha = hashlib.sha1(command[2].encode()).hexdigest()
+            self.scripts[sha] = command[2]
+            return sha
+        if name in ("EVALSHA", "EVAL"):
+            script = self.scripts.get(command[1]) if name == "EVALSHA" else command[1]
+            if script not in self.handlers:
+                return "-NOSCRIPT No matching script"
+            n_keys = int(command[2])
+            return self.handlers[script](command[3:3 + n_keys], command[3 + n_keys:])
+        return "+OK"  # CLIENT SETINFO and other connection setup
+
+    def _encode(self, reply):
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if reply[:1] in ("+", "-"):
+            return reply.encode() + b"\r\n"
+        data = reply.encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = []
+                for _ in range(int(line[1:])):
+                    size = int((await reader.readline())[1:])
+                    command.append((await reader.readexactly(size + 2))[:-2].decode())
+                await asyncio.sleep(self.latency)
+                writer.write(self._encode(self._execute(command)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def run(label, call, concurrency):
+    """Issue REQUESTS calls as waves of `concurrency` simultaneous requests"""
+    start = time.perf_counter()
+    for wave in range(0, REQUESTS, concurrency):
+        await asyncio.gather(*(call(f"series_{i % SERIES}", float(i)) for i in range(wave, min(wave + concurrency, REQUESTS))))
+    elapsed = time.perf_counter() - start
+    waves = -(-REQUESTS // concurrency)
+    print(f"  {label:<10} concurrency={concurrency:<3} {REQUESTS / elapsed:8.0f} req/s  "
+          f"slowest response per wave: {elapsed / waves * 1e3:6.1f}ms")
+    return REQUESTS / elapsed
+
+async def main():
+    feature_manager.REDIS_HOST, feature_manager.REDIS_PORT = "127.0.0.1", RedisStandIn(LATENCY).start()
+    manager = feature_manager.LagFeatureManager()
+    assert manager.use_redis, "stand-in not reachable"
+
+    async def blocking(series_id, value):
+        # What the handlers did before: a blocking call inside a coroutine
+        manager.add_and_extract(series_id, value)
+
+    # Open the pooled connections and load the script before timing
+    await asyncio.gather(*(manager.add_and_extract_async("warmup", 0.0) for _ in range(max(CONCURRENCY))))
+
+    print(f"{REQUESTS} add_and_extract calls, {LATENCY * 1e3:.0f}ms injected Redis latency")
+    for concurrency in CONCURRENCY:
+        baseline = await run("blocking", blocking, concurrency)
+        speedup = await run("asyncio", manager.add_and_extract_async, concurrency) / baseline
+        print(f"  -> asyncio speedup: {speedup:.1f}x")
+    await manager.async_client.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
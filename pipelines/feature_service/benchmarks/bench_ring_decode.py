@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: decoding one series' lag history per request.
+Compares the list storage reply (decimal strings parsed with float() per element)
+with the ring storage reply (one packed float64 blob decoded with numpy.frombuffer),
+and the bytes each reply carries, by N_LAGS.
+
+Usage: python benchmarks/bench_ring_decode.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from ring_buffer import decode_ring, encode_ring
+
+N_LAGS = (10, 100, 1_000)
+REPEATS = 2_000
+
+if __name__ == "__main__":
+    for n_lags in N_LAGS:
+        values = np.random.default_rng(0).normal(100, 10, size=n_lags).tolist()
+        list_reply = [repr(v).encode() for v in values]
+        ring_reply = encode_ring(values, n_lags)
+
+        list_time = timeit.timeit(lambda: [float(v) for v in list_reply], number=REPEATS) / REPEATS
+        ring_time = timeit.timeit(lambda: decode_ring(ring_reply).tolist(), number=REPEATS) / REPEATS
+        list_bytes = sum(len(v) for v in list_reply)
+        print(f"N_LAGS={n_lags:<5} list: {list_time * 1e6:8.1f}us {list_bytes:7d}B   "
+              f"ring: {ring_time * 1e6:8.1f}us {len(ring_reply):7d}B   speedup: {list_time / ring_time:5.1f}x")
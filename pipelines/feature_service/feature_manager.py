@@ -1,8 +1,13 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from collections import deque
 import logging
+import math
 import os
+import time
 import redis
+import redis.asyncio
+from near_cache import NEAR_CACHE_SIZE, NearCache
+from ring_buffer import RING_ADD_AND_EXTRACT_MANY_SCRIPT, RING_ADD_AND_EXTRACT_SCRIPT, decode_ring
 
 logger = logging.getLogger(__name__)
 
@@ -10,84 +15,424 @@ logger = logging.getLogger(__name__)
 N_LAGS = int(os.getenv('N_LAGS', '10'))
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis.ml-services.svc.cluster.local')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+# Async pool size; requests beyond it wait up to REDIS_POOL_TIMEOUT seconds for a free connection
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '1.0'))
+# Per-call connect/read timeout in seconds, so a stalled Redis fails fast into the memory fallback
+REDIS_TIMEOUT = float(os.getenv('REDIS_TIMEOUT', '0.5'))
+# Circuit breaker: seconds between reconnect probes while Redis is unreachable
+REDIS_RETRY_INTERVAL = float(os.getenv('REDIS_RETRY_INTERVAL', '5.0'))
+# Observations per add_and_extract_many call: one atomic script that blocks Redis for every client while it runs
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '1000'))
+# "list" keeps lags as series:{id}:values lists of decimal strings; "ring" as packed float64
+# series:{id}:ring ring buffers, migrating each series' list on first write
+LAG_STORAGE = os.getenv('LAG_STORAGE', 'list')
+
+LAG_STORAGES = ('list', 'ring')
+
+# Only an unreachable or stalled Redis opens the circuit; data errors (e.g. WRONGTYPE) fail just their request
+CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError, ConnectionError, TimeoutError)
+
+# Read the previous lags, push the new value and trim, atomically in one round trip.
+# KEYS[1] = series list, ARGV[1] = value, ARGV[2] = max_lags. Returns {previous lags, new length}.
+ADD_AND_EXTRACT_SCRIPT = """
+local max_lags = tonumber(ARGV[2])
+local lags = redis.call('LRANGE', KEYS[1], 0, max_lags - 1)
+redis.call('LPUSH', KEYS[1], ARGV[1])
+redis.call('LTRIM', KEYS[1], 0, max_lags - 1)
+return {lags, math.min(#lags + 1, max_lags)}
+"""
+
+# Batch form: KEYS[i] gets ARGV[i + 1], in order, so repeated series see their earlier items.
+# ARGV[1] = max_lags. Returns one {previous lags, new length} pair per key.
+ADD_AND_EXTRACT_MANY_SCRIPT = """
+local max_lags = tonumber(ARGV[1])
+local results = {}
+for i, key in ipairs(KEYS) do
+    local lags = redis.call('LRANGE', key, 0, max_lags - 1)
+    redis.call('LPUSH', key, ARGV[i + 1])
+    redis.call('LTRIM', key, 0, max_lags - 1)
+    results[i] = {lags, math.min(#lags + 1, max_lags)}
+end
+return results
+"""
 
 class LagFeatureManager:
     """Manages lag feature computation for time series data using Redis FIFO lists.
     
     Features are output as in_1 to in_{N_LAGS} format for model consumption.
+    
+    A failed Redis call opens a circuit breaker: observations go to in-memory buffers
+    and are kept as pending, and once every REDIS_RETRY_INTERVAL seconds a request
+    probes Redis. A successful probe replays the pending observations (the last
+    max_lags per series, which leaves the same list as replaying all of them) before
+    Redis is used again. A call that timed out after Redis applied it is replayed too,
+    so recovery is at-least-once for that observation.
     """
     
-    def __init__(self, max_lags: int = N_LAGS):
+    def __init__(self, max_lags: int = N_LAGS, near_cache_size: int = NEAR_CACHE_SIZE, storage: str = LAG_STORAGE):
+        if storage not in LAG_STORAGES:
+            raise ValueError(f"Unknown lag storage {storage}. Available: {list(LAG_STORAGES)}")
         self.max_lags = max_lags
+        self.storage = storage
+        # Compiled once: feature names in lag order (in_1 = most recent)
+        self.lag_keys = tuple(f"in_{i}" for i in range(1, max_lags + 1))
         self.series_buffers: Dict[str, deque] = {}  # Fallback for Redis unavailable
+        self.pending: Dict[str, deque] = {}  # Observations buffered in memory, not yet written to Redis
+        self.near_cache = NearCache(near_cache_size) if near_cache_size > 0 else None
+        self.redis_client = None
+        self.async_client = None
+        self.use_redis = False  # Circuit closed
+        self.next_probe = 0.0
+        self.circuit_opened = 0
+        self.replayed = 0
         
         # Try to connect to Redis
         try:
-            self.redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+            self._create_clients()
             self.redis_client.ping()
             self.use_redis = True
             logger.info(f"REDIS CONNECTED: Using Redis at {REDIS_HOST}:{REDIS_PORT} for persistent lag features")
         except Exception as e:
-            logger.warning(f"REDIS UNAVAILABLE: Using in-memory storage (data will be lost on restart): {e}")
-            self.redis_client = None
-            self.use_redis = False
+            logger.warning(f"REDIS UNAVAILABLE: Using in-memory storage until Redis recovers: {e}")
+            self.next_probe = time.monotonic() + REDIS_RETRY_INTERVAL
+    
+    def _create_clients(self) -> None:
+        """Create the Redis clients once; connections are opened on first use"""
+        if self.redis_client is not None:
+            return
+        # Ring blobs are binary, so only list storage decodes replies to str
+        decode_responses = self.storage == 'list'
+        if self.storage == 'ring':
+            script, many_script = RING_ADD_AND_EXTRACT_SCRIPT, RING_ADD_AND_EXTRACT_MANY_SCRIPT
+        else:
+            script, many_script = ADD_AND_EXTRACT_SCRIPT, ADD_AND_EXTRACT_MANY_SCRIPT
+        redis_client = redis.Redis(
+            host=REDIS_HOST, port=REDIS_PORT, decode_responses=decode_responses,
+            socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        )
+        # EVALSHA with a transparent EVAL fallback if the server lost the script
+        self.add_and_extract_script = redis_client.register_script(script)
+        self.add_and_extract_many_script = redis_client.register_script(many_script)
+        # Non-blocking client for the async handlers; connections are opened lazily on the serving loop
+        self.async_client = redis.asyncio.Redis(connection_pool=redis.asyncio.BlockingConnectionPool(
+            host=REDIS_HOST, port=REDIS_PORT, decode_responses=decode_responses,
+            max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        ))
+        self.add_and_extract_async_script = self.async_client.register_script(script)
+        self.add_and_extract_many_async_script = self.async_client.register_script(many_script)
+        self.redis_client = redis_client
+    
+    def _open_circuit(self, operation: str, error: Exception) -> None:
+        """Fall back to memory; the next reconnect probe is due after REDIS_RETRY_INTERVAL"""
+        if self.use_redis:
+            self.circuit_opened += 1
+        logger.error(f"REDIS ERROR in {operation}: Falling back to memory until Redis recovers: {error}")
+        self.use_redis = False
+        self.next_probe = time.monotonic() + REDIS_RETRY_INTERVAL
+    
+    def _probe_due(self) -> bool:
+        if self.use_redis or time.monotonic() < self.next_probe:
+            return False
+        # Claim the probe so concurrent requests keep using memory meanwhile
+        self.next_probe = time.monotonic() + REDIS_RETRY_INTERVAL
+        return True
+    
+    def _take_pending(self) -> Tuple[Dict[str, deque], List[str], list]:
+        """Detach whole series' pending observations, up to MAX_BATCH_SIZE, as batch script keys and args"""
+        pending, keys, values = {}, [], []
+        for series_id in list(self.pending):
+            buffer = self.pending[series_id]
+            if values and len(values) + len(buffer) > MAX_BATCH_SIZE:
+                break
+            pending[series_id] = self.pending.pop(series_id)
+            keys.extend(self._keys(series_id) * len(buffer))
+            values.extend(buffer)  # Oldest first
+        return pending, keys, [self.max_lags] + values
+    
+    def _restore_pending(self, pending: Dict[str, deque]) -> None:
+        """Put a failed replay back ahead of anything buffered since"""
+        for series_id, buffer in pending.items():
+            buffer.extend(self.pending.get(series_id, ()))
+            self.pending[series_id] = buffer
+    
+    def _close_circuit(self) -> None:
+        self.use_redis = True
+        # Redis now holds everything buffered; old memory lags must not seed a later outage
+        self.series_buffers.clear()
+        logger.info(f"REDIS RECONNECTED: Replayed buffered observations, {self.replayed} in total")
+    
+    def _maybe_reconnect(self) -> None:
+        """Probe Redis when the circuit is open and a probe is due; replay pending observations on success"""
+        if not self._probe_due():
+            return
+        try:
+            self._create_clients()
+            self.redis_client.ping()
+            while self.pending:
+                pending, keys, args = self._take_pending()
+                try:
+                    self.add_and_extract_many_script(keys=keys, args=args)
+                except redis.ResponseError as e:
+                    # Retrying cannot fix data Redis rejects; drop the batch instead of blocking recovery
+                    logger.error(f"REDIS REPLAY: Dropped {len(args) - 1} buffered observations: {e}")
+                    continue
+                except Exception:
+                    self._restore_pending(pending)
+                    raise
+                self.replayed += len(args) - 1  # args = [max_lags, values...]
+        except Exception as e:
+            logger.warning(f"REDIS PROBE FAILED: Retrying in {REDIS_RETRY_INTERVAL}s: {e}")
+            return
+        self._close_circuit()
+    
+    async def _maybe_reconnect_async(self) -> None:
+        """_maybe_reconnect that awaits Redis; requests arriving meanwhile are buffered and replayed too"""
+        if not self._probe_due():
+            return
+        try:
+            self._create_clients()
+            await self.async_client.ping()
+            while self.pending:
+                pending, keys, args = self._take_pending()
+                try:
+                    await self.add_and_extract_many_async_script(keys=keys, args=args)
+                except redis.ResponseError as e:
+                    # Retrying cannot fix data Redis rejects; drop the batch instead of blocking recovery
+                    logger.error(f"REDIS REPLAY: Dropped {len(args) - 1} buffered observations: {e}")
+                    continue
+                except Exception:
+                    self._restore_pending(pending)
+                    raise
+                self.replayed += len(args) - 1  # args = [max_lags, values...]
+        except Exception as e:
+            logger.warning(f"REDIS PROBE FAILED: Retrying in {REDIS_RETRY_INTERVAL}s: {e}")
+            return
+        # No await since the last pending check, so nothing can be buffered in between
+        self._close_circuit()
+    
+    def _memory_buffer(self, series_id: str) -> deque:
+        """In-memory buffer for a series, seeded from the near cache when Redis went down"""
+        buffer = self.series_buffers.get(series_id)
+        if buffer is None:
+            cached = self.near_cache.get(series_id, max_age=float("inf")) if self.near_cache is not None else None
+            buffer = self.series_buffers[series_id] = deque(reversed(cached or ()), maxlen=self.max_lags)
+        return buffer
     
     def add_observation(self, series_id: str, value: float) -> None:
         """Add new observation to series buffer."""
+        self._check_finite([value])
+        self._maybe_reconnect()
         if self.use_redis:
             try:
-                key = f"series:{series_id}:values"
-                # Add to front of list (most recent first)
-                self.redis_client.lpush(key, value)
-                # Keep only max_lags items
-                self.redis_client.ltrim(key, 0, self.max_lags - 1)
-                logger.info(f"REDIS: Added observation {value} to series {series_id} (persistent storage)")
+                # Same atomic push-and-trim as add_and_extract, so the near cache stays written through
+                lags, length = self.add_and_extract_script(keys=self._keys(series_id), args=[value, self.max_lags])
+                self._script_result(series_id, value, lags, length)
+                logger.debug(f"REDIS: Added observation {value} to series {series_id} (persistent storage)")
                 return
-            except Exception as e:
-                logger.error(f"REDIS ERROR: Falling back to in-memory storage: {e}")
-                self.use_redis = False
+            except CONNECTION_ERRORS as e:
+                self._open_circuit("add_observation", e)
         
-        # Fallback to in-memory storage
-        if series_id not in self.series_buffers:
-            self.series_buffers[series_id] = deque(maxlen=self.max_lags)
+        # Fallback to in-memory storage, remembered for replay once Redis is back
+        buffer = self._memory_buffer(series_id)
+        buffer.append(value)
+        if series_id not in self.pending:
+            self.pending[series_id] = deque(maxlen=self.max_lags)
+        self.pending[series_id].append(value)
+        if self.near_cache is not None:
+            self.near_cache.put(series_id, tuple(reversed(buffer)))
+        logger.debug(f"MEMORY: Added observation {value} to series {series_id} (temporary storage)")
+    
+    def add_and_extract(self, series_id: str, value: float) -> Tuple[Dict[str, float], int]:
+        """Extract lag features from previous observations and add the current value in one step.
+        
+        Returns (features, available_lags), where available_lags is the series length after adding.
+        """
+        self._check_finite([value])
+        self._maybe_reconnect()
+        if self.use_redis:
+            try:
+                lags, length = self.add_and_extract_script(
+                    keys=self._keys(series_id), args=[value, self.max_lags]
+                )
+                logger.debug(f"REDIS: Added observation {value} to series {series_id} (persistent storage)")
+                return self._script_result(series_id, value, lags, length)
+            except CONNECTION_ERRORS as e:
+                self._open_circuit("add_and_extract", e)
         
-        self.series_buffers[series_id].append(value)
-        logger.info(f"MEMORY: Added observation {value} to series {series_id} (temporary storage)")
+        # Fallback to in-memory storage (oldest first, so reverse for most recent first)
+        values = list(reversed(self._memory_buffer(series_id)))
+        self.add_observation(series_id, value)
+        return self._to_features(values), len(self.series_buffers[series_id])
     
-    def extract_features(self, series_id: str, current_value: float) -> Dict[str, float]:
-        """Extract lag features from previous observations, then add current value."""
-        features = {}
+    def add_and_extract_many(self, observations: List[Tuple[str, float]]) -> List[Tuple[Dict[str, float], int]]:
+        """Batch add_and_extract over (series_id, value) pairs, applied in order.
         
+        With Redis the whole batch is one atomic script call (one round trip), so it is
+        limited to MAX_BATCH_SIZE observations.
+        """
+        if not observations:
+            return []
+        self._check_batch(observations)
+        self._maybe_reconnect()
         if self.use_redis:
             try:
-                key = f"series:{series_id}:values"
-                # Get all values from Redis list (most recent first)
-                values = self.redis_client.lrange(key, 0, -1)
-                values = [float(v) for v in values]  # Convert to float
-                
-                # Fill features with lag values (in_1 = most recent, etc.)
-                for i in range(1, self.max_lags + 1):
-                    if len(values) >= i:
-                        features[f"in_{i}"] = values[i-1]  # Redis list is already newest first
-                    else:
-                        features[f"in_{i}"] = 0.0
-            except Exception as e:
-                logger.error(f"REDIS ERROR in extract_features: Falling back to memory: {e}")
-                self.use_redis = False
+                results = self.add_and_extract_many_script(
+                    keys=[key for series_id, _ in observations for key in self._keys(series_id)],
+                    args=[self.max_lags] + [value for _, value in observations]
+                )
+                logger.debug(f"REDIS: Added {len(observations)} observations (persistent storage)")
+                return [
+                    self._script_result(series_id, value, lags, length)
+                    for (series_id, value), (lags, length) in zip(observations, results)
+                ]
+            except CONNECTION_ERRORS as e:
+                self._open_circuit("add_and_extract_many", e)
         
-        if not self.use_redis:
-            # Fallback to in-memory storage
-            buffer = self.series_buffers.get(series_id, deque())
-            
-            # Fill features with lag values (in_1 = most recent previous, etc.)
-            for i in range(1, self.max_lags + 1):
-                if len(buffer) >= i:
-                    features[f"in_{i}"] = buffer[-i]
-                else:
-                    features[f"in_{i}"] = 0.0
+        return [self.add_and_extract(series_id, value) for series_id, value in observations]
+    
+    async def add_and_extract_async(self, series_id: str, value: float) -> Tuple[Dict[str, float], int]:
+        """add_and_extract that awaits Redis instead of blocking the event loop."""
+        self._check_finite([value])
+        await self._maybe_reconnect_async()
+        if self.use_redis:
+            try:
+                lags, length = await self.add_and_extract_async_script(
+                    keys=self._keys(series_id), args=[value, self.max_lags]
+                )
+                logger.debug(f"REDIS: Added observation {value} to series {series_id} (persistent storage)")
+                return self._script_result(series_id, value, lags, length)
+            except CONNECTION_ERRORS as e:
+                self._open_circuit("add_and_extract_async", e)
         
-        # Now add current observation to buffer for next time
-        self.add_observation(series_id, current_value)
+        # In-memory path does no I/O
+        return self.add_and_extract(series_id, value)
+    
+    async def add_and_extract_many_async(self, observations: List[Tuple[str, float]]) -> List[Tuple[Dict[str, float], int]]:
+        """add_and_extract_many that awaits Redis instead of blocking the event loop."""
+        if not observations:
+            return []
+        self._check_batch(observations)
+        await self._maybe_reconnect_async()
+        if self.use_redis:
+            try:
+                results = await self.add_and_extract_many_async_script(
+                    keys=[key for series_id, _ in observations for key in self._keys(series_id)],
+                    args=[self.max_lags] + [value for _, value in observations]
+                )
+                logger.debug(f"REDIS: Added {len(observations)} observations (persistent storage)")
+                return [
+                    self._script_result(series_id, value, lags, length)
+                    for (series_id, value), (lags, length) in zip(observations, results)
+                ]
+            except CONNECTION_ERRORS as e:
+                self._open_circuit("add_and_extract_many_async", e)
         
-        return features
+        return self.add_and_extract_many(observations)
+    
+    def get_lags(self, series_id: str) -> List[float]:
+        """Stored values, most recent first; served from the near cache while fresh."""
+        self._maybe_reconnect()
+        cached = self.near_cache.get(series_id) if self.near_cache is not None else None
+        if cached is not None:
+            return list(cached)
+        if self.use_redis:
+            try:
+                lags = self._read_lags(series_id)
+                if self.near_cache is not None:
+                    self.near_cache.put(series_id, tuple(lags))
+                return lags
+            except CONNECTION_ERRORS as e:
+                self._open_circuit("get_lags", e)
+        
+        return list(reversed(self.series_buffers.get(series_id, ())))
+    
+    async def get_lags_async(self, series_id: str) -> List[float]:
+        """get_lags that awaits Redis instead of blocking the event loop."""
+        await self._maybe_reconnect_async()
+        cached = self.near_cache.get(series_id) if self.near_cache is not None else None
+        if cached is not None:
+            return list(cached)
+        if self.use_redis:
+            try:
+                lags = await self._read_lags_async(series_id)
+                if self.near_cache is not None:
+                    self.near_cache.put(series_id, tuple(lags))
+                return lags
+            except CONNECTION_ERRORS as e:
+                self._open_circuit("get_lags_async", e)
+        
+        return list(reversed(self.series_buffers.get(series_id, ())))
+    
+    def extract_features(self, series_id: str, current_value: float) -> Dict[str, float]:
+        """Extract lag features from previous observations, then add current value."""
+        return self.add_and_extract(series_id, current_value)[0]
+    
+    def stats(self) -> Dict[str, float]:
+        """Storage backend state: circuit breaker, replay backlog and near cache"""
+        stats = {
+            "redis_connected": self.use_redis,
+            "redis_circuit_opened_total": self.circuit_opened,
+            "redis_replayed_total": self.replayed,
+            "pending_series": len(self.pending),
+            "pending_observations": sum(len(buffer) for buffer in self.pending.values())
+        }
+        if self.near_cache is not None:
+            stats.update(self.near_cache.stats())
+        return stats
+    
+    def _check_batch(self, observations: List[Tuple[str, float]]) -> None:
+        if len(observations) > MAX_BATCH_SIZE:
+            raise ValueError(f"Batch of {len(observations)} observations exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}")
+        self._check_finite([value for _, value in observations])
+
+    @staticmethod
+    def _check_finite(values: List[float]) -> None:
+        """Reject NaN/inf before they are stored; the scripts' tonumber() turns them into nil"""
+        for value in values:
+            if not math.isfinite(value):
+                raise ValueError(f"Observation values must be finite, got {value}")
+
+    def _keys(self, series_id: str) -> List[str]:
+        """Script keys for a series: the list, or the ring plus the list it migrates from"""
+        if self.storage == 'ring':
+            return [f"series:{series_id}:ring", f"series:{series_id}:values"]
+        return [f"series:{series_id}:values"]
+    
+    def _decode_lags(self, lags) -> List[float]:
+        """Most-recent-first floats from a script reply: a ring blob or list elements"""
+        if self.storage == 'ring':
+            return decode_ring(lags).tolist()
+        return [float(v) for v in lags]
+    
+    def _read_lags(self, series_id: str) -> List[float]:
+        keys = self._keys(series_id)
+        if self.storage == 'ring':
+            blob = self.redis_client.get(keys[0])
+            if blob is not None:
+                return decode_ring(blob)[:self.max_lags].tolist()  # Not yet resized if N_LAGS shrank
+        # List storage, or a series not yet migrated to a ring
+        return [float(v) for v in self.redis_client.lrange(keys[-1], 0, self.max_lags - 1)]
+    
+    async def _read_lags_async(self, series_id: str) -> List[float]:
+        keys = self._keys(series_id)
+        if self.storage == 'ring':
+            blob = await self.async_client.get(keys[0])
+            if blob is not None:
+                return decode_ring(blob)[:self.max_lags].tolist()  # Not yet resized if N_LAGS shrank
+        return [float(v) for v in await self.async_client.lrange(keys[-1], 0, self.max_lags - 1)]
+    
+    def _script_result(self, series_id: str, value: float, lags, length: int) -> Tuple[Dict[str, float], int]:
+        """Features from a script reply, writing the series' new state through to the near cache"""
+        lags = self._decode_lags(lags)
+        if self.near_cache is not None:
+            self.near_cache.put(series_id, tuple([value] + lags[:self.max_lags - 1]))
+        return self._to_features(lags), int(length)
     
+    def _to_features(self, values: List[float]) -> Dict[str, float]:
+        """Map most-recent-first lag values onto in_1..in_{max_lags}, zero-filling missing lags"""
+        values = values[:self.max_lags]
+        if len(values) < self.max_lags:
+            values = values + [0.0] * (self.max_lags - len(values))
+        return dict(zip(self.lag_keys, values))
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Hot series kept in process, write-through (0 disables the near cache)
+NEAR_CACHE_SIZE = int(os.getenv('NEAR_CACHE_SIZE', '0'))
+# Seconds a cached series is trusted for reads; bounds staleness from other replicas' writes
+NEAR_CACHE_TTL = float(os.getenv('NEAR_CACHE_TTL', '1.0'))
+
+class NearCache:
+    """LRU of recent lag values per series (most recent first), written through on every add.
+
+    Entries are replaced with the authoritative Redis result after each write, so
+    a series written only by this replica is always exact. Reads trust an entry
+    for ttl seconds, which bounds how long another replica's writes can go unseen.
+    """
+
+    def __init__(self, max_size: int = NEAR_CACHE_SIZE, ttl: float = NEAR_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[float, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, series_id: str, max_age: Optional[float] = None) -> Optional[Tuple[float, ...]]:
+        """Cached lags if written within max_age seconds (default: ttl), else None"""
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._entries.get(series_id)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                self._entries.move_to_end(series_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, series_id: str, lags: Tuple[float, ...]) -> None:
+        with self._lock:
+            self._entries[series_id] = (time.monotonic(), lags)
+            self._entries.move_to_end(series_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, series_id: str) -> None:
+        with self._lock:
+            self._entries.pop(series_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "near_cache_hits_total": self.hits,
+            "near_cache_misses_total": self.misses,
+            "near_cache_entries": len(self._entries)
+        }
@@ -0,0 +1,89 @@
+import struct
+from typing import List
+
+import numpy as np
+
+# Ring layout: <head uint32><count uint32> header, then max_lags little-endian float64 slots.
+# head is the slot the next value is written to, so the most recent value sits at head - 1.
+RING_HEADER = struct.Struct('<II')
+
+# Shared Lua helpers. ring_load returns the series' current blob: created from the legacy
+# series:{id}:values list (which is then deleted) on first use, and laid out again if max_lags changed.
+_RING_FUNCTIONS = """
+local function ring_build(key, lags, max_lags)
+    local n = math.min(#lags, max_lags)
+    local slots = {}
+    for i = 1, n do
+        slots[i] = struct.pack('<d', tonumber(lags[n - i + 1]))
+    end
+    local blob = struct.pack('<I4I4', n % max_lags, n) .. table.concat(slots)
+        .. string.rep(struct.pack('<d', 0), max_lags - n)
+    redis.call('SET', key, blob)
+    return blob
+end
+
+local function ring_lags(blob)
+    local head, count = struct.unpack('<I4I4', blob)
+    local capacity = (#blob - 8) / 8
+    local lags = {}
+    for i = 1, count do
+        lags[i] = struct.unpack('<d', blob, 9 + 8 * ((head - i) % capacity))
+    end
+    return lags
+end
+
+local function ring_load(key, list_key, max_lags)
+    local blob = redis.call('GET', key)
+    if not blob then
+        local lags = redis.call('LRANGE', list_key, 0, max_lags - 1)
+        redis.call('DEL', list_key)
+        return ring_build(key, lags, max_lags)
+    end
+    if #blob ~= 8 + 8 * max_lags then
+        return ring_build(key, ring_lags(blob), max_lags)
+    end
+    return blob
+end
+
+local function ring_add(key, list_key, value, max_lags)
+    local blob = ring_load(key, list_key, max_lags)
+    local head, count = struct.unpack('<I4I4', blob)
+    count = math.min(count + 1, max_lags)
+    redis.call('SETRANGE', key, 8 + 8 * head, struct.pack('<d', value))
+    redis.call('SETRANGE', key, 0, struct.pack('<I4I4', (head + 1) % max_lags, count))
+    return {blob, count}
+end
+"""
+
+# Ring form of ADD_AND_EXTRACT_SCRIPT: overwrite the oldest slot and the header in place.
+# KEYS[1] = ring, KEYS[2] = legacy list, ARGV[1] = value, ARGV[2] = max_lags.
+# Returns {blob before the add, new length}.
+RING_ADD_AND_EXTRACT_SCRIPT = _RING_FUNCTIONS + """
+return ring_add(KEYS[1], KEYS[2], tonumber(ARGV[1]), tonumber(ARGV[2]))
+"""
+
+# Batch form: KEYS holds (ring, legacy list) pairs, item i gets ARGV[i + 1]; ARGV[1] = max_lags.
+RING_ADD_AND_EXTRACT_MANY_SCRIPT = _RING_FUNCTIONS + """
+local max_lags = tonumber(ARGV[1])
+local results = {}
+for i = 1, #KEYS / 2 do
+    results[i] = ring_add(KEYS[2 * i - 1], KEYS[2 * i], tonumber(ARGV[i + 1]), max_lags)
+end
+return results
+"""
+
+def decode_ring(blob: bytes) -> np.ndarray:
+    """Stored values, most recent first; a zero-copy view of blob until the ring has wrapped"""
+    head, count = RING_HEADER.unpack_from(blob)
+    slots = np.frombuffer(blob, dtype='<f8', offset=RING_HEADER.size)
+    newest = slots[:head][::-1]
+    if count <= head:
+        return newest[:count]
+    return np.concatenate([newest, slots[head:][::-1][:count - head]])
+
+def encode_ring(lags: List[float], max_lags: int) -> bytes:
+    """Blob holding most-recent-first lags, laid out like the Lua ring_build"""
+    n = min(len(lags), max_lags)
+    slots = np.zeros(max_lags, dtype='<f8')
+    slots[:n] = lags[:n][::-1]
+    return RING_HEADER.pack(n % max_lags, n) + slots.tobytes()
@@ -1,14 +1,16 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import logging
 from feature_manager import LagFeatureManager
+from wire_format import WireFormatRoute, WireResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Feature Service", version="1.0.0")
+app = FastAPI(title="Feature Service", version="1.0.0", default_response_class=WireResponse)
+app.router.route_class = WireFormatRoute
 
 # Global feature manager - N_LAGS configured in deployment YAML
 feature_manager = LagFeatureManager()
@@ -23,6 +25,19 @@ class ExtractResponse(BaseModel):
     target: float
     available_lags: int
 
+class SeriesResponse(BaseModel):
+    series_id: str
+    length: int
+    latest_value: Optional[float]
+    available_lags: int
+
+class ExtractBatchRequest(BaseModel):
+    observations: List[ExtractRequest]
+
+class ExtractBatchResponse(BaseModel):
+    results: List[ExtractResponse]
+    count: int
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -34,19 +49,16 @@ async def get_info():
     return {
         "service": "feature_service",
         "max_lags": feature_manager.max_lags,
-        "output_format": f"model_ready_in_1_to_in_{feature_manager.max_lags}"
+        "output_format": f"model_ready_in_1_to_in_{feature_manager.max_lags}",
+        "storage": feature_manager.stats()
     }
 
 @app.post("/add", response_model=ExtractResponse)
 async def add_observation(request: ExtractRequest):
     """Extract lag features and return model-ready format with target."""
     try:
-        # Extract features in model-ready format (in_1 to in_{N_LAGS})
-        features = feature_manager.extract_features(request.series_id, request.value)
-        
-        # Get available lags count from in-memory buffer
-        buffer = feature_manager.series_buffers.get(request.series_id)
-        available_lags = min(len(buffer), feature_manager.max_lags) if buffer else 0
+        # Extract features in model-ready format (in_1 to in_{N_LAGS}) and store the value in one call
+        features, available_lags = await feature_manager.add_and_extract_async(request.series_id, request.value)
         
         return ExtractResponse(
             series_id=request.series_id,
@@ -54,7 +66,41 @@ async def add_observation(request: ExtractRequest):
             target=request.value,
             available_lags=available_lags
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error extracting features: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/add_batch", response_model=ExtractBatchResponse)
+async def add_batch(request: ExtractBatchRequest):
+    """Extract lag features for many observations across series, in request order."""
+    try:
+        observations = [(obs.series_id, obs.value) for obs in request.observations]
+        extracted = await feature_manager.add_and_extract_many_async(observations)
+        
+        results = [
+            ExtractResponse(series_id=series_id, features=features, target=value, available_lags=available_lags)
+            for (series_id, value), (features, available_lags) in zip(observations, extracted)
+        ]
+        return ExtractBatchResponse(results=results, count=len(results))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error extracting batch features: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/series/{series_id}", response_model=SeriesResponse)
+async def get_series(series_id: str):
+    """Get stored lag information for a series."""
+    try:
+        lags = await feature_manager.get_lags_async(series_id)
+        return SeriesResponse(
+            series_id=series_id,
+            length=len(lags),
+            latest_value=lags[0] if lags else None,
+            available_lags=len(lags)
+        )
+    except Exception as e:
+        logger.error(f"Error reading series: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
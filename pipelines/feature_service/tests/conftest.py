@@ -0,0 +1,37 @@
+import functools
+from unittest.mock import patch
+
+import pytest
+import feature_manager
+from feature_manager import LagFeatureManager
+
+@pytest.fixture(params=["fakeredis", "redis"])
+def scripted_manager(request):
+    """Factory for LagFeatureManagers whose Lua scripts really run.
+
+    Runs on fakeredis with Lua support, and on the Redis at REDIS_HOST:REDIS_PORT;
+    each backend is skipped when unavailable. Use series ids starting with
+    "lua-test-", whose keys are deleted afterwards.
+    """
+    managers = []
+
+    def create(**kwargs):
+        if request.param == "fakeredis":
+            fakeredis = pytest.importorskip("fakeredis")
+            pytest.importorskip("lupa")
+            if kwargs.get("storage") == "ring":
+                pytest.skip("fakeredis Lua has no struct library for the ring scripts")
+            with patch('redis.Redis', functools.partial(fakeredis.FakeRedis, server=fakeredis.FakeServer())):
+                manager = LagFeatureManager(**kwargs)
+        else:
+            manager = LagFeatureManager(**kwargs)
+            if not manager.use_redis:
+                pytest.skip(f"No Redis at {feature_manager.REDIS_HOST}:{feature_manager.REDIS_PORT}")
+        managers.append(manager)
+        return manager
+
+    yield create
+    for manager in managers:
+        keys = list(manager.redis_client.scan_iter("series:lua-test-*"))
+        if keys:
+            manager.redis_client.delete(*keys)
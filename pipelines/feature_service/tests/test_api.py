@@ -76,6 +76,23 @@ def test_invalid_payload():
     response = client.post("/add", json={"invalid": "data"})
     assert response.status_code == 422
 
+def test_non_finite_value_rejected():
+    """Test NaN and inf values are rejected before they reach storage"""
+    import msgpack
+
+    # JSON has no NaN literal, so only msgpack bodies can carry non-finite values
+    response = client.post("/add", content='{"series_id": "nan_test", "value": NaN}', headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    response = client.post("/add", content=msgpack.packb({"series_id": "nan_test", "value": float("nan")}), headers={
+        "Content-Type": "application/msgpack"
+    })
+    assert response.status_code == 400
+    response = client.post("/add_batch", content=msgpack.packb({"observations": [{"series_id": "nan_test", "value": float("inf")}]}), headers={
+        "Content-Type": "application/msgpack"
+    })
+    assert response.status_code == 400
+    assert client.get("/series/nan_test").json()["length"] == 0
+
 def test_negative_values():
     payload = {
         "series_id": "negative_test",
@@ -135,4 +152,82 @@ def test_feature_format_consistency():
     # Should have in_1 through in_10
     for i in range(1, 11):
         assert f"in_{i}" in features
-        assert isinstance(features[f"in_{i}"], (int, float))
\ No newline at end of file
+        assert isinstance(features[f"in_{i}"], (int, float))
+
+
+def test_add_observation_msgpack():
+    """Test /add accepts msgpack bodies and returns msgpack when requested"""
+    import msgpack
+    
+    response = client.post("/add", content=msgpack.packb({"series_id": "msgpack_test", "value": 42.0}), headers={
+        "Content-Type": "application/msgpack",
+        "Accept": "application/msgpack"
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    data = msgpack.unpackb(response.content)
+    assert data["target"] == 42.0
+    assert len(data["features"]) == 10
+
+def test_add_batch_preserves_series_order():
+    """Test /add_batch interleaves series and keeps each series in request order"""
+    payload = {"observations": [
+        {"series_id": "batch_a", "value": 1.0},
+        {"series_id": "batch_b", "value": 10.0},
+        {"series_id": "batch_a", "value": 2.0},
+        {"series_id": "batch_a", "value": 3.0},
+        {"series_id": "batch_b", "value": 20.0}
+    ]}
+    response = client.post("/add_batch", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 5
+    
+    results = data["results"]
+    assert [r["target"] for r in results] == [1.0, 10.0, 2.0, 3.0, 20.0]
+    assert results[3]["series_id"] == "batch_a"
+    assert results[3]["features"]["in_1"] == 2.0
+    assert results[3]["features"]["in_2"] == 1.0
+    assert results[3]["available_lags"] == 3
+    assert results[4]["features"]["in_1"] == 10.0
+    assert len(results[4]["features"]) == 10
+    
+    # Continues where the batch left off
+    data = client.post("/add", json={"series_id": "batch_a", "value": 4.0}).json()
+    assert data["features"]["in_1"] == 3.0
+
+def test_add_batch_empty():
+    """Test an empty batch returns no results without touching storage"""
+    response = client.post("/add_batch", json={"observations": []})
+    assert response.status_code == 200
+    assert response.json() == {"results": [], "count": 0}
+
+def test_add_batch_too_large(monkeypatch):
+    """Test /add_batch rejects batches above MAX_BATCH_SIZE with a 400"""
+    import feature_manager
+    
+    monkeypatch.setattr(feature_manager, "MAX_BATCH_SIZE", 2)
+    observations = [{"series_id": "too_large", "value": float(i)} for i in range(3)]
+    response = client.post("/add_batch", json={"observations": observations})
+    assert response.status_code == 400
+    assert "MAX_BATCH_SIZE" in response.json()["detail"]
+    assert client.get("/series/too_large").json()["length"] == 0
+
+def test_get_series():
+    """Test /series reports the stored length and latest value, and an empty unknown series"""
+    for value in [1.0, 2.0, 3.0]:
+        client.post("/add", json={"series_id": "series_info", "value": value})
+    response = client.get("/series/series_info")
+    assert response.status_code == 200
+    data = response.json()
+    assert data == {"series_id": "series_info", "length": 3, "latest_value": 3.0, "available_lags": 3}
+    
+    data = client.get("/series/unknown_series").json()
+    assert data["length"] == 0
+    assert data["latest_value"] is None
+
+def test_info_reports_storage():
+    """Test /info includes the Redis breaker and near cache state"""
+    data = client.get("/info").json()
+    assert data["storage"]["redis_connected"] in (True, False)
+    assert "pending_series" in data["storage"]
@@ -1,5 +1,8 @@
+import asyncio
+import uuid
 import pytest
-from unittest.mock import patch
+import redis
+from unittest.mock import AsyncMock, MagicMock, patch
 from feature_manager import LagFeatureManager
 
 def test_lag_feature_manager_init():
@@ -80,3 +83,290 @@ def test_max_lags_limit():
     # Buffer should only keep last 10 values (N_LAGS=10 in CI environment)
     assert len(manager.series_buffers["test_series"]) == 10
 
+
+def test_add_and_extract_memory():
+    """Test single-call extraction reports the buffer length after adding."""
+    with patch('redis.Redis') as mock_redis:
+        mock_redis.side_effect = Exception("Redis unavailable")
+        manager = LagFeatureManager()
+    
+    features, available_lags = manager.add_and_extract("test_series", 100.0)
+    assert features["in_1"] == 0.0
+    assert available_lags == 1
+    
+    for i in range(15):
+        features, available_lags = manager.add_and_extract("test_series", float(i))
+    assert features["in_1"] == 13.0
+    assert available_lags == 10
+
+def test_add_and_extract_redis_script():
+    """Test the Redis path uses one script call for read, push and trim."""
+    with patch('redis.Redis') as mock_redis:
+        script = MagicMock(return_value=[["110.0", "105.0"], 3])
+        mock_redis.return_value.register_script.return_value = script
+        manager = LagFeatureManager()
+    
+    features, available_lags = manager.add_and_extract("test_series", 115.0)
+    
+    script.assert_called_once_with(keys=["series:test_series:values"], args=[115.0, 10])
+    assert features["in_1"] == 110.0
+    assert features["in_2"] == 105.0
+    assert features["in_3"] == 0.0
+    assert available_lags == 3
+    assert not mock_redis.return_value.lrange.called
+
+def test_add_and_extract_redis_error_falls_back():
+    """Test a failing script call falls back to in-memory storage."""
+    with patch('redis.Redis') as mock_redis:
+        mock_redis.return_value.register_script.return_value = MagicMock(side_effect=redis.ConnectionError("connection lost"))
+        manager = LagFeatureManager()
+    
+    features, available_lags = manager.add_and_extract("test_series", 1.0)
+    assert manager.use_redis == False
+    assert available_lags == 1
+    assert list(manager.series_buffers["test_series"]) == [1.0]
+
+def test_add_and_extract_response_error_keeps_circuit_closed():
+    """Test a data error Redis rejects fails only that call and leaves the circuit closed."""
+    with patch('redis.Redis') as mock_redis:
+        script = MagicMock(side_effect=redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value"))
+        mock_redis.return_value.register_script.side_effect = [script, MagicMock()]
+        manager = LagFeatureManager()
+    
+    with pytest.raises(redis.ResponseError):
+        manager.add_and_extract("test_series", 1.0)
+    assert manager.pending == {}
+    
+    script.side_effect = None
+    script.return_value = [["1.0"], 2]
+    features, _ = manager.add_and_extract("other_series", 2.0)
+    assert features["in_1"] == 1.0
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_non_finite_values_rejected(value):
+    """Test NaN and inf are rejected before reaching the scripts or the memory buffer."""
+    with patch('redis.Redis') as mock_redis:
+        manager = LagFeatureManager()
+    
+    with pytest.raises(ValueError):
+        manager.add_and_extract("s", value)
+    with pytest.raises(ValueError):
+        manager.add_and_extract_many([("s", 1.0), ("s", value)])
+    with pytest.raises(ValueError):
+        asyncio.run(manager.add_and_extract_async("s", value))
+    assert not mock_redis.return_value.register_script.return_value.called
+
+def test_add_and_extract_many_redis_script():
+    """Test a batch is sent as one script call with keys and values in order."""
+    with patch('redis.Redis') as mock_redis:
+        batch_script = MagicMock(return_value=[[[], 1], [["1.0"], 2]])
+        mock_redis.return_value.register_script.side_effect = [MagicMock(), batch_script]
+        manager = LagFeatureManager()
+    
+    results = manager.add_and_extract_many([("s", 1.0), ("s", 2.0)])
+    
+    batch_script.assert_called_once_with(keys=["series:s:values", "series:s:values"], args=[10, 1.0, 2.0])
+    assert results[0][0]["in_1"] == 0.0
+    assert results[1][0]["in_1"] == 1.0
+    assert [lags for _, lags in results] == [1, 2]
+
+def test_add_and_extract_async_awaits_async_client():
+    """Test the async path awaits the asyncio client rather than the blocking one."""
+    with patch('redis.Redis') as mock_redis, patch('redis.asyncio.Redis') as mock_async_redis:
+        async_script = AsyncMock(return_value=[["110.0"], 2])
+        mock_async_redis.return_value.register_script.side_effect = [async_script, AsyncMock()]
+        manager = LagFeatureManager()
+    
+    features, available_lags = asyncio.run(manager.add_and_extract_async("test_series", 115.0))
+    
+    async_script.assert_awaited_once_with(keys=["series:test_series:values"], args=[115.0, 10])
+    assert not mock_redis.return_value.register_script.return_value.called
+    assert features["in_1"] == 110.0
+    assert available_lags == 2
+
+def test_add_and_extract_async_timeout_falls_back():
+    """Test a timed-out async call falls back to in-memory storage."""
+    with patch('redis.Redis'), patch('redis.asyncio.Redis') as mock_async_redis:
+        mock_async_redis.return_value.register_script.return_value = AsyncMock(side_effect=TimeoutError("Timeout reading from socket"))
+        manager = LagFeatureManager()
+    
+    features, available_lags = asyncio.run(manager.add_and_extract_async("test_series", 1.0))
+    assert manager.use_redis == False
+    assert available_lags == 1
+
+def test_circuit_breaker_replays_pending_on_reconnect():
+    """Test a Redis outage buffers observations and replays them once a probe succeeds."""
+    with patch('redis.Redis') as mock_redis:
+        single_script, batch_script = MagicMock(side_effect=ConnectionError("down")), MagicMock()
+        mock_redis.return_value.register_script.side_effect = [single_script, batch_script]
+        manager = LagFeatureManager()
+    
+    manager.add_and_extract("s", 1.0)
+    assert manager.use_redis == False
+    manager.add_and_extract("s", 2.0)
+    manager.add_and_extract("t", 5.0)
+    assert manager.stats()["pending_observations"] == 3
+    
+    # Not probed before the retry interval
+    manager.add_and_extract("s", 3.0)
+    assert not batch_script.called
+    
+    single_script.side_effect = None
+    single_script.return_value = [["3.0", "2.0", "1.0"], 4]
+    manager.next_probe = 0.0
+    features, _ = manager.add_and_extract("s", 4.0)
+    
+    batch_script.assert_called_once_with(
+        keys=["series:s:values"] * 3 + ["series:t:values"], args=[10, 1.0, 2.0, 3.0, 5.0]
+    )
+    assert manager.pending == {}
+    assert manager.series_buffers == {}
+    assert manager.stats()["redis_replayed_total"] == 4
+    assert features["in_1"] == 3.0
+
+def test_oversized_batch_rejected(monkeypatch):
+    """Test a batch above MAX_BATCH_SIZE is rejected before it becomes one long script call."""
+    import feature_manager
+    
+    monkeypatch.setattr(feature_manager, "MAX_BATCH_SIZE", 2)
+    with patch('redis.Redis') as mock_redis:
+        manager = LagFeatureManager()
+    
+    with pytest.raises(ValueError):
+        manager.add_and_extract_many([("s", 1.0)] * 3)
+    with pytest.raises(ValueError):
+        asyncio.run(manager.add_and_extract_many_async([("s", 1.0)] * 3))
+    assert not mock_redis.return_value.register_script.return_value.called
+
+def test_replay_split_into_bounded_batches(monkeypatch):
+    """Test recovery replays whole series in script calls of at most MAX_BATCH_SIZE observations."""
+    import feature_manager
+    
+    monkeypatch.setattr(feature_manager, "MAX_BATCH_SIZE", 3)
+    with patch('redis.Redis') as mock_redis:
+        single_script, batch_script = MagicMock(side_effect=redis.ConnectionError("down")), MagicMock()
+        mock_redis.return_value.register_script.side_effect = [single_script, batch_script]
+        manager = LagFeatureManager()
+    
+    for series_id, value in [("s", 1.0), ("s", 2.0), ("t", 3.0), ("u", 4.0), ("u", 5.0)]:
+        manager.add_and_extract(series_id, value)
+    single_script.side_effect = None
+    single_script.return_value = [[], 1]
+    manager.next_probe = 0.0
+    manager.add_and_extract("v", 6.0)
+    
+    assert [call.kwargs["args"] for call in batch_script.call_args_list] == [[10, 1.0, 2.0, 3.0], [10, 4.0, 5.0]]
+    assert manager.pending == {}
+    assert manager.stats()["redis_replayed_total"] == 5
+
+def test_failed_probe_keeps_pending():
+    """Test a failing probe keeps buffered observations for the next probe."""
+    with patch('redis.Redis') as mock_redis:
+        mock_redis.return_value.register_script.return_value = MagicMock(side_effect=ConnectionError("down"))
+        manager = LagFeatureManager()
+    
+    manager.add_and_extract("s", 1.0)
+    manager.next_probe = 0.0
+    manager.add_and_extract("s", 2.0)
+    
+    assert manager.use_redis == False
+    assert manager.next_probe > 0.0
+    assert list(manager.pending["s"]) == [1.0, 2.0]
+
+def test_replay_drops_rejected_batch():
+    """Test a replay batch Redis rejects as data is dropped so the circuit can still close."""
+    with patch('redis.Redis') as mock_redis:
+        single_script = MagicMock(side_effect=redis.ConnectionError("down"))
+        batch_script = MagicMock(side_effect=redis.ResponseError("WRONGTYPE"))
+        mock_redis.return_value.register_script.side_effect = [single_script, batch_script]
+        manager = LagFeatureManager()
+    
+    manager.add_and_extract("s", 1.0)
+    single_script.side_effect = None
+    single_script.return_value = [[], 1]
+    manager.next_probe = 0.0
+    manager.add_and_extract("t", 2.0)
+    
+    assert batch_script.called
+    assert manager.pending == {}
+    assert manager.stats()["redis_replayed_total"] == 0
+
+def test_near_cache_write_through():
+    """Test reads of a written series skip Redis, and the cache seeds memory during an outage."""
+    with patch('redis.Redis') as mock_redis:
+        script = MagicMock(return_value=[["2.0", "1.0"], 3])
+        mock_redis.return_value.register_script.side_effect = [script, MagicMock()]
+        manager = LagFeatureManager(near_cache_size=10)
+    
+    manager.add_and_extract("s", 3.0)
+    assert manager.get_lags("s") == [3.0, 2.0, 1.0]
+    assert not mock_redis.return_value.lrange.called
+    assert manager.stats()["near_cache_hits_total"] == 1
+    
+    script.side_effect = ConnectionError("down")
+    features, available_lags = manager.add_and_extract("s", 4.0)
+    assert features["in_1"] == 3.0
+    assert features["in_3"] == 1.0
+    assert available_lags == 4
+
+def test_ring_storage_uses_ring_scripts_and_decodes_blobs():
+    """Test ring storage sends ring and legacy list keys and decodes packed float64 replies."""
+    from ring_buffer import encode_ring
+    
+    with patch('redis.Redis') as mock_redis:
+        script = MagicMock(return_value=[encode_ring([110.0, 105.0], 10), 3])
+        mock_redis.return_value.register_script.side_effect = [script, MagicMock()]
+        manager = LagFeatureManager(storage="ring")
+    
+    features, available_lags = manager.add_and_extract("s", 115.0)
+    
+    script.assert_called_once_with(keys=["series:s:ring", "series:s:values"], args=[115.0, 10])
+    assert "SETRANGE" in mock_redis.return_value.register_script.call_args_list[0][0][0]
+    assert mock_redis.call_args.kwargs["decode_responses"] == False
+    assert features["in_1"] == 110.0
+    assert features["in_2"] == 105.0
+    assert features["in_3"] == 0.0
+    assert available_lags == 3
+
+def test_ring_storage_reads_unmigrated_list():
+    """Test reads fall back to the legacy list until a series is first written in ring mode."""
+    with patch('redis.Redis') as mock_redis:
+        mock_redis.return_value.get.return_value = None
+        mock_redis.return_value.lrange.return_value = [b"3.0", b"2.0"]
+        manager = LagFeatureManager(storage="ring")
+    
+    assert manager.get_lags("s") == [3.0, 2.0]
+    mock_redis.return_value.get.assert_called_once_with("series:s:ring")
+
+def test_unknown_storage():
+    """Test an unknown LAG_STORAGE mode is rejected"""
+    with pytest.raises(ValueError):
+        LagFeatureManager(storage="hash")
+
+def test_list_script_pushes_and_trims_in_redis(scripted_manager):
+    """Test the list script returns the previous lags and leaves the newest max_lags values, most recent first."""
+    manager = scripted_manager(max_lags=3)
+    series_id = f"lua-test-{uuid.uuid4().hex}"
+    
+    results = [manager.add_and_extract(series_id, value) for value in [1.0, 2.0, 3.0, 4.0, 5.0]]
+    
+    assert [[features["in_1"], features["in_2"], features["in_3"]] for features, _ in results] == [
+        [0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [2.0, 1.0, 0.0], [3.0, 2.0, 1.0], [4.0, 3.0, 2.0]
+    ]
+    assert [length for _, length in results] == [1, 2, 3, 3, 3]
+    assert manager.redis_client.lrange(f"series:{series_id}:values", 0, -1) == ["5.0", "4.0", "3.0"]
+    assert manager.get_lags(series_id) == [5.0, 4.0, 3.0]
+
+def test_list_batch_script_matches_sequential_adds(scripted_manager):
+    """Test the batch script applies items in order, so a repeated series sees its earlier items."""
+    manager = scripted_manager(max_lags=3)
+    batch_a, batch_b, single = (f"lua-test-{uuid.uuid4().hex}" for _ in range(3))
+    values = [1.0, 2.0, 3.0, 4.0]
+    
+    batched = manager.add_and_extract_many([(batch_a, values[0]), (batch_b, 10.0), (batch_a, values[1]),
+                                            (batch_a, values[2]), (batch_a, values[3])])
+    sequential = [manager.add_and_extract(single, value) for value in values]
+    
+    assert [batched[i] for i in (0, 2, 3, 4)] == sequential
+    assert batched[1] == ({"in_1": 0.0, "in_2": 0.0, "in_3": 0.0}, 1)
+    assert manager.get_lags(batch_a) == [4.0, 3.0, 2.0]
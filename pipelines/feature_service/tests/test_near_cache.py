@@ -0,0 +1,28 @@
+from near_cache import NearCache
+
+def test_lru_eviction():
+    """Test the least recently read or written series is evicted past max_size"""
+    cache = NearCache(max_size=2, ttl=60.0)
+    cache.put("a", (1.0,))
+    cache.put("b", (2.0,))
+    assert cache.get("a") == (1.0,)  # Touch a, so b is least recent
+    cache.put("c", (3.0,))
+    assert cache.get("b") is None
+    assert cache.get("a") == (1.0,)
+    assert cache.get("c") == (3.0,)
+
+def test_ttl_bounds_reads():
+    """Test entries older than the TTL miss unless the caller accepts any age"""
+    cache = NearCache(max_size=10, ttl=0.0)
+    cache.put("a", (1.0, 0.5))
+    assert cache.get("a") is None
+    assert cache.get("a", max_age=float("inf")) == (1.0, 0.5)
+    assert cache.stats() == {"near_cache_hits_total": 1, "near_cache_misses_total": 1, "near_cache_entries": 1}
+
+def test_invalidate():
+    """Test invalidated series miss, and invalidating an unknown series is a no-op"""
+    cache = NearCache(max_size=10, ttl=60.0)
+    cache.put("a", (1.0,))
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
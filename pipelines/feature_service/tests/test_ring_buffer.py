@@ -0,0 +1,82 @@
+import uuid
+import numpy as np
+from ring_buffer import RING_HEADER, decode_ring, encode_ring
+
+def ring_after_adds(values, max_lags):
+    """Apply values to an empty ring the way the Lua ring_add does"""
+    blob = bytearray(encode_ring([], max_lags))
+    for value in values:
+        head, count = RING_HEADER.unpack_from(blob)
+        blob[RING_HEADER.size + 8 * head:RING_HEADER.size + 8 * (head + 1)] = np.float64(value).tobytes()
+        RING_HEADER.pack_into(blob, 0, (head + 1) % max_lags, min(count + 1, max_lags))
+    return bytes(blob)
+
+def test_encode_decode_roundtrip():
+    """Test encoded lags decode most recent first, truncated to max_lags"""
+    assert decode_ring(encode_ring([], 5)).tolist() == []
+    assert decode_ring(encode_ring([3.0, 2.0, 1.0], 5)).tolist() == [3.0, 2.0, 1.0]
+    assert decode_ring(encode_ring([5.0, 4.0, 3.0, 2.0, 1.0, 0.0], 5)).tolist() == [5.0, 4.0, 3.0, 2.0, 1.0]
+
+def test_decode_in_place_updates():
+    """Test decoding matches most-recent-first order before and after the ring wraps"""
+    for n in range(12):
+        values = [float(v) for v in range(n)]
+        assert decode_ring(ring_after_adds(values, 5)).tolist() == values[::-1][:5]
+
+def test_blob_size_and_zero_copy():
+    """Test the blob is header plus max_lags slots and decodes without copying"""
+    blob = encode_ring([2.0, 1.0], 100)
+    assert len(blob) == RING_HEADER.size + 8 * 100
+    lags = decode_ring(blob)
+    assert not lags.flags.owndata  # A view over the reply bytes, no per-element parsing
+
+def test_ring_script_writes_past_wrap(scripted_manager):
+    """Test the ring script keeps returning the previous lags, most recent first, after the ring wraps"""
+    manager = scripted_manager(max_lags=3, storage='ring')
+    series_id = f"lua-test-{uuid.uuid4().hex}"
+    values = [float(v) for v in range(1, 9)]
+    
+    for i, value in enumerate(values):
+        features, length = manager.add_and_extract(series_id, value)
+        previous = values[:i][::-1] + [0.0, 0.0, 0.0]
+        assert [features["in_1"], features["in_2"], features["in_3"]] == previous[:3]
+        assert length == min(i + 1, 3)
+    
+    assert manager.redis_client.get(f"series:{series_id}:ring") == ring_after_adds(values, 3)
+    assert manager.get_lags(series_id) == [8.0, 7.0, 6.0]
+    
+    results = manager.add_and_extract_many([(series_id, 9.0), (series_id, 10.0)])
+    assert [features["in_1"] for features, _ in results] == [8.0, 9.0]
+    assert manager.get_lags(series_id) == [10.0, 9.0, 8.0]
+
+def test_ring_script_migrates_legacy_list(scripted_manager):
+    """Test the first ring write reads an existing list series and deletes the list key"""
+    list_manager = scripted_manager(max_lags=3)
+    ring_manager = scripted_manager(max_lags=3, storage='ring')
+    single, batched = (f"lua-test-{uuid.uuid4().hex}" for _ in range(2))
+    for value in [1.0, 2.0, 3.0, 4.0, 5.0]:
+        list_manager.add_and_extract(single, value)
+        list_manager.add_and_extract(batched, value)
+    
+    features, length = ring_manager.add_and_extract(single, 6.0)
+    assert [features["in_1"], features["in_2"], features["in_3"]] == [5.0, 4.0, 3.0]
+    assert length == 3
+    assert [features["in_1"] for features, _ in ring_manager.add_and_extract_many([(batched, 6.0), (batched, 7.0)])] == [5.0, 6.0]
+    
+    for series_id, lags in [(single, [6.0, 5.0, 4.0]), (batched, [7.0, 6.0, 5.0])]:
+        assert not ring_manager.redis_client.exists(f"series:{series_id}:values")
+        assert ring_manager.get_lags(series_id) == lags
+
+def test_ring_script_rebuilds_on_max_lags_change(scripted_manager):
+    """Test a ring written with a different max_lags is laid out again, keeping its lags"""
+    small = scripted_manager(max_lags=3, storage='ring')
+    large = scripted_manager(max_lags=5, storage='ring')
+    series_id = f"lua-test-{uuid.uuid4().hex}"
+    for value in [1.0, 2.0, 3.0, 4.0]:
+        small.add_and_extract(series_id, value)
+    
+    features, length = large.add_and_extract(series_id, 5.0)
+    assert [features[f"in_{i}"] for i in range(1, 6)] == [4.0, 3.0, 2.0, 0.0, 0.0]
+    assert length == 4
+    assert len(large.redis_client.get(f"series:{series_id}:ring")) == RING_HEADER.size + 8 * 5
+    assert large.get_lags(series_id) == [5.0, 4.0, 3.0, 2.0]
@@ -1,10 +1,12 @@
 from fastapi import FastAPI, HTTPException
 from typing import Dict, Any
 from service import DataIngestionService
+from wire_format import WireFormatRoute, WireResponse
 import aiohttp
 import asyncio
 
-app = FastAPI(title="Data Ingestion Service", version="1.0.0")
+app = FastAPI(title="Data Ingestion Service", version="1.0.0", default_response_class=WireResponse)
+app.router.route_class = WireFormatRoute
 ingestion_service = DataIngestionService()
 
 @app.get("/health")
@@ -71,4 +71,13 @@ def test_status_endpoint():
     assert "current_index" in data
     assert "total_observations" in data
     assert "remaining" in data
-    assert "completed" in data
\ No newline at end of file
+    assert "completed" in data
+
+def test_status_msgpack():
+    """Test responses are msgpack-encoded when the client accepts msgpack"""
+    import msgpack
+    
+    response = client.get("/status", headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "total_observations" in msgpack.unpackb(response.content)
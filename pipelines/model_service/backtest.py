@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Offline prequential backtest over the model registry.
+
+Streams a CSV (like ingestion_service/data.csv) through the same lag feature
+generation as the feature service's LagFeatureManager (in_1 = previous value,
+zero-filled) and, for every model, predicts each row before learning it.
+Reports accuracy, throughput and per-call latency percentiles. Models can run
+in parallel worker processes.
+
+Usage:
+    python backtest.py ../ingestion_service/data.csv
+    python backtest.py data.csv --models linear_regression,rls_regressor --n-lags 10 --workers 4
+"""
+
+import argparse
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from model_manager import get_model_factories
+
+LATENCY_PERCENTILES = (50, 95, 99)
+
+def read_values(path: str, column: str = "target") -> List[float]:
+    """Read one numeric column from a CSV with a header row"""
+    with open(path, newline="") as f:
+        return [float(row[column]) for row in csv.DictReader(f)]
+
+def lag_features(values: Iterable[float], n_lags: int) -> Iterator[Tuple[Dict[str, float], float]]:
+    """Yield (features, target) pairs, with features built only from earlier values"""
+    keys = [f"in_{i}" for i in range(1, n_lags + 1)]
+    buffer = deque(maxlen=n_lags)
+    for value in values:
+        lags = list(reversed(buffer)) + [0.0] * (n_lags - len(buffer))
+        yield dict(zip(keys, lags)), value
+        buffer.append(value)
+
+def backtest_model(model_name: str, values: List[float], n_lags: int) -> Dict[str, float]:
+    """Prequential run of one registry model: predict_one, then learn_one, for every row"""
+    model = get_model_factories()[model_name]()
+    predictions, targets, predict_times, learn_times = [], [], [], []
+
+    start = time.perf_counter()
+    for features, target in lag_features(values, n_lags):
+        t0 = time.perf_counter()
+        pred = model.predict_one(features)
+        t1 = time.perf_counter()
+        model.learn_one(features, target)
+        t2 = time.perf_counter()
+        predictions.append(0.0 if pred is None else pred)
+        targets.append(target)
+        predict_times.append(t1 - t0)
+        learn_times.append(t2 - t1)
+    elapsed = time.perf_counter() - start
+
+    predictions, targets = np.array(predictions), np.array(targets)
+    errors = targets - predictions
+    nonzero = targets != 0
+    result = {
+        "model": model_name,
+        "rows": len(targets),
+        "mae": float(np.mean(np.abs(errors))) if len(errors) else 0.0,
+        "rmse": float(np.sqrt(np.mean(errors ** 2))) if len(errors) else 0.0,
+        "mape": float(np.mean(np.abs(errors[nonzero] / targets[nonzero])) * 100) if nonzero.any() else 0.0,
+        "rows_per_second": len(targets) / elapsed if elapsed > 0 else 0.0,
+    }
+    for operation, times in (("predict_one", predict_times), ("learn_one", learn_times)):
+        for percentile, value in zip(LATENCY_PERCENTILES, np.percentile(times, LATENCY_PERCENTILES) if times else [0.0] * 3):
+            result[f"{operation}_p{percentile}_us"] = float(value) * 1e6
+    return result
+
+def run_backtest(values: List[float], model_names: List[str], n_lags: int = 10, workers: int = 1) -> List[Dict[str, float]]:
+    """Backtest every model, in worker processes when workers > 1; results keep model_names order"""
+    if workers <= 1:
+        return [backtest_model(name, values, n_lags) for name in model_names]
+    with ProcessPoolExecutor(max_workers=min(workers, len(model_names))) as pool:
+        return list(pool.map(backtest_model, model_names, [values] * len(model_names), [n_lags] * len(model_names)))
+
+def format_report(results: List[Dict[str, float]]) -> str:
+    header = (f"{'model':<22}{'rows':>7}{'MAE':>10}{'RMSE':>10}{'MAPE%':>8}{'rows/s':>10}"
+              f"{'predict p50/p95/p99 us':>26}{'learn p50/p95/p99 us':>26}")
+    lines = [header, "-" * len(header)]
+    for r in results:
+        predict = "/".join(f"{r[f'predict_one_p{p}_us']:.0f}" for p in LATENCY_PERCENTILES)
+        learn = "/".join(f"{r[f'learn_one_p{p}_us']:.0f}" for p in LATENCY_PERCENTILES)
+        lines.append(f"{r['model']:<22}{r['rows']:>7}{r['mae']:>10.3f}{r['rmse']:>10.3f}{r['mape']:>8.2f}"
+                     f"{r['rows_per_second']:>10.0f}{predict:>26}{learn:>26}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Prequential backtest of registry models over a CSV series")
+    parser.add_argument("csv", help="CSV file with a header row")
+    parser.add_argument("--column", default="target", help="Numeric column to forecast (default: target)")
+    parser.add_argument("--models", default="all", help="Comma-separated registry names or 'all' (default)")
+    parser.add_argument("--n-lags", type=int, default=10, help="Lag features per row, like N_LAGS (default: 10)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, one model each (default: 1)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table")
+    args = parser.parse_args()
+
+    factories = get_model_factories()
+    model_names = list(factories) if args.models == "all" else [name.strip() for name in args.models.split(",") if name.strip()]
+    unknown = [name for name in model_names if name not in factories]
+    if unknown:
+        parser.error(f"Unknown models: {unknown}. Available: {list(factories)}")
+
+    results = run_backtest(read_values(args.csv, args.column), model_names, args.n_lags, args.workers)
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+
+if __name__ == "__main__":
+    main()
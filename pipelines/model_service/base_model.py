@@ -1,9 +1,26 @@
+import copy
+import itertools
+import pickle
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List
+
+# Process-wide model state versions: never reused, so a version identifies one model state
+_model_versions = itertools.count(1)
 
 class BaseModel(ABC):
     """Abstract base class for all ML models"""
     
+    version: int = 0
+    
+    def bump_version(self) -> None:
+        """Mark the model state as changed; call from __init__ and every learning method"""
+        self.version = next(_model_versions)
+    
+    def __setstate__(self, state) -> None:
+        # Copies and unpickled snapshots are new states in this process
+        self.__dict__.update(state)
+        self.bump_version()
+    
     @abstractmethod
     def learn_one(self, features: Dict[str, float], target: float) -> None:
         """Train model with single observation"""
@@ -22,4 +39,16 @@ class BaseModel(ABC):
     @abstractmethod
     def predict_many(self, features: Dict[str, float], steps: int = 5):
         """Predict multiple steps ahead recursively"""
-        pass
\ No newline at end of file
+        pass
+    
+    def predict_learn_many(self, features_list: List[Dict[str, float]], targets: List[float]) -> List[float]:
+        """Predict then learn over an ordered batch of observations"""
+        return [self.predict_learn(features, target) for features, target in zip(features_list, targets)]
+    
+    def clone(self) -> "BaseModel":
+        """Return a fresh copy of this model (called on untrained templates)"""
+        return copy.deepcopy(self)
+    
+    def memory_usage(self) -> int:
+        """Approximate model size in bytes"""
+        return len(pickle.dumps(self))
\ No newline at end of file
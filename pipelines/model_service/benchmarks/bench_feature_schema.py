@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: recursive predict_many feature handling.
+Compares the previous per-step dict rediscovery (key filtering, int() sorting
+and dict copies) against the compiled FeatureSchema with array lag shifting.
+
+Usage: python benchmarks/bench_feature_schema.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feature_schema import forecast_recursive
+from models.river_models import get_river_models
+
+STEPS = 5
+REPEATS = 2000
+
+def forecast_dict_rediscovery(predict_one, features, steps):
+    """Previous RiverModelWrapper.predict_many loop, minus its debug prints"""
+    predictions = []
+    current_features = features.copy()
+    for _ in range(steps):
+        pred = predict_one(current_features)
+        predictions.append(pred)
+        lag_keys = [k for k in current_features.keys() if k.startswith('in_')]
+        lag_keys.sort(key=lambda x: int(x.split('_')[1]))
+        if lag_keys:
+            for i in range(len(lag_keys) - 1, 0, -1):
+                current_features[lag_keys[i]] = current_features[lag_keys[i-1]]
+            current_features[lag_keys[0]] = pred
+    return predictions
+
+def run(label, predict_one, n_lags):
+    features = {f"in_{i}": 100.0 + i for i in range(1, n_lags + 1)}
+    assert forecast_dict_rediscovery(predict_one, features, STEPS) == forecast_recursive(predict_one, features, STEPS)
+
+    old = min(timeit.repeat(lambda: forecast_dict_rediscovery(predict_one, features, STEPS), number=REPEATS, repeat=5))
+    new = min(timeit.repeat(lambda: forecast_recursive(predict_one, features, STEPS), number=REPEATS, repeat=5))
+    print(f"{label:<18} N_LAGS={n_lags:<4} dict: {old / REPEATS * 1e6:8.1f}us  "
+          f"schema: {new / REPEATS * 1e6:8.1f}us  speedup: {old / new:5.2f}x")
+
+if __name__ == "__main__":
+    model = get_river_models()["linear_regression"]
+    for n_lags in (10, 100):
+        for i in range(50):
+            model.learn_one({f"in_{j}": float(i + j) for j in range(1, n_lags + 1)}, float(i))
+        run("noop predictor", lambda x: 1.0, n_lags)
+        run("linear_regression", model.predict_one, n_lags)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: KNN predict_one/learn_one latency by window size.
+Compares River's StandardScaler | KNNRegressor with an exact linear-scan
+LazySearch engine of the same window against SlidingWindowKNNRegressor.
+
+Usage: python benchmarks/bench_knn.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from river import neighbors, preprocessing
+from models.knn_models import SlidingWindowKNNRegressor
+from models.river_models import RiverModelWrapper
+
+WINDOW_SIZES = (1_000, 10_000, 100_000)
+N_LAGS = 10
+QUERIES = 20
+
+def river_knn(window_size):
+    engine = neighbors.LazySearch(window_size=window_size)
+    return RiverModelWrapper(
+        preprocessing.StandardScaler() | neighbors.KNNRegressor(n_neighbors=5, engine=engine),
+        "knn_regressor"
+    )
+
+def rows(n, seed=0):
+    values = np.random.default_rng(seed).normal(100, 10, size=(n, N_LAGS)).tolist()
+    return [{f"in_{i}": value for i, value in enumerate(row, start=1)} for row in values]
+
+def run(label, model, train, queries):
+    start = time.perf_counter()
+    for features in train:
+        model.learn_one(features, features["in_1"])
+    learn = (time.perf_counter() - start) / len(train)
+
+    start = time.perf_counter()
+    for features in queries:
+        model.predict_one(features)
+    predict = (time.perf_counter() - start) / len(queries)
+    print(f"  {label:<24} learn_one: {learn * 1e6:8.1f}us  predict_one: {predict * 1e3:9.3f}ms")
+    return predict
+
+if __name__ == "__main__":
+    queries = rows(QUERIES, seed=1)
+    for window_size in WINDOW_SIZES:
+        train = rows(window_size)
+        print(f"window={window_size}")
+        old = run("river LazySearch", river_knn(window_size), train, queries)
+        new = run("SlidingWindowKNN (numpy)", SlidingWindowKNNRegressor(window_size=window_size), train, queries)
+        print(f"  predict_one speedup: {old / new:.1f}x")
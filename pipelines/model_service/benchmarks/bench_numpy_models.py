@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: linear model throughput, River vs the NumPy backend.
+Times per-sample predict_learn and batched predict_learn_many (the
+/predict_learn_batch path) on the same N_LAGS=10 stream.
+
+Usage: python benchmarks/bench_numpy_models.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from models.river_models import linear_regression
+from models.numpy_models import get_numpy_model_factories
+
+N_ROWS = 10_000
+N_LAGS = 10
+
+def stream(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(N_ROWS, N_LAGS))
+    y = X @ rng.normal(size=N_LAGS) + rng.normal(scale=0.1, size=N_ROWS)
+    return [{f"in_{i}": value for i, value in enumerate(row, start=1)} for row in X.tolist()], y.tolist()
+
+def run(label, factory, features_list, targets):
+    model = factory()
+    start = time.perf_counter()
+    for features, target in zip(features_list, targets):
+        model.predict_learn(features, target)
+    single = N_ROWS / (time.perf_counter() - start)
+
+    model = factory()
+    start = time.perf_counter()
+    predictions = model.predict_learn_many(features_list, targets)
+    batch = N_ROWS / (time.perf_counter() - start)
+    mae = np.mean(np.abs(np.subtract(predictions[-1000:], targets[-1000:])))
+    print(f"{label:<18} predict_learn: {single:9.0f} rows/s  predict_learn_many: {batch:9.0f} rows/s  "
+          f"MAE (last 1k): {mae:.4f}")
+
+if __name__ == "__main__":
+    features_list, targets = stream()
+    run("linear_regression", linear_regression, features_list, targets)
+    for name, factory in get_numpy_model_factories().items():
+        run(name, factory, features_list, targets)
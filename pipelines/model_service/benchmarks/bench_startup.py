@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: time until main.py's app is importable and its model is built.
+Each measurement runs in a fresh interpreter. "lazy" imports service (as main.py
+does) with one MODEL_NAME; "eager" additionally imports every River model family
+and builds all registry models first, like the previous get_river_models() did.
+
+Usage: python benchmarks/bench_startup.py
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_NAMES = ["linear_regression", "knn_regressor", "amf_regressor", "bagging_regressor"]
+REPEATS = 5
+
+LAZY = "import service"
+EAGER = "from models.river_models import get_river_models; get_river_models(); import service"
+
+def startup_seconds(code, model_name):
+    env = dict(os.environ, MODEL_NAME=model_name, SNAPSHOT_DIR="", PYTHONPATH=SERVICE_DIR)
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=SERVICE_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+if __name__ == "__main__":
+    for model_name in MODEL_NAMES:
+        eager = startup_seconds(EAGER, model_name)
+        lazy = startup_seconds(LAZY, model_name)
+        print(f"{model_name:<18} eager: {eager * 1000:7.0f}ms  lazy: {lazy * 1000:7.0f}ms  speedup: {eager / lazy:5.2f}x")
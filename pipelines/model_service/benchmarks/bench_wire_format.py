@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request CPU of the wire formats on /predict_learn.
+
+1. Codec only: decode a request body and encode a response body with the
+   stdlib json module, orjson and msgpack.
+2. In-process service: CPU time per /predict_learn call through the FastAPI
+   app (TestClient, no network) for each request/response format pair.
+
+Usage: python benchmarks/bench_wire_format.py [N_LAGS]
+"""
+
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+import orjson
+from fastapi.testclient import TestClient
+
+N_LAGS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+CODEC_REPEATS = 20000
+SERVICE_REQUESTS = 500
+
+REQUEST = {"features": {f"in_{i}": 100.0 + i * 1.2345 for i in range(1, N_LAGS + 1)}, "target": 140.0}
+RESPONSE = {"prediction": 139.87654321}
+
+CODECS = {
+    "json": (lambda obj: json.dumps(obj).encode(), json.loads),
+    "orjson": (orjson.dumps, orjson.loads),
+    "msgpack": (msgpack.packb, msgpack.unpackb),
+}
+
+def bench_codecs():
+    print(f"Codec only (N_LAGS={N_LAGS}): decode request + encode response")
+    for name, (dumps, loads) in CODECS.items():
+        body = dumps(REQUEST)
+        seconds = min(timeit.repeat(lambda: (loads(body), dumps(RESPONSE)), number=CODEC_REPEATS, repeat=5))
+        print(f"  {name:<8} {seconds / CODEC_REPEATS * 1e6:7.2f}us/request  request body: {len(body)} bytes")
+
+def bench_service():
+    from service import app
+    client = TestClient(app)
+    formats = {
+        "json -> json": (orjson.dumps(REQUEST), {"Content-Type": "application/json"}),
+        "msgpack -> msgpack": (msgpack.packb(REQUEST), {"Content-Type": "application/msgpack", "Accept": "application/msgpack"}),
+    }
+    print(f"\nIn-process /predict_learn ({SERVICE_REQUESTS} requests, CPU time incl. TestClient overhead)")
+    for label, (body, headers) in formats.items():
+        for _ in range(50):  # Warm up
+            client.post("/predict_learn", content=body, headers=headers)
+        start = time.process_time()
+        for _ in range(SERVICE_REQUESTS):
+            assert client.post("/predict_learn", content=body, headers=headers).status_code == 200
+        cpu = time.process_time() - start
+        print(f"  {label:<20} {cpu / SERVICE_REQUESTS * 1e6:8.1f}us CPU/request")
+
+if __name__ == "__main__":
+    bench_codecs()
+    bench_service()
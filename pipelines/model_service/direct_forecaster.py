@@ -0,0 +1,54 @@
+from collections import deque
+from typing import Dict, List
+from base_model import BaseModel
+
+class DirectForecaster(BaseModel):
+    """Direct multi-horizon strategy: one model per horizon h=1..H on the same lag features.
+
+    The wrapped model is the h=1 model and serves predict_one/predict_learn as
+    before. Model h learns to predict the target h-1 observations after its
+    features, so it trains on features buffered from h-1 learn steps ago. A
+    forecast is H independent predictions from the current features, with no
+    lag shifting and no compounding of earlier steps' errors.
+    """
+
+    def __init__(self, model: BaseModel, horizon: int):
+        self.model = model
+        self.horizon = max(horizon, 1)
+        self.horizon_models = [model.clone() for _ in range(self.horizon - 1)]  # h=2..H
+        self.past_features = deque(maxlen=self.horizon - 1)  # Most recent last
+        self.bump_version()
+
+    def clone(self) -> "DirectForecaster":
+        return DirectForecaster(self.model.clone(), self.horizon)
+
+    def memory_usage(self) -> int:
+        return self.model.memory_usage() + sum(model.memory_usage() for model in self.horizon_models)
+
+    def _learn_horizons(self, features: Dict[str, float], target: float) -> None:
+        for h, model in enumerate(self.horizon_models, start=2):
+            if len(self.past_features) >= h - 1:
+                model.learn_one(self.past_features[-(h - 1)], target)
+        if self.horizon_models:
+            self.past_features.append(features)
+        self.bump_version()
+
+    def learn_one(self, features: Dict[str, float], target: float) -> None:
+        self.model.learn_one(features, target)
+        self._learn_horizons(features, target)
+
+    def predict_one(self, features: Dict[str, float]) -> float:
+        return self.model.predict_one(features)
+
+    def predict_learn(self, features: Dict[str, float], target: float) -> float:
+        """Predict then learn from target"""
+        prediction = self.model.predict_learn(features, target)
+        self._learn_horizons(features, target)
+        return prediction
+
+    def predict_many(self, features: Dict[str, float], steps: int = 5) -> List[float]:
+        """Predict steps ahead with one independent model per horizon"""
+        if steps > self.horizon:
+            raise ValueError(f"Direct forecasts are limited to {self.horizon} steps (FORECAST_HORIZON)")
+        models = [self.model] + self.horizon_models[:steps - 1]
+        return [model.predict_one(features) for model in models]
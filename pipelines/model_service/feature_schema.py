@@ -0,0 +1,65 @@
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+LAG_PREFIX = "in_"
+MAX_CACHED_SCHEMAS = 1024
+
+class FeatureSchema:
+    """Compiled, fixed feature order for one feature-set signature.
+
+    Lag features (`in_1`, `in_2`, ...) come first in lag order, followed by
+    any other features sorted by name. Values are handled as float64 arrays
+    internally; dicts are only built at the River boundary.
+    """
+
+    __slots__ = ("keys", "n_lags")
+
+    def __init__(self, feature_names):
+        lag_keys = sorted(
+            (name for name in feature_names if _lag_index(name) is not None), key=_lag_index
+        )
+        other_keys = sorted(name for name in feature_names if _lag_index(name) is None)
+        self.keys = tuple(lag_keys + other_keys)
+        self.n_lags = len(lag_keys)
+
+    def to_array(self, features: Dict[str, float]) -> np.ndarray:
+        return np.fromiter((features[key] for key in self.keys), dtype=np.float64, count=len(self.keys))
+
+    def to_dict(self, values) -> Dict[str, float]:
+        return dict(zip(self.keys, values.tolist() if isinstance(values, np.ndarray) else values))
+
+    def shift_lags(self, values: np.ndarray, newest: float) -> None:
+        """Roll lags in place: in_1 gets newest, in_2 gets old in_1, etc."""
+        n = self.n_lags
+        if n:
+            values[1:n] = values[:n - 1]
+            values[0] = newest
+
+def _lag_index(name: str) -> Optional[int]:
+    if name.startswith(LAG_PREFIX) and name[len(LAG_PREFIX):].isdigit():
+        return int(name[len(LAG_PREFIX):])
+    return None
+
+_schemas: Dict[tuple, FeatureSchema] = {}
+
+def get_schema(features: Dict[str, float]) -> FeatureSchema:
+    """Return the cached schema for this feature dict's key signature"""
+    signature = tuple(features)
+    schema = _schemas.get(signature)
+    if schema is None:
+        if len(_schemas) >= MAX_CACHED_SCHEMAS:
+            _schemas.clear()
+        schema = _schemas[signature] = FeatureSchema(signature)
+    return schema
+
+def forecast_recursive(predict_one: Callable[[Dict[str, float]], float],
+                       features: Dict[str, float], steps: int) -> List[float]:
+    """Predict multiple steps ahead, feeding each prediction back in as in_1"""
+    schema = get_schema(features)
+    values = schema.to_array(features)
+    predictions = []
+    for _ in range(steps):
+        pred = predict_one(schema.to_dict(values))
+        predictions.append(pred)
+        schema.shift_lags(values, 0.0 if pred is None else pred)
+    return predictions
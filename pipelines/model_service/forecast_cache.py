@@ -0,0 +1,53 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Cached /predict_many forecasts (0 disables the cache)
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "1024"))
+
+class ForecastCache:
+    """LRU cache of forecasts keyed on (model version, feature vector, steps).
+
+    Model versions change on every learning call and are never reused (see
+    BaseModel.bump_version), so an entry can only be hit while the model is
+    in exactly the state that produced it; stale entries simply age out.
+    """
+
+    def __init__(self, max_size=FORECAST_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, features, steps):
+        return model.version, tuple(features.items()), steps
+
+    def get_or_compute(self, model, features, steps, compute):
+        """Return the cached forecast for this model state, or compute(features, steps) and cache it"""
+        if self.max_size <= 0:
+            return compute(features, steps)
+
+        key = self.key(model, features, steps)
+        with self._lock:
+            predictions = self._entries.get(key)
+            if predictions is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(predictions)
+            self.misses += 1
+
+        predictions = compute(features, steps)
+        with self._lock:
+            self._entries[key] = tuple(predictions)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return predictions
+
+    def stats(self):
+        return {
+            "forecast_cache_hits_total": self.hits,
+            "forecast_cache_misses_total": self.misses,
+            "forecast_cache_entries": len(self._entries)
+        }
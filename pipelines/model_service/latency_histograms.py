@@ -0,0 +1,98 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from 100us model calls to multi-second requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class LatencyHistogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+class LatencyRecorder:
+    """Fixed-bucket Prometheus latency histograms keyed by metric name and labels.
+
+    observe() is a bisect plus three increments under one uncontended lock,
+    so it is cheap enough for every request and model call. Histograms are
+    only turned into exposition text when /metrics is scraped.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms = {}  # (name, labels tuple) -> LatencyHistogram
+        self.help = {}
+        self.observations = 0
+        self._lock = threading.Lock()
+
+    def register(self, name, help_text):
+        self.help[name] = help_text
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(len(self.buckets))
+            histogram.counts[bisect_left(self.buckets, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+            self.observations += 1
+
+    @contextmanager
+    def time(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def collect(self, exporter):
+        """Add every histogram's cumulative _bucket, _sum and _count samples to exporter families"""
+        with self._lock:
+            snapshot = [(name, labels, list(h.counts), h.sum, h.count) for (name, labels), h in self.histograms.items()]
+        for name, labels, counts, total, count in sorted(snapshot, key=lambda item: item[0]):
+            family = exporter.register(name, self.help.get(name, name), "histogram")
+            labels = dict(labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                family.add(cumulative, suffix="_bucket", **labels, le=bound)
+            family.add(total, suffix="_sum", **labels)
+            family.add(count, suffix="_count", **labels)
+
+class LatencyMiddleware:
+    """ASGI middleware timing every HTTP request by route template, method and status"""
+
+    def __init__(self, app, recorder, metric_name="ml_http_request_duration_seconds"):
+        self.app = app
+        self.recorder = recorder
+        self.metric_name = metric_name
+        recorder.register(metric_name, "HTTP request latency in seconds, including validation and serialization")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            self.recorder.observe(
+                self.metric_name, time.perf_counter() - start,
+                endpoint=route.path if route is not None else "unmatched",  # Raw paths would be unbounded
+                method=scope["method"], status=status[0]
+            )
@@ -1,13 +1,18 @@
 import os
 import signal
 import uvicorn
-from service import app
+from service import app, snapshot_manager, stop_learners
 
 def signal_handler(signum, frame):
     print(f"Received signal {signum}, shutting down gracefully...")
+    stop_learners()
+    snapshot_manager.stop()
     exit(0)
 
 if __name__ == "__main__":
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
+    # Restore before serving so /health only reports ready on warm state
+    snapshot_manager.restore()
+    snapshot_manager.start()
     uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")))
\ No newline at end of file
@@ -1,84 +1,234 @@
 from collections import defaultdict, deque
+import itertools
 import math
+import os
+from quantile_sketch import TDigest
 
-ROLLING_WINDOW_SIZES = [5, 10, 20]
+# Rolling window sizes in observations, e.g. METRICS_WINDOWS=5,10,20,100
+ROLLING_WINDOW_SIZES = sorted({int(size) for size in os.getenv("METRICS_WINDOWS", "5,10,20").split(",") if size.strip() and int(size) > 0}) or [5, 10, 20]
+
+# Error quantiles reported from the per-series sketches
+ERROR_QUANTILES = (0.5, 0.9, 0.99)
+
+class RollingWindow:
+    """Fixed-size window of (y_true, y_pred) pairs with running error sums.
+
+    Sums are updated on append and on eviction, so reading metrics is O(1)
+    regardless of window size. They are recomputed exactly once per `size`
+    evictions to stop floating-point drift (amortized O(1)).
+    """
+
+    __slots__ = ("size", "entries", "abs_error_sum", "squared_error_sum",
+                 "ape_sum", "ape_count", "evictions")
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = deque()  # (y_true, y_pred, abs_error, ape or None)
+        self.abs_error_sum = 0.0
+        self.squared_error_sum = 0.0
+        self.ape_sum = 0.0
+        self.ape_count = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        """Yield (y_true, y_pred) pairs, oldest first"""
+        for y_true, y_pred, _, _ in self.entries:
+            yield y_true, y_pred
+
+    def append(self, y_true, y_pred):
+        if len(self.entries) == self.size:
+            self._evict()
+
+        abs_error = abs(y_true - y_pred)
+        # MAPE (avoid division by zero)
+        ape = abs_error / abs(y_true) if y_true != 0 else None
+        self.entries.append((y_true, y_pred, abs_error, ape))
+
+        self.abs_error_sum += abs_error
+        self.squared_error_sum += abs_error * abs_error
+        if ape is not None:
+            self.ape_sum += ape
+            self.ape_count += 1
+
+    def _evict(self):
+        _, _, abs_error, ape = self.entries.popleft()
+        self.abs_error_sum -= abs_error
+        self.squared_error_sum -= abs_error * abs_error
+        if ape is not None:
+            self.ape_sum -= ape
+            self.ape_count -= 1
+
+        self.evictions += 1
+        if self.evictions % self.size == 0:
+            self._recompute()
+
+    def _recompute(self):
+        """Rebuild sums exactly from the stored entries"""
+        self.abs_error_sum = math.fsum(entry[2] for entry in self.entries)
+        self.squared_error_sum = math.fsum(entry[2] * entry[2] for entry in self.entries)
+        apes = [entry[3] for entry in self.entries if entry[3] is not None]
+        self.ape_sum = math.fsum(apes)
+        self.ape_count = len(apes)
+
+    def last(self):
+        """Most recent (y_true, y_pred) pair"""
+        y_true, y_pred, _, _ = self.entries[-1]
+        return y_true, y_pred
+
+    def metrics(self):
+        """Compute MAE, MSE, RMSE, MAPE from the running sums"""
+        n = len(self.entries)
+        if not n:
+            return {"mae": 0.0, "mse": 0.0, "rmse": 0.0, "mape": 0.0}
+
+        mae = max(self.abs_error_sum, 0.0) / n
+        mse = max(self.squared_error_sum, 0.0) / n
+        rmse = math.sqrt(mse)
+        mape = (max(self.ape_sum, 0.0) / self.ape_count * 100) if self.ape_count else 0.0
+
+        return {
+            "mae": round(mae, 4),
+            "mse": round(mse, 4),
+            "rmse": round(rmse, 4),
+            "mape": round(mape, 4)
+        }
 
 class MetricsManager:
     def __init__(self):
         self.series_history = defaultdict(lambda: {
-            size: deque(maxlen=size) for size in ROLLING_WINDOW_SIZES
+            size: RollingWindow(size) for size in ROLLING_WINDOW_SIZES
         })
+        # Constant-memory tail estimates: absolute error and absolute percentage error (in %)
+        self.series_sketches = defaultdict(lambda: {"abs_error": TDigest(), "ape": TDigest()})
         self.series_counts = defaultdict(int)
-        self.last_forecast = defaultdict(lambda: [0.0] * 5)
+        self.last_forecast = {}  # Full last forecast, up to MAX_FORECAST_STEPS values
+        # Bumped on every state change so readers can cache derived output
+        self._versions = itertools.count(1)
+        self.version = 0
+
+    def series_ids(self):
+        """Every series with any metrics state"""
+        return list(dict.fromkeys(itertools.chain(
+            list(self.series_history), list(self.series_sketches), list(self.series_counts), list(self.last_forecast)
+        )))
+
+    def series_state_dict(self, series_id):
+        """Plain-data copy of one series' state; hold the series lock for a consistent copy"""
+        windows = self.series_history.get(series_id)
+        sketches = self.series_sketches.get(series_id)
+        forecast = self.last_forecast.get(series_id)
+        return {
+            "history": {size: list(window) for size, window in windows.items()} if windows is not None else None,
+            "sketches": {name: sketch.state_dict() for name, sketch in sketches.items()} if sketches is not None else None,
+            "count": self.series_counts.get(series_id),
+            "forecast": list(forecast) if forecast is not None else None
+        }
+
+    @staticmethod
+    def combine_series_states(series_states):
+        """state_dict() layout from {series_id: series_state_dict(series_id)}"""
+        return {
+            "series_history": {series_id: s["history"] for series_id, s in series_states.items() if s["history"] is not None},
+            "series_sketches": {series_id: s["sketches"] for series_id, s in series_states.items() if s["sketches"] is not None},
+            "series_counts": {series_id: s["count"] for series_id, s in series_states.items() if s["count"] is not None},
+            "last_forecast": {series_id: s["forecast"] for series_id, s in series_states.items() if s["forecast"] is not None}
+        }
+
+    def state_dict(self):
+        """Plain-data copy of all rolling windows for snapshots"""
+        return self.combine_series_states({series_id: self.series_state_dict(series_id) for series_id in self.series_ids()})
+
+    def load_state_dict(self, state):
+        """Restore rolling windows from state_dict() output"""
+        for series_id, windows in state["series_history"].items():
+            for size in ROLLING_WINDOW_SIZES:
+                for y_true, y_pred in windows.get(size, []):
+                    self.series_history[series_id][size].append(y_true, y_pred)
+        for series_id, sketches in state.get("series_sketches", {}).items():
+            for name, sketch_state in sketches.items():
+                self.series_sketches[series_id][name].load_state_dict(sketch_state)
+        self.series_counts.update(state["series_counts"])
+        self.last_forecast.update(state["last_forecast"])
+        self.version = next(self._versions)
 
     def add(self, series_id, y_true, y_pred):
         y_true = float(y_true)
         y_pred = float(y_pred)
-        
+
         # Store in rolling windows
-        for size in ROLLING_WINDOW_SIZES:
-            self.series_history[series_id][size].append((y_true, y_pred))
+        for window in self.series_history[series_id].values():
+            window.append(y_true, y_pred)
         
+        abs_error = abs(y_true - y_pred)
+        sketches = self.series_sketches[series_id]
+        sketches["abs_error"].add(abs_error)
+        if y_true != 0:
+            sketches["ape"].add(abs_error / abs(y_true) * 100)
+
         # Increment total count
         self.series_counts[series_id] += 1
-    
+        self.version = next(self._versions)
+
+    def add_many(self, series_id, y_trues, y_preds):
+        """Add an ordered batch of (y_true, y_pred) pairs"""
+        for y_true, y_pred in zip(y_trues, y_preds):
+            self.add(series_id, y_true, y_pred)
+
     def add_predict_many(self, series_id, forecast_steps):
         """Store last forecast values"""
-        self.last_forecast[series_id] = forecast_steps[:5]
+        self.last_forecast[series_id] = list(forecast_steps)
+        self.version = next(self._versions)
+
+    def remove_series(self, series_id):
+        """Drop all state for a series, e.g. when its models are evicted"""
+        for states in (self.series_history, self.series_sketches, self.series_counts, self.last_forecast):
+            states.pop(series_id, None)
+        self.version = next(self._versions)
+
+    def get_series_metrics(self, series_id):
+        """Returns performance metrics for one series"""
+        windows = self.series_history.get(series_id)
+        if windows is None:
+            return {}
+        series_metrics = {'count': self.series_counts[series_id]}
+
+        # Rolling metrics for each window size, read from running sums
+        for size, window in windows.items():
+            if len(window):
+                for metric_name, value in window.metrics().items():
+                    series_metrics[f"{metric_name}_{size}"] = value
+
+        # Error quantiles from the sketches, e.g. abs_error_p99 and ape_p50 (in %), with the count and
+        # sum they were computed from
+        for name, sketch in self.series_sketches.get(series_id, {}).items():
+            quantiles, count, total = sketch.summary(ERROR_QUANTILES)
+            if count:
+                for q, value in zip(ERROR_QUANTILES, quantiles):
+                    series_metrics[f"{name}_p{q * 100:g}"] = round(value, 4)
+                series_metrics[f"{name}_count"] = count
+                series_metrics[f"{name}_sum"] = total
+
+        # Add last prediction details from largest window
+        largest_window = windows[max(ROLLING_WINDOW_SIZES)]
+        if len(largest_window):
+            last_actual, last_pred = largest_window.last()
+            series_metrics.update({
+                'last_prediction': last_pred,
+                'last_actual': last_actual,
+                'last_error': abs(last_actual - last_pred)
+            })
+
+        # Add forecast values
+        series_metrics['forecast'] = self.last_forecast.get(series_id, [])
+
+        return series_metrics
 
-    def _compute_metrics(self, data):
-        """Compute MAE, MSE, RMSE, MAPE from (y_true, y_pred) pairs"""
-        if not data:
-            return {"mae": 0.0, "mse": 0.0, "rmse": 0.0, "mape": 0.0}
-        
-        errors = [abs(y_true - y_pred) for y_true, y_pred in data]
-        squared_errors = [(y_true - y_pred) ** 2 for y_true, y_pred in data]
-        
-        mae = sum(errors) / len(errors)
-        mse = sum(squared_errors) / len(squared_errors)
-        rmse = math.sqrt(mse)
-        
-        # MAPE (avoid division by zero)
-        mape_errors = [abs(y_true - y_pred) / abs(y_true) for y_true, y_pred in data if y_true != 0]
-        mape = (sum(mape_errors) / len(mape_errors) * 100) if mape_errors else 0.0
-        
-        return {
-            "mae": round(mae, 4),
-            "mse": round(mse, 4), 
-            "rmse": round(rmse, 4),
-            "mape": round(mape, 4)
-        }
-    
     def get_metrics(self):
         """Returns comprehensive model performance metrics"""
         if not self.series_history:
             return {"message": "No predictions available yet"}
-        
-        metrics = {}
-        for series_id in self.series_history:
-            series_metrics = {'count': self.series_counts[series_id]}
-            
-            # Compute rolling metrics for each window size
-            for size in ROLLING_WINDOW_SIZES:
-                window_data = list(self.series_history[series_id][size])
-                if window_data:
-                    window_metrics = self._compute_metrics(window_data)
-                    for metric_name, value in window_metrics.items():
-                        series_metrics[f"{metric_name}_{size}"] = value
-            
-            # Add last prediction details from largest window
-            largest_window = self.series_history[series_id][max(ROLLING_WINDOW_SIZES)]
-            if largest_window:
-                last_actual, last_pred = largest_window[-1]
-                series_metrics.update({
-                    'last_prediction': last_pred,
-                    'last_actual': last_actual,
-                    'last_error': abs(last_actual - last_pred)
-                })
-            
-            # Add forecast values
-            series_metrics['forecast'] = self.last_forecast[series_id]
-            
-            metrics[series_id] = series_metrics
-        
-        return metrics
+
+        return {series_id: self.get_series_metrics(series_id) for series_id in list(self.series_history)}
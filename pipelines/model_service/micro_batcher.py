@@ -0,0 +1,133 @@
+import asyncio
+import os
+import weakref
+from starlette.concurrency import run_in_threadpool
+
+# Micro-batching for /predict_learn is disabled unless MICRO_BATCH_WINDOW_MS > 0
+MICRO_BATCH_WINDOW_MS = float(os.getenv("MICRO_BATCH_WINDOW_MS", "0"))
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+
+class _LoopState:
+    """Pending items and worker of one event loop; futures never cross loops"""
+
+    __slots__ = ("loop", "pending", "wakeup", "worker", "tails")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.pending = []
+        self.wakeup = asyncio.Event()
+        self.worker = None
+        self.tails = {}  # Group key -> task of its latest batch
+
+class MicroBatcher:
+    """Coalesces concurrent requests into ordered batches run in threadpool hops.
+
+    `execute(items)` is called with items in arrival order and must return one
+    result (or exception instance) per item. Items are grouped by `key(item)`
+    (e.g. series_id): batches of different groups run concurrently, and each
+    group's batches run one after another in arrival order. The collection
+    window adapts to load: it doubles (up to `max_window_ms`) while rounds
+    contain more than one item and halves down to zero when they don't, so an
+    idle service adds no latency. State is kept per event loop, so the batcher
+    also works when callers run on several loops.
+    """
+
+    def __init__(self, execute, max_window_ms=MICRO_BATCH_WINDOW_MS, max_batch_size=MICRO_BATCH_MAX_SIZE, key=None):
+        self.execute = execute
+        self.key = key
+        self.max_window = max_window_ms / 1000
+        self.max_batch_size = max(max_batch_size, 1)
+        self.window = 0.0
+        self.stats = {
+            "micro_batches_total": 0,
+            "micro_batched_requests_total": 0,
+            "micro_batch_window_seconds": 0.0
+        }
+        self._states = weakref.WeakKeyDictionary()  # Event loop -> _LoopState
+
+    async def submit(self, item):
+        """Queue an item and wait for its own result"""
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState(loop)
+        if state.worker is None or state.worker.done():
+            state.worker = loop.create_task(self._run(state))
+
+        future = loop.create_future()
+        state.pending.append((item, future))
+        state.wakeup.set()
+        return await future
+
+    async def _collect(self, state):
+        """Wait up to the current window for more items, unless the batch is already full"""
+        if self.window <= 0:
+            await asyncio.sleep(0)  # Let requests already on the loop enqueue
+            return
+
+        deadline = state.loop.time() + self.window
+        while len(state.pending) < self.max_batch_size:
+            remaining = deadline - state.loop.time()
+            if remaining <= 0:
+                return
+            state.wakeup.clear()
+            try:
+                await asyncio.wait_for(state.wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _run(self, state):
+        while True:
+            await state.wakeup.wait()
+            state.wakeup.clear()
+            if not state.pending:
+                continue
+
+            await self._collect(state)
+            collected, state.pending = state.pending, []
+            groups = {}
+            for entry in collected:
+                groups.setdefault(self.key(entry[0]) if self.key is not None else None, []).append(entry)
+            for key, entries in groups.items():
+                for start in range(0, len(entries), self.max_batch_size):
+                    self._schedule(state, key, entries[start:start + self.max_batch_size])
+            self._adapt(len(collected))
+            self.stats["micro_batch_window_seconds"] = self.window
+
+    def _schedule(self, state, key, batch):
+        """Run batch after the group's previous batch, concurrently with other groups"""
+        task = state.loop.create_task(self._execute(batch, state.tails.get(key)))
+        state.tails[key] = task
+
+        def forget(done, key=key):
+            if state.tails.get(key) is done:
+                del state.tails[key]
+
+        task.add_done_callback(forget)
+
+    async def _execute(self, batch, previous=None):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            results = await run_in_threadpool(self.execute, [item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # Caller went away
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self.stats["micro_batches_total"] += 1
+        self.stats["micro_batched_requests_total"] += len(batch)
+
+    def _adapt(self, batch_size):
+        if batch_size > 1:
+            self.window = min(self.max_window, max(self.window * 2, self.max_window / 16))
+        elif self.window > self.max_window / 64:
+            self.window /= 2
+        else:
+            self.window = 0.0
@@ -1,24 +1,194 @@
+import logging
 import os
-from models.river_models import get_river_models
+import threading
+from collections import OrderedDict
+from models.river_models import get_river_model_factories
+from models.knn_models import get_knn_model_factories
+from models.numpy_models import get_numpy_model_factories
 from base_model import BaseModel
+from direct_forecaster import DirectForecaster
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Multi-model hosting: comma-separated registry names (or "all") served from one process
+MODEL_NAMES = os.getenv("MODEL_NAMES", "")
+
+# Per-series model budget: LRU eviction once either limit is exceeded (0 disables the memory limit)
+MAX_SERIES_MODELS = int(os.getenv("MAX_SERIES_MODELS", "1000"))
+MAX_MODELS_MEMORY_MB = float(os.getenv("MAX_MODELS_MEMORY_MB", "0"))
+
+# predict_many strategy: "recursive" feeds predictions back as lags, "direct" trains one model per horizon
+FORECAST_STRATEGY = os.getenv("FORECAST_STRATEGY", "recursive")
+FORECAST_HORIZON = int(os.getenv("FORECAST_HORIZON", "5"))
+
+def get_model_factories() -> Dict[str, Callable[[], BaseModel]]:
+    """Return factories for every model in the registry; nothing is built until called"""
+    factories = {}
+    factories.update(get_river_model_factories())
+    factories.update(get_knn_model_factories())
+    factories.update(get_numpy_model_factories())
+    # Future: factories.update(get_sklearn_model_factories())
+    # Future: factories.update(get_vowpal_model_factories())
+    return factories
 
 class ModelManager:
-    def __init__(self):
+    def __init__(self, max_series=MAX_SERIES_MODELS, max_memory_mb=MAX_MODELS_MEMORY_MB, model_names=MODEL_NAMES,
+                 forecast_strategy=FORECAST_STRATEGY, forecast_horizon=FORECAST_HORIZON):
         model_name = os.getenv("MODEL_NAME", "linear_regression")
-        
-        # Get all available models
-        models = {}
-        models.update(get_river_models())
-        # Future: models.update(get_sklearn_models())
-        # Future: models.update(get_vowpal_models())
-        
-        self.model: BaseModel = models.get(model_name, models["linear_regression"])
+        if forecast_strategy not in ("recursive", "direct"):
+            raise ValueError(f"Unknown FORECAST_STRATEGY {forecast_strategy}. Available: ['recursive', 'direct']")
+        self.forecast_strategy = forecast_strategy
+        self.forecast_horizon = forecast_horizon
+
+        # Get all available model factories; only the selected models are built
+        factories = get_model_factories()
+
+        if model_names:
+            # Multi-model mode: first hosted model is the primary one
+            names = list(factories) if model_names == "all" else [name.strip() for name in model_names.split(",") if name.strip()]
+            unknown = [name for name in names if name not in factories]
+            if unknown or not names:
+                raise ValueError(f"Unknown models in MODEL_NAMES: {unknown}. Available: {list(factories)}")
+            model_name = names[0]
+        else:
+            if model_name not in factories:
+                model_name = "linear_regression"
+            names = [model_name]
+
+        # Untrained templates; every series gets its own clones on first use
+        self.model_factories = factories
+        self.templates = {name: self.build_model(name) for name in names}
+        self.model: BaseModel = self.templates[model_name]
         self.model_name = model_name
-        
-    def predict_learn(self, features, target):
+        self.model_names = names
+        self.multi_model = bool(model_names)
+
+        self.max_series = max_series
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.series_models: "OrderedDict[str, Dict[str, BaseModel]]" = OrderedDict()
+        self.evictions = 0
+        # Called with each evicted series_id, outside the registry lock, so per-series state elsewhere can follow
+        self.eviction_listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+
+    def build_model(self, name) -> BaseModel:
+        """Build an untrained registry model, wrapped for the configured forecast strategy"""
+        model = self.model_factories[name]()
+        if self.forecast_strategy == "direct":
+            model = DirectForecaster(model, self.forecast_horizon)
+        return model
+
+    def get_models(self, series_id="default") -> Dict[str, BaseModel]:
+        """Return all hosted models for a series, creating them lazily and evicting least recently used series"""
+        with self._lock:
+            models = self.series_models.get(series_id)
+            if models is not None:
+                self.series_models.move_to_end(series_id)
+                return models
+
+            models = {name: template.clone() for name, template in self.templates.items()}
+            self.series_models[series_id] = models
+            evicted = self._evict()
+        self._notify_evicted(evicted)
+        return models
+
+    def get_model(self, series_id="default") -> BaseModel:
+        """Return the primary model for a series"""
+        return self.get_models(series_id)[self.model_name]
+
+    def _evict(self):
+        """Drop least recently used series models until within the count/memory budget; returns evicted series ids"""
+        evicted = []
+        while len(self.series_models) > max(self.max_series, 1):
+            evicted.append(self.series_models.popitem(last=False)[0])
+            self.evictions += 1
+
+        if self.max_memory_bytes and len(self.series_models) > 1:
+            # Models grow as they learn, so estimate from the most recently used trained series
+            recent_series = reversed(self.series_models.values())
+            next(recent_series)
+            per_series_bytes = sum(model.memory_usage() for model in next(recent_series).values())
+            while len(self.series_models) > 1 and per_series_bytes * len(self.series_models) > self.max_memory_bytes:
+                evicted.append(self.series_models.popitem(last=False)[0])
+                self.evictions += 1
+        return evicted
+
+    def _notify_evicted(self, evicted):
+        for series_id in evicted:
+            for listener in self.eviction_listeners:
+                listener(series_id)
+
+    def is_hosted(self, series_id) -> bool:
+        """Whether the series currently has models in the registry"""
+        with self._lock:
+            return series_id in self.series_models
+
+    def hosted_series(self):
+        """Series ids with models in the registry, least recently used first"""
+        with self._lock:
+            return list(self.series_models)
+
+    def predict_learn(self, features, target, series_id="default"):
         """Predict then learn from target"""
-        return self.model.predict_learn(features, target)
-        
-    def predict_many(self, features, steps=5):
-        """Predict multiple steps ahead recursively"""
-        return self.model.predict_many(features, steps)
\ No newline at end of file
+        return self.get_model(series_id).predict_learn(features, target)
+
+    def predict_learn_many(self, features_list, targets, series_id="default"):
+        """Predict then learn over an ordered batch of observations"""
+        return self.get_model(series_id).predict_learn_many(features_list, targets)
+
+    def predict_many(self, features, steps=5, series_id="default"):
+        """Predict multiple steps ahead with the configured forecast strategy"""
+        return self.get_model(series_id).predict_many(features, steps)
+
+    def promote(self, model_name, template, series_models):
+        """Atomically replace the primary model with a trained candidate and its per-series models"""
+        if self.multi_model:
+            raise ValueError("Promotion is not supported in multi-model mode")
+        with self._lock:
+            self.templates = {model_name: template}
+            self.model = template
+            self.model_name = model_name
+            self.model_names = [model_name]
+            self.series_models = OrderedDict(
+                (series_id, {model_name: model}) for series_id, model in series_models.items()
+            )
+            evicted = self._evict()
+        self._notify_evicted(evicted)
+
+    def state_dict(self):
+        """Series models in LRU order for snapshots"""
+        with self._lock:
+            series_models = list(self.series_models.items())
+        return {"model_names": self.model_names, "forecast_strategy": self.forecast_strategy,
+                "forecast_horizon": self.forecast_horizon, "series_models": series_models}
+
+    def load_state_dict(self, state):
+        """Restore series models from state_dict() output; returns number of restored series"""
+        saved = (state["model_names"], state.get("forecast_strategy", "recursive"))
+        if saved != (self.model_names, self.forecast_strategy):
+            logger.warning(f"SNAPSHOT: Models {saved} do not match {(self.model_names, self.forecast_strategy)}, starting cold")
+            return 0
+        # Direct forecasters only predict the horizon they were built with
+        if self.forecast_strategy == "direct" and state.get("forecast_horizon") != self.forecast_horizon:
+            logger.warning(f"SNAPSHOT: Forecast horizon {state.get('forecast_horizon')} does not match "
+                           f"FORECAST_HORIZON={self.forecast_horizon}, starting cold")
+            return 0
+        with self._lock:
+            for series_id, model in state["series_models"]:
+                self.series_models[series_id] = model
+            evicted = self._evict()
+            restored = len(self.series_models)
+        self._notify_evicted(evicted)
+        return restored
+
+    def get_registry_info(self):
+        """Registry occupancy and eviction statistics"""
+        return {
+            "hosted_models": self.model_names,
+            "forecast_strategy": self.forecast_strategy,
+            "series_models": len(self.series_models),
+            "max_series_models": self.max_series,
+            "max_models_memory_mb": self.max_memory_bytes / (1024 * 1024),
+            "evictions": self.evictions
+        }
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+from base_model import BaseModel
+from feature_schema import forecast_recursive, get_schema
+from typing import Callable, Dict, List
+
+# Observations kept by the sliding-window KNN (River's default SWINN window is 1000 too)
+KNN_WINDOW_SIZE = int(os.getenv("KNN_WINDOW_SIZE", "1000"))
+
+class SlidingWindowKNNRegressor(BaseModel):
+    """Exact k-nearest-neighbour regression over a NumPy ring buffer of recent observations.
+
+    The window stores raw feature vectors. At query time the query and every
+    stored vector are standardized with the current running (Welford) mean
+    and variance, and the nearest neighbours' targets are averaged. This
+    differs from StandardScaler | KNNRegressor, which stores each vector
+    scaled with the statistics seen when it was learned, so the two pick
+    different neighbours while the feature distribution drifts. Standardizing
+    both sides by the same mean cancels it, so a query is one vectorized
+    distance pass over the window with inverse-std weights plus an
+    argpartition, instead of a Python loop over stored dicts. The feature
+    order is fixed by the first learned observation; keys missing later count
+    as 0.0 and new keys are ignored.
+    """
+
+    def __init__(self, n_neighbors: int = 5, window_size: int = KNN_WINDOW_SIZE,
+                 model_name: str = "sliding_knn_regressor"):
+        self.n_neighbors = n_neighbors
+        self.window_size = max(window_size, 1)
+        self.model_name = model_name
+        self.keys = None
+        self.X = None  # (window_size, n_features), allocated on first learn
+        self.y = np.zeros(self.window_size)
+        self.size = 0
+        self.head = 0  # Next slot to overwrite
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+        self.bump_version()
+
+    def clone(self) -> "SlidingWindowKNNRegressor":
+        return SlidingWindowKNNRegressor(self.n_neighbors, self.window_size, self.model_name)
+
+    def memory_usage(self) -> int:
+        arrays = (self.X, self.y, self.mean, self.m2)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def _to_array(self, features: Dict[str, float]) -> np.ndarray:
+        return np.fromiter((features.get(key, 0.0) for key in self.keys), dtype=np.float64, count=len(self.keys))
+
+    def learn_one(self, features: Dict[str, float], target: float) -> None:
+        if self.keys is None:
+            self.keys = get_schema(features).keys
+            self.X = np.zeros((self.window_size, len(self.keys)))
+            self.mean = np.zeros(len(self.keys))
+            self.m2 = np.zeros(len(self.keys))
+        x = self._to_array(features)
+
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+        self.X[self.head] = x
+        self.y[self.head] = target
+        self.head = (self.head + 1) % self.window_size
+        self.size = min(self.size + 1, self.window_size)
+        self.bump_version()
+
+    def predict_one(self, features: Dict[str, float]) -> float:
+        if not self.size:
+            return 0.0
+        x = self._to_array(features)
+
+        variance = self.m2 / self.count
+        inv_std = np.divide(1.0, np.sqrt(variance), out=np.zeros_like(variance), where=variance > 0)
+        diff = (self.X[:self.size] - x) * inv_std
+        distances = np.einsum("ij,ij->i", diff, diff)
+
+        nearest = int(np.argmin(distances))
+        if distances[nearest] == 0:
+            return float(self.y[nearest])  # Exact match, as River does
+        k = min(self.n_neighbors, self.size)
+        if k < self.size:
+            return float(self.y[np.argpartition(distances, k - 1)[:k]].mean())
+        return float(self.y[:self.size].mean())
+
+    def predict_learn(self, features: Dict[str, float], target: float) -> float:
+        """Predict then learn from target"""
+        prediction = self.predict_one(features)
+        self.learn_one(features, target)
+        return prediction
+
+    def predict_many(self, features: Dict[str, float], steps: int = 5) -> List[float]:
+        """Predict multiple steps ahead recursively"""
+        return forecast_recursive(self.predict_one, features, steps)
+
+def sliding_knn_regressor() -> BaseModel:
+    return SlidingWindowKNNRegressor(n_neighbors=5)
+
+def get_knn_model_factories() -> Dict[str, Callable[[], BaseModel]]:
+    """Return factories for the NumPy KNN models"""
+    return {"sliding_knn_regressor": sliding_knn_regressor}
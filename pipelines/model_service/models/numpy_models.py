@@ -0,0 +1,273 @@
+from abc import abstractmethod
+
+import numpy as np
+from base_model import BaseModel
+from feature_schema import forecast_recursive, get_schema
+from models.river_models import MINI_BATCH_SIZE
+from typing import Callable, Dict, List
+
+class NumpyLinearModel(BaseModel):
+    """Base for linear models on contiguous float64 state.
+
+    The feature order is fixed by the first learned observation (lags first,
+    see FeatureSchema); keys missing later count as 0.0 and new keys are
+    ignored. Subclasses implement array-level predict_batch/learn_batch (and
+    optionally single-row fast paths), and dicts are only converted at the
+    BaseModel boundary. Batches are predicted and learned MINI_BATCH_SIZE rows
+    at a time, like the River mini-batch path.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.keys = None
+        self.bump_version()
+
+    @abstractmethod
+    def _init_state(self, n_features: int) -> None:
+        """Allocate the arrays for n_features inputs"""
+        pass
+
+    def _to_array(self, features: Dict[str, float]) -> np.ndarray:
+        return np.fromiter((features.get(key, 0.0) for key in self.keys), dtype=np.float64, count=len(self.keys))
+
+    def _ensure_state(self, features: Dict[str, float]) -> None:
+        if self.keys is None:
+            self.keys = get_schema(features).keys
+            self._init_state(len(self.keys))
+
+    def _to_matrix(self, features_list: List[Dict[str, float]]) -> np.ndarray:
+        self._ensure_state(features_list[0])
+        return np.array([[features.get(key, 0.0) for key in self.keys] for features in features_list], dtype=np.float64)
+
+    @abstractmethod
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        """Predict every row of X"""
+        pass
+
+    @abstractmethod
+    def learn_batch(self, X: np.ndarray, y: np.ndarray) -> None:
+        """Learn the rows of X in order"""
+        pass
+
+    def _predict_vector(self, x: np.ndarray) -> float:
+        return self.predict_batch(x[None, :])[0]
+
+    def _learn_vector(self, x: np.ndarray, target: float) -> None:
+        self.learn_batch(x[None, :], np.array([target], dtype=np.float64))
+
+    def learn_one(self, features: Dict[str, float], target: float) -> None:
+        self._ensure_state(features)
+        self._learn_vector(self._to_array(features), target)
+        self.bump_version()
+
+    def predict_one(self, features: Dict[str, float]) -> float:
+        if self.keys is None:
+            return 0.0
+        return float(self._predict_vector(self._to_array(features)))
+
+    def predict_learn(self, features: Dict[str, float], target: float) -> float:
+        """Predict then learn from target, converting the features once"""
+        self._ensure_state(features)
+        x = self._to_array(features)
+        prediction = float(self._predict_vector(x))
+        self._learn_vector(x, target)
+        self.bump_version()
+        return prediction
+
+    def predict_learn_many(self, features_list: List[Dict[str, float]], targets: List[float]) -> List[float]:
+        """Predict then learn over an ordered batch, one matrix operation per mini-batch"""
+        if not features_list:
+            return []
+        X = self._to_matrix(features_list)
+        y = np.asarray(targets, dtype=np.float64)
+        predictions = []
+        for start in range(0, len(y), MINI_BATCH_SIZE):
+            chunk = slice(start, start + MINI_BATCH_SIZE)
+            predictions.extend(self.predict_batch(X[chunk]).tolist())
+            self.learn_batch(X[chunk], y[chunk])
+        self.bump_version()
+        return predictions
+
+    def predict_many(self, features: Dict[str, float], steps: int = 5) -> List[float]:
+        """Predict multiple steps ahead recursively"""
+        return forecast_recursive(self.predict_one, features, steps)
+
+    def memory_usage(self) -> int:
+        return sum(value.nbytes for value in self.__dict__.values() if isinstance(value, np.ndarray))
+
+def _with_intercept(X: np.ndarray) -> np.ndarray:
+    return np.hstack([X, np.ones((len(X), 1))])
+
+class RecursiveLeastSquares(NumpyLinearModel):
+    """Exact online least squares with an optional forgetting factor.
+
+    Without forgetting, a batch is applied in one block update through the
+    Woodbury identity, which equals learning its rows one by one.
+    """
+
+    def __init__(self, forgetting: float = 1.0, delta: float = 1000.0, model_name: str = "rls_regressor"):
+        self.forgetting = forgetting
+        self.delta = delta
+        self.weights = None
+        self.P = None  # Inverse covariance estimate
+        super().__init__(model_name)
+
+    def clone(self) -> "RecursiveLeastSquares":
+        return RecursiveLeastSquares(self.forgetting, self.delta, self.model_name)
+
+    def _init_state(self, n_features: int) -> None:
+        self.weights = np.zeros(n_features + 1)
+        self.P = np.eye(n_features + 1) * self.delta
+
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        if self.weights is None:
+            return np.zeros(len(X))
+        return X @ self.weights[:-1] + self.weights[-1]
+
+    def _predict_vector(self, x: np.ndarray) -> float:
+        return x @ self.weights[:-1] + self.weights[-1]
+
+    def _learn_vector(self, x: np.ndarray, target: float) -> None:
+        x = np.append(x, 1.0)
+        Px = self.P @ x
+        gain = Px / (self.forgetting + x @ Px)
+        self.weights += gain * (target - x @ self.weights)
+        self.P -= np.outer(gain, Px)
+        if self.forgetting != 1.0:
+            self.P /= self.forgetting
+
+    def learn_batch(self, X: np.ndarray, y: np.ndarray) -> None:
+        if self.forgetting != 1.0:
+            for x, target in zip(X, y):
+                self._learn_vector(x, target)
+            return
+        X = _with_intercept(X)
+        PXt = self.P @ X.T
+        gain = np.linalg.solve(np.eye(len(X)) + X @ PXt, PXt.T).T
+        self.weights += gain @ (y - X @ self.weights)
+        self.P -= gain @ PXt.T
+
+class OnlineRidge(NumpyLinearModel):
+    """Exact ridge regression from running sufficient statistics X'X and X'y"""
+
+    def __init__(self, alpha: float = 1.0, model_name: str = "ridge_regressor"):
+        self.alpha = alpha
+        self.XtX = None
+        self.Xty = None
+        self.weights = None  # Solved lazily after learning
+        super().__init__(model_name)
+
+    def clone(self) -> "OnlineRidge":
+        return OnlineRidge(self.alpha, self.model_name)
+
+    def _init_state(self, n_features: int) -> None:
+        self.XtX = np.eye(n_features + 1) * self.alpha
+        self.XtX[-1, -1] = 0.0  # Intercept is not penalized
+        self.Xty = np.zeros(n_features + 1)
+
+    def _solve(self) -> np.ndarray:
+        if self.weights is None:
+            try:
+                self.weights = np.linalg.solve(self.XtX, self.Xty)
+            except np.linalg.LinAlgError:  # No observations yet for the unpenalized intercept
+                self.weights = np.linalg.lstsq(self.XtX, self.Xty, rcond=None)[0]
+        return self.weights
+
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        if self.XtX is None:
+            return np.zeros(len(X))
+        weights = self._solve()
+        return X @ weights[:-1] + weights[-1]
+
+    def _predict_vector(self, x: np.ndarray) -> float:
+        weights = self._solve()
+        return x @ weights[:-1] + weights[-1]
+
+    def _learn_vector(self, x: np.ndarray, target: float) -> None:
+        x = np.append(x, 1.0)
+        self.XtX += np.outer(x, x)
+        self.Xty += target * x
+        self.weights = None
+
+    def learn_batch(self, X: np.ndarray, y: np.ndarray) -> None:
+        X = _with_intercept(X)
+        self.XtX += X.T @ X
+        self.Xty += X.T @ y
+        self.weights = None
+
+class SGDRegressor(NumpyLinearModel):
+    """Linear regression by (mini-batch) SGD on running-standardized features"""
+
+    def __init__(self, learning_rate: float = 0.01, l2: float = 0.0, model_name: str = "sgd_regressor"):
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights = None
+        self.intercept = 0.0
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+        super().__init__(model_name)
+
+    def clone(self) -> "SGDRegressor":
+        return SGDRegressor(self.learning_rate, self.l2, self.model_name)
+
+    def _init_state(self, n_features: int) -> None:
+        self.weights = np.zeros(n_features)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        variance = self.m2 / max(self.count, 1)
+        inv_std = np.divide(1.0, np.sqrt(variance), out=np.zeros_like(variance), where=variance > 0)
+        return (X - self.mean) * inv_std
+
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        if self.weights is None:
+            return np.zeros(len(X))
+        return self._scale(X) @ self.weights + self.intercept
+
+    def _predict_vector(self, x: np.ndarray) -> float:
+        return self._scale(x) @ self.weights + self.intercept
+
+    def _learn_vector(self, x: np.ndarray, target: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+        xs = self._scale(x)
+        error = xs @ self.weights + self.intercept - target
+        self.weights -= self.learning_rate * (error * xs + self.l2 * self.weights)
+        self.intercept -= self.learning_rate * error
+
+    def learn_batch(self, X: np.ndarray, y: np.ndarray) -> None:
+        # Chan et al. parallel update of the running mean/variance with the batch's
+        n = len(X)
+        batch_mean = X.mean(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.m2 += ((X - batch_mean) ** 2).sum(axis=0) + delta ** 2 * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+        Xs = self._scale(X)
+        errors = Xs @ self.weights + self.intercept - y
+        self.weights -= self.learning_rate * (Xs.T @ errors / n + self.l2 * self.weights)
+        self.intercept -= self.learning_rate * errors.mean()
+
+def rls_regressor() -> BaseModel:
+    return RecursiveLeastSquares()
+
+def ridge_regressor() -> BaseModel:
+    return OnlineRidge(alpha=1.0)
+
+def sgd_regressor() -> BaseModel:
+    return SGDRegressor(learning_rate=0.01)
+
+def get_numpy_model_factories() -> Dict[str, Callable[[], BaseModel]]:
+    """Return factories for the NumPy linear models"""
+    return {
+        "rls_regressor": rls_regressor,
+        "ridge_regressor": ridge_regressor,
+        "sgd_regressor": sgd_regressor
+    }
@@ -0,0 +1,57 @@
+import threading
+
+def _escape(value) -> str:
+    """Escape a label value for the Prometheus text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class MetricFamily:
+    """One metric name with pre-rendered HELP/TYPE header and its current samples"""
+
+    def __init__(self, name, help_text, metric_type="gauge"):
+        self.name = name
+        self.header = f"# HELP {name} {help_text}\n# TYPE {name} {metric_type}\n"
+        self.samples = []
+
+    def add(self, value, suffix="", **labels):
+        """Add a sample; suffix is for histogram/summary series like _bucket, _sum and _count"""
+        label_str = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        self.samples.append(f"{self.name}{suffix}{{{label_str}}} {value}\n")
+
+    def render(self) -> str:
+        return self.header + "".join(self.samples)
+
+class PrometheusExporter:
+    """Registry-style Prometheus exposition that renders once per state change.
+
+    `render(state_key, collect)` only calls `collect` when `state_key` differs
+    from the previous render (the dirty check); otherwise the cached bytes are
+    served as-is. Families are grouped so each HELP/TYPE header appears once.
+    """
+
+    def __init__(self):
+        self.families = {}
+        self.renders = 0
+        self._cached_key = None
+        self._cached_body = b""
+        self._lock = threading.Lock()
+
+    def register(self, name, help_text, metric_type="gauge") -> MetricFamily:
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(name, help_text, metric_type)
+        return family
+
+    def render(self, state_key, collect) -> bytes:
+        with self._lock:
+            if self._cached_key is not None and state_key == self._cached_key:
+                return self._cached_body
+
+            for family in self.families.values():
+                family.samples.clear()
+            collect()
+
+            body = "".join(family.render() for family in self.families.values() if family.samples)
+            self._cached_body = (body or "# No predictions available yet\n").encode()
+            self._cached_key = state_key
+            self.renders += 1
+            return self._cached_body
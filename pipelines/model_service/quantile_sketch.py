@@ -0,0 +1,106 @@
+import math
+import os
+import numpy as np
+
+# t-digest size/accuracy trade-off: at most ~compression centroids per sketch
+QUANTILE_COMPRESSION = float(os.getenv("QUANTILE_COMPRESSION", "100"))
+# Observations after which an error's weight halves (0 disables decay)
+QUANTILE_HALF_LIFE = float(os.getenv("QUANTILE_HALF_LIFE", "0"))
+
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) with optional exponential decay.
+
+    Values are buffered and merged into at most ~compression centroids when
+    the buffer fills, so memory is bounded and updates cost O(log n)
+    amortized (a sort per merge). Centroids are small near the tails, which
+    keeps p99-style quantiles accurate. With a half-life, existing weight is
+    scaled by 0.5 ** (new observations / half_life) at each merge, so the
+    quantiles follow recent behaviour. `count` and `sum` never decay, since
+    Prometheus summaries require monotonic _count and _sum.
+
+    Only add() mutates the sketch; readers merge a copy of the buffer, so
+    quantiles can be read while another thread adds.
+    """
+
+    __slots__ = ("compression", "decay", "centroids", "buffer", "count", "sum")
+
+    def __init__(self, compression=QUANTILE_COMPRESSION, half_life=QUANTILE_HALF_LIFE):
+        self.compression = compression
+        self.decay = 0.5 ** (1 / half_life) if half_life > 0 else 1.0  # Per observation
+        self.centroids = (np.empty(0), np.empty(0))  # (means, weights), swapped as one
+        self.buffer = []
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value):
+        self.buffer.append(value)
+        self.count += 1
+        self.sum += value
+        if len(self.buffer) >= self.compression:
+            self.centroids = self._merge(self.buffer)
+            self.buffer = []
+
+    def _k_limit(self, q):
+        """Next quantile boundary under the k1 scale function"""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _merge(self, buffer):
+        """Return centroids with buffered values merged in"""
+        means, weights = self.centroids
+        if not buffer:
+            return means, weights
+        if self.decay < 1.0:
+            weights = weights * self.decay ** len(buffer)
+        means = np.concatenate([means, buffer])
+        weights = np.concatenate([weights, np.ones(len(buffer))])
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order].tolist(), weights[order].tolist()
+        total = sum(weights)
+
+        merged_means, merged_weights = [means[0]], [weights[0]]
+        weight_so_far = 0.0
+        q_limit = self._k_limit(0.0)
+        for mean, weight in zip(means[1:], weights[1:]):
+            if (weight_so_far + merged_weights[-1] + weight) / total <= q_limit:
+                merged_weights[-1] += weight
+                merged_means[-1] += (mean - merged_means[-1]) * weight / merged_weights[-1]
+            else:
+                weight_so_far += merged_weights[-1]
+                q_limit = self._k_limit(min(weight_so_far / total, 1.0))
+                merged_means.append(mean)
+                merged_weights.append(weight)
+
+        return np.array(merged_means), np.array(merged_weights)
+
+    def quantiles(self, qs):
+        """Estimate several quantiles (0 <= q <= 1) in one pass; 0.0 when empty"""
+        return self.summary(qs)[0]
+
+    def summary(self, qs):
+        """(quantiles, count, sum) from one read, so all three describe the same observations"""
+        buffer, count, total = list(self.buffer), self.count, self.sum
+        means, weights = self._merge(buffer)
+        if len(means) == 0:
+            return [0.0] * len(qs), count, total
+        if len(means) == 1:
+            return [float(means[0])] * len(qs), count, total
+        # Interpolate between centroid centres on the cumulative weight axis
+        centres = np.cumsum(weights) - weights / 2
+        return np.interp(np.asarray(qs) * weights.sum(), centres, means).tolist(), count, total
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def state_dict(self):
+        means, weights = self._merge(list(self.buffer))
+        return {"means": means.tolist(), "weights": weights.tolist(), "count": self.count, "sum": self.sum}
+
+    def load_state_dict(self, state):
+        self.centroids = (np.array(state["means"], dtype=np.float64), np.array(state["weights"], dtype=np.float64))
+        self.buffer = []
+        self.count = state["count"]
+        self.sum = state["sum"]
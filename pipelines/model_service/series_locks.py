@@ -0,0 +1,78 @@
+import threading
+from contextlib import contextmanager
+
+class _SeriesLock:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.depth = 0  # Holder plus waiters
+
+class SeriesLocks:
+    """Per-series mutual exclusion for model and metrics mutations.
+
+    Requests for the same series run one at a time, so predict/learn and
+    metrics updates never interleave, while different series proceed in
+    parallel on the server's threadpool. Locks exist only while a series has
+    requests in flight, so memory is bounded by concurrency, not series count.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._idle = threading.Condition(self._guard)
+        self._exclusive = False
+        self.waits_total = 0
+
+    @contextmanager
+    def hold(self, series_id):
+        with self._guard:
+            while self._exclusive:
+                self._idle.wait()
+            entry = self._locks.get(series_id)
+            if entry is None:
+                entry = self._locks[series_id] = _SeriesLock()
+            entry.depth += 1
+            if entry.depth > 1:
+                self.waits_total += 1
+
+        entry.lock.acquire()
+        try:
+            yield
+        finally:
+            entry.lock.release()
+            with self._guard:
+                entry.depth -= 1
+                if entry.depth == 0:
+                    del self._locks[series_id]
+                    self._idle.notify_all()
+
+    @contextmanager
+    def hold_all(self):
+        """Exclusive over every series: waits for in-flight holders and keeps new ones out.
+
+        Holding a series lock while entering hold_all deadlocks.
+        """
+        with self._guard:
+            while self._exclusive:
+                self._idle.wait()
+            self._exclusive = True
+            while self._locks:
+                self._idle.wait()
+        try:
+            yield
+        finally:
+            with self._guard:
+                self._exclusive = False
+                self._idle.notify_all()
+
+    def stats(self):
+        """Current queue depths and contention counters"""
+        with self._guard:
+            depths = [entry.depth for entry in self._locks.values()]
+            return {
+                "series_active": len(depths),
+                "series_queue_depth": sum(depths) - len(depths),  # Waiting behind a holder
+                "series_queue_depth_max": max(depths, default=0),
+                "series_lock_waits_total": self.waits_total
+            }
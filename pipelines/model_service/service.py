@@ -1,10 +1,21 @@
 import logging
 import os
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import threading
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel, Field
 from typing import Dict, List
 from model_manager import ModelManager
-from metrics_manager import MetricsManager
+from metrics_manager import MetricsManager, ROLLING_WINDOW_SIZES, ERROR_QUANTILES
+from prometheus_exporter import PrometheusExporter
+from snapshot_manager import SnapshotManager
+from series_locks import SeriesLocks
+from micro_batcher import MicroBatcher, MICRO_BATCH_WINDOW_MS
+from starlette.concurrency import run_in_threadpool
+from wire_format import WireFormatRoute, WireResponse
+from shadow_evaluator import ShadowEvaluator
+from write_behind import WriteBehindLearner, LearnQueueFull, LEARN_MODE
+from forecast_cache import ForecastCache
+from latency_histograms import LatencyRecorder, LatencyMiddleware
 
 
 logging.basicConfig(
@@ -15,57 +26,284 @@ logging.basicConfig(
     ]
 )
 
-app = FastAPI(title="Online-ML")
+app = FastAPI(title="Online-ML", default_response_class=WireResponse)
+app.router.route_class = WireFormatRoute
+
+# Latency histograms per endpoint and per model operation
+latency = LatencyRecorder()
+OPERATION_LATENCY = "ml_model_operation_duration_seconds"
+latency.register(OPERATION_LATENCY, "Model operation latency in seconds")
+app.add_middleware(LatencyMiddleware, recorder=latency)
 
 
 
 # Models
 model_manager = ModelManager()
-metrics_manager = MetricsManager()
+metrics_managers = {name: MetricsManager() for name in model_manager.model_names}
+series_locks = SeriesLocks()
+
+def _evict_series_metrics(series_id):
+    """Evicted series leave the metrics too, bounding memory and /metrics label cardinality"""
+    for manager in list(metrics_managers.values()):
+        manager.remove_series(series_id)
+
+model_manager.eviction_listeners.append(_evict_series_metrics)
+
+def _forget_if_evicted(series_id):
+    """Call holding the series lock after recording metrics: a request in flight while its series was
+    evicted may have re-added metrics after the listener removed them"""
+    if not model_manager.is_hosted(series_id):
+        _evict_series_metrics(series_id)
+
+snapshot_manager = SnapshotManager(model_manager, metrics_managers, series_locks=series_locks)
+forecast_cache = ForecastCache()
+
+# Shadow candidate learning from the live stream (set through the admin API)
+shadow = None
+shadow_lock = threading.Lock()
+
+# Write-behind learning: one background learner per model name, created on first use
+learners = {}
+learners_lock = threading.Lock()
+
+# Prometheus exposition
+ROLLING_METRICS = ["mae", "mse", "rmse", "mape"]
+exporter = PrometheusExporter()
+for size in ROLLING_WINDOW_SIZES:
+    for base_metric in ROLLING_METRICS:
+        exporter.register(f"ml_model_{base_metric}_{size}", f"{base_metric.upper()} over {size} predictions")
+PREDICTIONS_TOTAL = exporter.register("ml_model_predictions_total", "Total number of model learning operations", "counter")
+LAST_PREDICTION = exporter.register("ml_model_last_prediction", "Last prediction value")
+LAST_ACTUAL = exporter.register("ml_model_last_actual", "Last actual value")
+LAST_ERROR = exporter.register("ml_model_last_error", "Last prediction error")
+FORECAST = exporter.register("ml_model_forecast", "Last multi-step forecast value per step ahead")
+ERROR_SUMMARIES = {
+    "abs_error": exporter.register("ml_model_abs_error", "Absolute prediction error quantiles (t-digest)", "summary"),
+    "ape": exporter.register("ml_model_ape", "Absolute percentage prediction error quantiles (t-digest)", "summary")
+}
+for stat_name in snapshot_manager.stats:
+    exporter.register(
+        f"ml_model_{stat_name}", f"Model state snapshot {stat_name.replace('_', ' ')}",
+        "counter" if stat_name.endswith("_total") else "gauge"
+    )
+# Live gauges that change without learning (rendered separately so the main body stays cached)
+runtime_exporter = PrometheusExporter()
+latency_exporter = PrometheusExporter()
+
+# Upper bound on forecast steps per request
+MAX_FORECAST_STEPS = 100
 
 class PredictRequest(BaseModel):
     features: Dict[str, float]
+    series_id: str = "default"
+    steps: int = Field(5, ge=1, le=MAX_FORECAST_STEPS)
 
 class PredictLearnRequest(BaseModel):
     features: Dict[str, float]
     target: float
+    series_id: str = "default"
+
+class Observation(BaseModel):
+    features: Dict[str, float]
+    target: float
+
+class PredictLearnBatchRequest(BaseModel):
+    observations: List[Observation]
+    series_id: str = "default"
+
+class ShadowRequest(BaseModel):
+    model_name: str
 
 @app.get("/health")
-def health():
+def health(response: Response):
+    if not snapshot_manager.ready:
+        response.status_code = 503
+        return {"status": "restoring", "model_loaded": model_manager.model is not None}
     return {"status": "ok", "model_loaded": model_manager.model is not None}
 
 
 
 
 
+def _fan_out(series_id, fn, after=None):
+    """Run fn(name, model) for every hosted model of a series under its lock; returns (results, errors)"""
+    results, errors = {}, {}
+    with series_locks.hold(series_id):
+        for name, model in model_manager.get_models(series_id).items():
+            try:
+                results[name] = fn(name, model)
+            except Exception as e:
+                if not model_manager.multi_model:
+                    raise
+                errors[name] = str(e)
+        if after is not None:
+            after()
+        _forget_if_evicted(series_id)
+    return results, errors
+
+def _get_learner(name):
+    learner = learners.get(name)
+    if learner is None:
+        with learners_lock:
+            learner = learners.get(name)
+            if learner is None:
+                learner = learners[name] = WriteBehindLearner(name, series_locks, latency=latency)
+    return learner
+
+def stop_learners():
+    """Learn every queued update before shutdown"""
+    for learner in list(learners.values()):
+        learner.stop()
+
+def _predict_learn_group(series_id, requests):
+    """Predict then learn for ordered same-series requests under one lock; one response or exception each"""
+    predictions = [{} for _ in requests]
+    errors = [{} for _ in requests]
+    write_behind = LEARN_MODE == "write_behind"
+    if write_behind:
+        # Backpressure waits happen before the series lock, which the learners need
+        for name in model_manager.model_names:
+            _get_learner(name).wait_for_room()
+    
+    with series_locks.hold(series_id):
+        for name, model in model_manager.get_models(series_id).items():
+            manager = metrics_managers.get(name)  # None if the model was replaced by a promotion meanwhile
+            learner = _get_learner(name) if write_behind else None
+            for request, request_predictions, request_errors in zip(requests, predictions, errors):
+                try:
+                    if learner is None:
+                        with latency.time(OPERATION_LATENCY, model=name, operation="predict_learn"):
+                            pred = model.predict_learn(request.features, request.target)
+                    else:
+                        with latency.time(OPERATION_LATENCY, model=name, operation="predict_one"):
+                            pred = model.predict_one(request.features)
+                        learner.submit(series_id, model, request.features, request.target)
+                    if manager is not None:
+                        manager.add(series_id, request.target, pred)
+                    request_predictions[name] = pred
+                except Exception as e:
+                    request_errors[name] = e
+        
+        candidate = shadow
+        if candidate is not None:
+            for request in requests:
+                candidate.observe(series_id, request.features, request.target)
+        _forget_if_evicted(series_id)
+        
+        responses = []
+        for request_predictions, request_errors in zip(predictions, errors):
+            if not model_manager.multi_model:
+                if request_errors:
+                    error = request_errors[model_manager.model_name]
+                    status_code = 503 if isinstance(error, LearnQueueFull) else 500
+                    responses.append(HTTPException(status_code=status_code, detail=str(error)))
+                else:
+                    responses.append({"prediction": request_predictions[model_manager.model_name]})
+                continue
+            responses.append({
+                "prediction": request_predictions.get(model_manager.model_name),
+                "predictions": request_predictions,
+                "metrics": {name: metrics_managers[name].get_series_metrics(series_id) for name in request_predictions},
+                "errors": {name: str(error) for name, error in request_errors.items()}
+            })
+        return responses
+
+def _predict_learn_micro_batch(requests):
+    """Execute a micro-batch in arrival order, grouping consecutive same-series requests"""
+    responses = []
+    start = 0
+    while start < len(requests):
+        end = start + 1
+        while end < len(requests) and requests[end].series_id == requests[start].series_id:
+            end += 1
+        try:
+            responses.extend(_predict_learn_group(requests[start].series_id, requests[start:end]))
+        except Exception as e:
+            responses.extend([HTTPException(status_code=500, detail=str(e))] * (end - start))
+        start = end
+    return responses
+
+def _predict_learn(request):
+    response = _predict_learn_micro_batch([request])[0]
+    if isinstance(response, Exception):
+        raise response
+    return response
+
+micro_batcher = MicroBatcher(_predict_learn_micro_batch, key=lambda request: request.series_id) if MICRO_BATCH_WINDOW_MS > 0 else None
+
 @app.post("/predict_learn")
-def predict_learn(request: PredictLearnRequest):
+async def predict_learn(request: PredictLearnRequest):
     """Predict then learn from target"""
+    if micro_batcher is not None:
+        return await micro_batcher.submit(request)
+    return await run_in_threadpool(_predict_learn, request)
+
+@app.post("/predict_learn_batch")
+def predict_learn_batch(request: PredictLearnBatchRequest):
+    """Predict then learn over an ordered batch of observations"""
     try:
-        pred = model_manager.predict_learn(request.features, request.target)
-        metrics_manager.add("default", request.target, pred)
-        return {"prediction": pred}
+        features_list = [obs.features for obs in request.observations]
+        targets = [obs.target for obs in request.observations]
+        
+        def run(name, model):
+            learner = learners.get(name)
+            if learner is not None:
+                # Deferred single updates of this series must be learned before the batch to keep its order
+                learner.drain_series(request.series_id)
+            with latency.time(OPERATION_LATENCY, model=name, operation="predict_learn_many"):
+                predictions = model.predict_learn_many(features_list, targets)
+            manager = metrics_managers.get(name)
+            if manager is not None:
+                manager.add_many(request.series_id, targets, predictions)
+            return predictions
+        
+        def observe():
+            candidate = shadow
+            if candidate is not None:
+                for features, target in zip(features_list, targets):
+                    candidate.observe(request.series_id, features, target)
+        
+        model_predictions, errors = _fan_out(request.series_id, run, observe)
+        predictions = model_predictions.get(model_manager.model_name, [])
+        if not model_manager.multi_model:
+            return {"predictions": predictions, "count": len(predictions)}
+        return {"predictions": predictions, "count": len(targets), "model_predictions": model_predictions, "errors": errors}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict_many")
 def predict_many(request: PredictRequest):
-    """Predict 5 steps ahead recursively"""
+    """Predict `steps` ahead with the configured forecast strategy (recursive or direct)"""
+    if model_manager.forecast_strategy == "direct" and request.steps > model_manager.forecast_horizon:
+        raise HTTPException(
+            status_code=400,
+            detail=f"steps must be at most FORECAST_HORIZON ({model_manager.forecast_horizon}) for direct forecasts"
+        )
     try:
-        predictions = model_manager.predict_many(request.features, steps=5)
-        forecast = [{"step": i+1, "value": round(pred, 6)} for i, pred in enumerate(predictions)]
-        
-        # Track predict_many usage in metrics
-        metrics_manager.add_predict_many("default", [pred for pred in predictions])
+        def run(name, model):
+            def forecast(features, steps):
+                # Only cache misses run (and time) the model
+                with latency.time(OPERATION_LATENCY, model=name, operation="predict_many"):
+                    return model.predict_many(features, steps)
+            
+            predictions = forecast_cache.get_or_compute(model, request.features, request.steps, forecast)
+            # Track predict_many usage in metrics
+            manager = metrics_managers.get(name)
+            if manager is not None:
+                manager.add_predict_many(request.series_id, [pred for pred in predictions])
+            return [{"step": i+1, "value": round(pred, 6)} for i, pred in enumerate(predictions)]
         
-        return {"forecast": forecast}
+        forecasts, errors = _fan_out(request.series_id, run)
+        if not model_manager.multi_model:
+            return {"forecast": forecasts[model_manager.model_name]}
+        return {"forecast": forecasts.get(model_manager.model_name, []), "forecasts": forecasts, "errors": errors}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/model_metrics")
 def model_metrics():
     """Get comprehensive model performance metrics and statistics"""
-    metrics_data = metrics_manager.get_metrics()
+    metrics_data = metrics_managers[model_manager.model_name].get_metrics()
     
     # Add River model information
     try:
@@ -73,6 +311,7 @@ def model_metrics():
             "model_type": str(type(model_manager.model).__name__),
             "model_name": model_manager.model_name,
             "model_str": str(model_manager.model)[:200],
+            "registry": model_manager.get_registry_info(),
         }
         
         # Try to get model attributes safely
@@ -99,53 +338,162 @@ def model_metrics():
     if isinstance(metrics_data, dict) and "message" not in metrics_data:
         metrics_data["model_info"] = model_info
     elif isinstance(metrics_data, dict) and "message" in metrics_data:
-        return {"message": metrics_data["message"], "model_info": model_info}
+        metrics_data = {"message": metrics_data["message"], "model_info": model_info}
+    
+    # Multi-model mode: per-model metrics alongside the primary model's
+    if model_manager.multi_model:
+        metrics_data["models"] = {name: manager.get_metrics() for name, manager in metrics_managers.items()}
+    
+    candidate = shadow
+    if candidate is not None:
+        metrics_data["shadow"] = candidate.get_info()
     
     return metrics_data
 
-@app.get("/metrics")
-def prometheus_metrics():
-    """Prometheus-compatible metrics endpoint"""
-    metrics_data = metrics_manager.get_metrics()
+@app.post("/admin/shadow")
+def start_shadow(request: ShadowRequest):
+    """Start training a candidate model in the background on the live predict_learn stream"""
+    global shadow
+    if model_manager.multi_model:
+        raise HTTPException(status_code=409, detail="Multi-model mode already evaluates every hosted model")
+    if request.model_name not in model_manager.model_factories:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown model {request.model_name}. Available: {list(model_manager.model_factories)}"
+        )
     
-    if "message" in metrics_data:
-        return "# No predictions available yet\n", {"Content-Type": "text/plain"}
+    with shadow_lock:
+        previous = shadow
+        shadow = ShadowEvaluator(request.model_name, model_manager.build_model(request.model_name), model_manager.max_series)
+    if previous is not None:
+        previous.stop()
+    return shadow_status()
+
+@app.get("/admin/shadow")
+def shadow_status():
+    """Shadow candidate status with its metrics next to the live model's"""
+    candidate = shadow
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="No shadow model registered")
+    return {
+        "live": {"model_name": model_manager.model_name, "metrics": metrics_managers[model_manager.model_name].get_metrics()},
+        "shadow": candidate.get_info()
+    }
+
+@app.delete("/admin/shadow")
+def stop_shadow():
+    """Discard the shadow candidate"""
+    global shadow
+    with shadow_lock:
+        candidate, shadow = shadow, None
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="No shadow model registered")
+    candidate.stop()
+    return {"status": "stopped", "model_name": candidate.model_name}
+
+@app.post("/admin/promote")
+def promote_shadow():
+    """Make the shadow candidate the live model, keeping its per-series state and metrics"""
+    global shadow
+    with shadow_lock:
+        candidate = shadow
+        if candidate is None:
+            raise HTTPException(status_code=404, detail="No shadow model registered")
+        
+        # Learn the backlog while traffic flows, so the pause below only covers what arrives meanwhile
+        candidate.join()
+        # With every series idle, each observation either reached the candidate's queue or comes after the swap
+        with series_locks.hold_all():
+            shadow = None
+            # Learn the remainder, then swap models and metrics in one step
+            candidate.stop()
+            previous_name = model_manager.model_name
+            metrics_managers[candidate.model_name] = candidate.metrics_manager
+            model_manager.promote(candidate.model_name, candidate.template, candidate.series_models)
+            if previous_name != candidate.model_name:
+                del metrics_managers[previous_name]
     
-    prometheus_output = []
+    logging.info(f"Promoted shadow model {candidate.model_name} (replacing {previous_name})")
+    return {"status": "promoted", "model_name": candidate.model_name, "previous_model_name": previous_name}
+
+def _collect_prometheus_metrics():
+    """Fill exporter families from current metrics and snapshot state"""
+    model_name = model_manager.model_name
     
-    for series_id, data in metrics_data.items():
-        # Model performance metrics
-        # Rolling metrics for each window size
-        for metric_name, value in data.items():
-            if metric_name.endswith(('_5', '_10', '_20')):
-                base_metric = metric_name.rsplit('_', 1)[0]
-                window_size = metric_name.rsplit('_', 1)[1]
-                prometheus_output.append(f"# HELP ml_model_{metric_name} {base_metric.upper()} over {window_size} predictions")
-                prometheus_output.append(f"# TYPE ml_model_{metric_name} gauge")
-                prometheus_output.append(f'ml_model_{metric_name}{{series="{series_id}",model="{model_manager.model_name}"}} {value}')
-        
-        prometheus_output.append(f"# HELP ml_model_predictions_total Total number of model learning operations")
-        prometheus_output.append(f"# TYPE ml_model_predictions_total counter")
-        prometheus_output.append(f'ml_model_predictions_total{{series="{series_id}",model="{model_manager.model_name}"}} {data.get("count", 0)}')
-        
-        prometheus_output.append(f"# HELP ml_model_last_prediction Last prediction value")
-        prometheus_output.append(f"# TYPE ml_model_last_prediction gauge")
-        prometheus_output.append(f'ml_model_last_prediction{{series="{series_id}",model="{model_manager.model_name}"}} {data.get("last_prediction", 0)}')
-        
-        prometheus_output.append(f"# HELP ml_model_last_actual Last actual value")
-        prometheus_output.append(f"# TYPE ml_model_last_actual gauge")
-        prometheus_output.append(f'ml_model_last_actual{{series="{series_id}",model="{model_manager.model_name}"}} {data.get("last_actual", 0)}')
-        
-        prometheus_output.append(f"# HELP ml_model_last_error Last prediction error")
-        prometheus_output.append(f"# TYPE ml_model_last_error gauge")
-        prometheus_output.append(f'ml_model_last_error{{series="{series_id}",model="{model_manager.model_name}"}} {data.get("last_error", 0)}')
+    sources = [(hosted_name, manager, {}) for hosted_name, manager in list(metrics_managers.items())]
+    candidate = shadow
+    if candidate is not None:
+        sources.append((candidate.model_name, candidate.metrics_manager, {"role": "shadow"}))
+    
+    for hosted_name, manager, extra_labels in sources:
+        metrics_data = manager.get_metrics()
+        if "message" in metrics_data:
+            continue
         
-        # Forecast metrics - all 5 steps as comma-separated values
-        if "forecast" in data:
-            forecast_values = ",".join([str(val) for val in data["forecast"]])
-            prometheus_output.append(f"# HELP ml_model_forecast_steps 5-step forecast values (comma-separated)")
-            prometheus_output.append(f"# TYPE ml_model_forecast_steps gauge")
-            prometheus_output.append(f'ml_model_forecast_steps{{series="{series_id}",model="{model_manager.model_name}",values="{forecast_values}"}} 1')
+        for series_id, data in metrics_data.items():
+            labels = {"series": series_id, "model": hosted_name, **extra_labels}
+            
+            # Rolling metrics for each window size
+            for size in ROLLING_WINDOW_SIZES:
+                for base_metric in ROLLING_METRICS:
+                    metric_name = f"{base_metric}_{size}"
+                    if metric_name in data:
+                        exporter.families[f"ml_model_{metric_name}"].add(data[metric_name], **labels)
+            
+            PREDICTIONS_TOTAL.add(data.get("count", 0), **labels)
+            LAST_PREDICTION.add(data.get("last_prediction", 0), **labels)
+            LAST_ACTUAL.add(data.get("last_actual", 0), **labels)
+            LAST_ERROR.add(data.get("last_error", 0), **labels)
+            
+            # Error quantile summaries, all read from the same get_metrics snapshot
+            for sketch_name, family in ERROR_SUMMARIES.items():
+                if not data.get(f"{sketch_name}_count"):
+                    continue
+                for q in ERROR_QUANTILES:
+                    family.add(data[f"{sketch_name}_p{q * 100:g}"], **labels, quantile=q)
+                family.add(data[f"{sketch_name}_sum"], suffix="_sum", **labels)
+                family.add(data[f"{sketch_name}_count"], suffix="_count", **labels)
+            
+            # One gauge per forecast step keeps series cardinality fixed
+            for step, value in enumerate(data.get("forecast", []), start=1):
+                FORECAST.add(value, **labels, step=step)
+    
+    if snapshot_manager.enabled:
+        for stat_name, value in snapshot_manager.stats.items():
+            exporter.families[f"ml_model_{stat_name}"].add(value, model=model_name)
+
+def _runtime_stats():
+    stats = series_locks.stats()
+    stats.update(forecast_cache.stats())
+    if micro_batcher is not None:
+        stats.update(micro_batcher.stats)
+    if learners:
+        # Summed over models, except lag which is the worst model's
+        learner_stats = [learner.stats() for learner in list(learners.values())]
+        for stat_name in learner_stats[0]:
+            values = [item[stat_name] for item in learner_stats]
+            stats[stat_name] = max(values) if stat_name == "learn_lag_seconds" else sum(values)
+    return stats
+
+def _collect_runtime_metrics(stats):
+    for stat_name, value in stats.items():
+        runtime_exporter.register(
+            f"ml_model_{stat_name}", f"Request execution {stat_name.replace('_', ' ')}",
+            "counter" if stat_name.endswith("_total") else "gauge"
+        ).add(value, model=model_manager.model_name)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus-compatible metrics endpoint, re-rendered only when state changes"""
+    candidate = shadow
+    state_key = (
+        tuple((id(manager), manager.version) for manager in list(metrics_managers.values())),
+        snapshot_manager.version,
+        candidate and (id(candidate.metrics_manager), candidate.metrics_manager.version)
+    )
+    content = exporter.render(state_key, _collect_prometheus_metrics)
     
-    from fastapi import Response
-    return Response(content="\n".join(prometheus_output) + "\n", media_type="text/plain")
+    runtime_stats = _runtime_stats()
+    content += runtime_exporter.render(tuple(runtime_stats.values()), lambda: _collect_runtime_metrics(runtime_stats))
+    content += latency_exporter.render(latency.observations, lambda: latency.collect(latency_exporter))
+    return Response(content=content, media_type="text/plain; version=0.0.4")
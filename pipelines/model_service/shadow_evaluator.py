@@ -0,0 +1,90 @@
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from metrics_manager import MetricsManager
+
+logger = logging.getLogger(__name__)
+
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "10000"))
+
+class ShadowEvaluator:
+    """Candidate model trained on the live predict_learn stream by a background worker.
+
+    The request path only enqueues observations (never blocks; a full queue
+    drops and counts them). The worker keeps one clone of the candidate per
+    series and tracks its prequential metrics in its own MetricsManager, so
+    they can be compared with the live model's before promotion.
+    """
+
+    def __init__(self, model_name, template, max_series, queue_size=SHADOW_QUEUE_SIZE):
+        self.model_name = model_name
+        self.template = template
+        self.max_series = max(max_series, 1)
+        self.series_models = OrderedDict()
+        self.metrics_manager = MetricsManager()
+        self.errors = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=f"shadow-{model_name}", daemon=True)
+        self._thread.start()
+
+    def observe(self, series_id, features, target):
+        """Queue a live observation for the candidate; never blocks the caller"""
+        if self._stopped:
+            return
+        try:
+            self._queue.put_nowait((series_id, features, target))
+        except queue.Full:
+            self.dropped += 1
+
+    def _get_model(self, series_id):
+        model = self.series_models.get(series_id)
+        if model is None:
+            model = self.series_models[series_id] = self.template.clone()
+            while len(self.series_models) > self.max_series:
+                evicted_id, _ = self.series_models.popitem(last=False)
+                self.metrics_manager.remove_series(evicted_id)
+        else:
+            self.series_models.move_to_end(series_id)
+        return model
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()  # join() marker: everything queued before it has been learned
+                continue
+            series_id, features, target = item
+            try:
+                pred = self._get_model(series_id).predict_learn(features, target)
+                self.metrics_manager.add(series_id, target, pred)
+            except Exception as e:
+                self.errors += 1
+                logger.debug(f"SHADOW: {self.model_name} failed on series {series_id}: {e}")
+
+    def join(self):
+        """Wait until every observation queued so far has been learned; observe() keeps accepting new ones"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def stop(self):
+        """Stop accepting observations and wait until every queued one has been learned"""
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def get_info(self):
+        return {
+            "model_name": self.model_name,
+            "queue_depth": self._queue.qsize(),
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "series_models": len(self.series_models),
+            "metrics": self.metrics_manager.get_metrics()
+        }
@@ -0,0 +1,194 @@
+import itertools
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from metrics_manager import MetricsManager
+from series_locks import SeriesLocks
+
+logger = logging.getLogger(__name__)
+
+# Snapshots are disabled unless SNAPSHOT_DIR points at a (persistent) volume
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "60"))
+SNAPSHOT_FILE = "model_state.pkl"
+SNAPSHOT_VERSION = 2  # 2: series models pickled individually
+
+class SnapshotManager:
+    """Periodically persists model and metrics state, and restores it on startup.
+
+    Snapshots are taken in a background thread. Each series' models are
+    pickled and its metrics copied while holding that series' lock, so no
+    learn_one or metrics update is captured half-applied; requests for that
+    series wait for the dump, and pickling holds the GIL while it runs. The
+    file is written atomically (temp file + fsync + rename), so a crash
+    mid-write never corrupts the latest snapshot.
+    """
+
+    def __init__(self, model_manager, metrics_managers, snapshot_dir=SNAPSHOT_DIR,
+                 interval_seconds=SNAPSHOT_INTERVAL_SECONDS, series_locks=None):
+        self.model_manager = model_manager
+        self.metrics_managers = metrics_managers  # model name -> MetricsManager
+        self.series_locks = series_locks if series_locks is not None else SeriesLocks()
+        self.snapshot_dir = snapshot_dir
+        self.interval_seconds = interval_seconds
+        self.enabled = bool(snapshot_dir)
+        self.ready = not self.enabled  # Nothing to restore when disabled
+        self.stats = {
+            "snapshots_total": 0,
+            "snapshot_errors_total": 0,
+            "snapshot_bytes": 0,
+            "snapshot_duration_seconds": 0.0,
+            "last_snapshot_timestamp": 0.0,
+            "restore_bytes": 0,
+            "restore_duration_seconds": 0.0,
+            "restored_series": 0
+        }
+        self._versions = itertools.count(1)
+        self.version = 0  # Bumped whenever stats change
+        self._last_count = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def path(self):
+        return os.path.join(self.snapshot_dir, SNAPSHOT_FILE)
+
+    def _learn_count(self):
+        return sum(sum(manager.series_counts.values()) for manager in list(self.metrics_managers.values()))
+
+    def _serialize(self):
+        """Pickle current state, copying each series under its lock"""
+        model_state = self.model_manager.state_dict()
+        series_models = dict(model_state["series_models"])  # LRU order
+        metrics_managers = list(self.metrics_managers.items())
+        series_ids = list(dict.fromkeys(itertools.chain(
+            series_models, *(manager.series_ids() for _, manager in metrics_managers)
+        )))
+
+        pickled_models = []
+        series_states = {name: {} for name, _ in metrics_managers}
+        for series_id in series_ids:
+            with self.series_locks.hold(series_id):
+                models = series_models.get(series_id)
+                if models is not None:
+                    pickled_models.append((series_id, pickle.dumps(models, protocol=pickle.HIGHEST_PROTOCOL)))
+                for name, manager in metrics_managers:
+                    series_states[name][series_id] = manager.series_state_dict(series_id)
+
+        model_state["series_models"] = pickled_models
+        return pickle.dumps({
+            "version": SNAPSHOT_VERSION,
+            "created": time.time(),
+            "model": model_state,
+            "metrics": {name: MetricsManager.combine_series_states(states) for name, states in series_states.items()}
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def snapshot(self, force=False):
+        """Write a snapshot if state changed since the last one; returns bytes written"""
+        if not self.enabled:
+            return 0
+
+        count = self._learn_count()
+        if not force and count == self._last_count:
+            return 0
+
+        start = time.perf_counter()
+        try:
+            payload = self._serialize()
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir, prefix=".snapshot-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            self.stats["snapshot_errors_total"] += 1
+            self.version = next(self._versions)
+            logger.error(f"SNAPSHOT ERROR: Could not write {self.path}: {e}")
+            return 0
+
+        duration = time.perf_counter() - start
+        self._last_count = count
+        self.stats.update({
+            "snapshots_total": self.stats["snapshots_total"] + 1,
+            "snapshot_bytes": len(payload),
+            "snapshot_duration_seconds": duration,
+            "last_snapshot_timestamp": time.time()
+        })
+        self.version = next(self._versions)
+        logger.info(f"SNAPSHOT: Wrote {len(payload)} bytes to {self.path} in {duration * 1000:.1f}ms")
+        return len(payload)
+
+    def restore(self):
+        """Load the latest snapshot, if any, then mark the service ready"""
+        if not self.enabled:
+            return False
+
+        try:
+            if not os.path.exists(self.path):
+                logger.info(f"SNAPSHOT: No snapshot at {self.path}, starting cold")
+                return False
+
+            start = time.perf_counter()
+            with open(self.path, "rb") as f:
+                payload = f.read()
+            state = pickle.loads(payload)
+            if state.get("version") != SNAPSHOT_VERSION:
+                logger.warning(f"SNAPSHOT: Ignoring snapshot version {state.get('version')}")
+                return False
+
+            model_state = dict(state["model"])
+            model_state["series_models"] = [(series_id, pickle.loads(models)) for series_id, models in model_state["series_models"]]
+            restored = self.model_manager.load_state_dict(model_state)
+            for name, metrics_state in state["metrics"].items():
+                if restored and name in self.metrics_managers:
+                    self.metrics_managers[name].load_state_dict(metrics_state)
+            # Metrics follow the registry, which may hold fewer series under a lower budget
+            hosted = set(self.model_manager.hosted_series())
+            for manager in self.metrics_managers.values():
+                for series_id in manager.series_ids():
+                    if series_id not in hosted:
+                        manager.remove_series(series_id)
+            self._last_count = self._learn_count()
+            duration = time.perf_counter() - start
+
+            self.stats.update({
+                "restore_bytes": len(payload),
+                "restore_duration_seconds": duration,
+                "restored_series": restored
+            })
+            self.version = next(self._versions)
+            logger.info(f"SNAPSHOT: Restored {restored} series ({len(payload)} bytes) in {duration * 1000:.1f}ms")
+            return True
+        except Exception as e:
+            logger.error(f"SNAPSHOT ERROR: Could not restore {self.path}, starting cold: {e}")
+            return False
+        finally:
+            self.ready = True
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.snapshot()
+
+    def start(self):
+        """Start the background snapshot thread"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write a final snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds)
+            self._thread = None
+        self.snapshot()
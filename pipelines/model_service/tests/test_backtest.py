@@ -0,0 +1,22 @@
+from backtest import lag_features, read_values, run_backtest
+
+def test_lag_features_match_feature_service():
+    """Test lags are most recent first, zero-filled, and never include the target"""
+    pairs = list(lag_features([1.0, 2.0, 3.0, 4.0], n_lags=2))
+    assert pairs[0] == ({"in_1": 0.0, "in_2": 0.0}, 1.0)
+    assert pairs[1] == ({"in_1": 1.0, "in_2": 0.0}, 2.0)
+    assert pairs[3] == ({"in_1": 3.0, "in_2": 2.0}, 4.0)
+
+def test_run_backtest_reports_accuracy_and_latency(tmp_path):
+    """Test every model replays the CSV and reports accuracy, throughput and latency percentiles"""
+    path = tmp_path / "data.csv"
+    path.write_text("input,target\n" + "".join(f"t{i},{100 + i % 7}\n" for i in range(60)))
+    values = read_values(str(path))
+    
+    results = run_backtest(values, ["linear_regression", "rls_regressor"], n_lags=3, workers=2)
+    assert [r["model"] for r in results] == ["linear_regression", "rls_regressor"]
+    for result in results:
+        assert result["rows"] == 60
+        assert result["mae"] > 0
+        assert result["rows_per_second"] > 0
+        assert result["predict_one_p50_us"] <= result["predict_one_p99_us"]
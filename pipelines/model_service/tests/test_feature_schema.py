@@ -0,0 +1,21 @@
+from feature_schema import forecast_recursive, get_schema
+
+def test_schema_orders_lags_numerically():
+    """Test lag keys are ordered by lag index, other features after them"""
+    schema = get_schema({"in_10": 1.0, "hour": 3.0, "in_2": 2.0, "in_1": 4.0})
+    assert schema.keys == ("in_1", "in_2", "in_10", "hour")
+    assert schema.n_lags == 3
+    assert get_schema({"in_10": 0.0, "hour": 0.0, "in_2": 0.0, "in_1": 0.0}) is schema
+
+def test_forecast_recursive_shifts_lags():
+    """Test each prediction becomes in_1 and older lags shift by one"""
+    seen = []
+    
+    def predict_one(features):
+        seen.append(features)
+        return features["in_1"] + 1.0
+    
+    predictions = forecast_recursive(predict_one, {"in_1": 10.0, "in_2": 9.0, "in_3": 8.0, "hour": 5.0}, steps=3)
+    assert predictions == [11.0, 12.0, 13.0]
+    assert seen[1] == {"in_1": 11.0, "in_2": 10.0, "in_3": 9.0, "hour": 5.0}
+    assert seen[2] == {"in_1": 12.0, "in_2": 11.0, "in_3": 10.0, "hour": 5.0}
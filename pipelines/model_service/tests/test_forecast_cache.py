@@ -0,0 +1,38 @@
+import pickle
+from forecast_cache import ForecastCache
+from models.river_models import linear_regression
+
+FEATURES = {"in_1": 135.0, "in_2": 130.0}
+
+def test_hits_until_model_learns():
+    """Test forecasts are served from cache until the model learns or the steps change"""
+    model = linear_regression()
+    cache = ForecastCache(max_size=10)
+    
+    first = cache.get_or_compute(model, FEATURES, 3, model.predict_many)
+    assert cache.get_or_compute(model, FEATURES, 3, model.predict_many) == first
+    assert cache.stats()["forecast_cache_hits_total"] == 1
+    
+    model.learn_one(FEATURES, 140.0)
+    assert cache.get_or_compute(model, FEATURES, 3, model.predict_many) != first
+    cache.get_or_compute(model, FEATURES, 2, model.predict_many)
+    assert cache.stats()["forecast_cache_misses_total"] == 3
+
+def test_lru_bound_and_disabled():
+    """Test the cache is bounded by max_size and bypassed entirely when it is 0"""
+    model = linear_regression()
+    cache = ForecastCache(max_size=2)
+    for value in range(3):
+        cache.get_or_compute(model, {"in_1": float(value)}, 1, model.predict_many)
+    assert cache.stats()["forecast_cache_entries"] == 2
+    
+    disabled = ForecastCache(max_size=0)
+    disabled.get_or_compute(model, FEATURES, 1, model.predict_many)
+    disabled.get_or_compute(model, FEATURES, 1, model.predict_many)
+    assert disabled.stats() == {"forecast_cache_hits_total": 0, "forecast_cache_misses_total": 0, "forecast_cache_entries": 0}
+
+def test_versions_are_never_shared():
+    """Test clones and unpickled copies get fresh versions, so they never hit each other's entries"""
+    model = linear_regression()
+    versions = {model.version, model.clone().version, pickle.loads(pickle.dumps(model)).version}
+    assert len(versions) == 3
@@ -0,0 +1,31 @@
+import numpy as np
+from models.knn_models import SlidingWindowKNNRegressor
+
+def test_matches_brute_force_on_standardized_window():
+    """Test predictions match brute force over the raw window standardized with the running stats"""
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(300, 3)) * [1.0, 10.0, 100.0]
+    targets = rng.normal(size=300)
+    model = SlidingWindowKNNRegressor(n_neighbors=5, window_size=100)
+    assert model.predict_one({"in_1": 0.0, "in_2": 0.0, "in_3": 0.0}) == 0.0
+    for row, target in zip(data, targets):
+        model.learn_one({"in_1": row[0], "in_2": row[1], "in_3": row[2]}, target)
+    
+    query = np.array([0.1, -2.0, 30.0])
+    scaled = (data - data.mean(axis=0)) / data.std(axis=0)
+    query_scaled = (query - data.mean(axis=0)) / data.std(axis=0)
+    window = scaled[-100:]
+    nearest = np.argsort(((window - query_scaled) ** 2).sum(axis=1))[:5]
+    expected = targets[-100:][nearest].mean()
+    
+    assert np.isclose(model.predict_one({"in_1": 0.1, "in_2": -2.0, "in_3": 30.0}), expected)
+    assert model.size == 100
+
+def test_exact_match_and_forecast():
+    """Test a stored point predicts its own target, forecasts recurse and clones start empty"""
+    model = SlidingWindowKNNRegressor(n_neighbors=3, window_size=10)
+    for i in range(5):
+        model.learn_one({"in_1": float(i), "in_2": float(i + 1)}, float(i * 10))
+    assert model.predict_one({"in_1": 2.0, "in_2": 3.0}) == 20.0
+    assert len(model.predict_many({"in_1": 2.0, "in_2": 3.0}, steps=4)) == 4
+    assert model.clone().size == 0
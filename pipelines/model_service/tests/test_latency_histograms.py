@@ -0,0 +1,29 @@
+from latency_histograms import LatencyRecorder
+from prometheus_exporter import PrometheusExporter
+
+def test_histogram_buckets_are_cumulative():
+    """Test buckets render cumulatively with +Inf, _sum and _count"""
+    recorder = LatencyRecorder(buckets=(0.001, 0.01))
+    recorder.register("ml_test_seconds", "Test latency")
+    for seconds in (0.0005, 0.005, 0.005, 1.0):
+        recorder.observe("ml_test_seconds", seconds, model="m")
+    
+    exporter = PrometheusExporter()
+    body = exporter.render(recorder.observations, lambda: recorder.collect(exporter)).decode()
+    assert body == (
+        "# HELP ml_test_seconds Test latency\n# TYPE ml_test_seconds histogram\n"
+        'ml_test_seconds_bucket{model="m",le="0.001"} 1\n'
+        'ml_test_seconds_bucket{model="m",le="0.01"} 3\n'
+        'ml_test_seconds_bucket{model="m",le="+Inf"} 4\n'
+        'ml_test_seconds_sum{model="m"} 1.0105\n'
+        'ml_test_seconds_count{model="m"} 4\n'
+    )
+
+def test_time_context_manager():
+    """Test time() records one observation under the given labels"""
+    recorder = LatencyRecorder()
+    with recorder.time("ml_test_seconds", operation="noop"):
+        pass
+    histogram = recorder.histograms[("ml_test_seconds", (("operation", "noop"),))]
+    assert histogram.count == 1
+    assert histogram.counts[0] == 1
@@ -0,0 +1,70 @@
+import math
+import random
+from metrics_manager import MetricsManager, RollingWindow
+
+def _reference_metrics(pairs):
+    """Direct recomputation over the window, as the original implementation did"""
+    errors = [abs(t - p) for t, p in pairs]
+    mse = sum(e * e for e in errors) / len(errors)
+    apes = [abs(t - p) / abs(t) for t, p in pairs if t != 0]
+    return {
+        "mae": round(sum(errors) / len(errors), 4),
+        "mse": round(mse, 4),
+        "rmse": round(math.sqrt(mse), 4),
+        "mape": round(sum(apes) / len(apes) * 100, 4) if apes else 0.0
+    }
+
+def test_rolling_window_matches_direct_computation():
+    """Test running sums match a full recomputation after many evictions"""
+    rng = random.Random(42)
+    window = RollingWindow(10)
+    pairs = []
+    for _ in range(1000):
+        y_true = rng.choice([0.0, rng.uniform(-500, 500)])
+        y_pred = rng.uniform(-500, 500)
+        window.append(y_true, y_pred)
+        pairs.append((y_true, y_pred))
+        assert window.metrics() == _reference_metrics(pairs[-10:])
+    assert len(window) == 10
+    assert list(window) == pairs[-10:]
+
+def test_get_metrics_windows():
+    """Test get_metrics reports each window and the last prediction"""
+    manager = MetricsManager()
+    for i in range(25):
+        manager.add("series_a", 100.0 + i, 98.0 + i)
+    
+    metrics = manager.get_metrics()["series_a"]
+    assert metrics["count"] == 25
+    for size in [5, 10, 20]:
+        assert metrics[f"mae_{size}"] == 2.0
+        assert metrics[f"rmse_{size}"] == 2.0
+    assert metrics["last_actual"] == 124.0
+    assert metrics["last_prediction"] == 122.0
+    assert metrics["last_error"] == 2.0
+
+def test_error_quantiles():
+    """Test per-series error quantiles are reported and survive a state round trip"""
+    manager = MetricsManager()
+    for i in range(100):
+        manager.add("series_a", 100.0, 100.0 - i)
+    
+    metrics = manager.get_metrics()["series_a"]
+    assert 45 <= metrics["abs_error_p50"] <= 55
+    assert metrics["abs_error_p99"] > 95
+    assert 45 <= metrics["ape_p50"] <= 55  # Percent, like mape
+    
+    restored = MetricsManager()
+    restored.load_state_dict(manager.state_dict())
+    assert restored.get_metrics()["series_a"]["abs_error_p90"] == metrics["abs_error_p90"]
+
+def test_forecast_keeps_every_step():
+    """Test long forecasts are stored in full and series without one report no forecast"""
+    manager = MetricsManager()
+    manager.add("series_a", 10.0, 9.0)
+    assert manager.get_series_metrics("series_a")["forecast"] == []
+    
+    manager.add_predict_many("series_a", [float(step) for step in range(1, 101)])
+    forecast = manager.get_series_metrics("series_a")["forecast"]
+    assert len(forecast) == 100
+    assert forecast[-1] == 100.0
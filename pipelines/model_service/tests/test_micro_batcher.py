@@ -0,0 +1,90 @@
+import asyncio
+from micro_batcher import MicroBatcher
+
+def test_concurrent_requests_coalesce_in_order():
+    """Test concurrent submissions are batched, executed in order, and resolved individually"""
+    batches = []
+    
+    def execute(items):
+        batches.append(list(items))
+        return [ValueError("bad item") if item < 0 else item * 10 for item in items]
+    
+    async def run():
+        batcher = MicroBatcher(execute, max_window_ms=5, max_batch_size=4)
+        results = await asyncio.gather(*(batcher.submit(i) for i in [1, 2, 3, -1, 5]), return_exceptions=True)
+        return batcher, results
+    
+    batcher, results = asyncio.run(run())
+    assert results[:3] == [10, 20, 30]
+    assert isinstance(results[3], ValueError)
+    assert results[4] == 50
+    assert [item for batch in batches for item in batch] == [1, 2, 3, -1, 5]
+    assert [len(batch) for batch in batches] == [4, 1]
+    assert batcher.stats["micro_batched_requests_total"] == 5
+
+def test_window_adapts_to_load():
+    """Test the window grows under concurrent load and decays back to zero when idle"""
+    async def run():
+        batcher = MicroBatcher(lambda items: items, max_window_ms=4)
+        await asyncio.gather(*(batcher.submit(i) for i in range(8)))
+        grown = batcher.window
+        for i in range(20):
+            await batcher.submit(i)
+        return grown, batcher.window
+    
+    grown, idle = asyncio.run(run())
+    assert grown > 0
+    assert idle == 0.0
+
+def test_series_groups_run_concurrently_in_order():
+    """Test batches of different keys overlap while each key's batches stay ordered"""
+    import threading
+    import time
+    
+    active, peak, order = [0], [0], []
+    lock = threading.Lock()
+    
+    def execute(items):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            order.extend(items)
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return items
+    
+    async def run():
+        batcher = MicroBatcher(execute, max_window_ms=5, max_batch_size=2, key=lambda item: item[0])
+        items = [("a", 1), ("b", 1), ("a", 2), ("b", 2), ("a", 3), ("b", 3)]
+        return await asyncio.gather(*(batcher.submit(item) for item in items))
+    
+    results = asyncio.run(run())
+    assert results == [("a", 1), ("b", 1), ("a", 2), ("b", 2), ("a", 3), ("b", 3)]
+    assert peak[0] >= 2
+    assert [n for key, n in order if key == "a"] == [1, 2, 3]
+    assert [n for key, n in order if key == "b"] == [1, 2, 3]
+
+def test_submit_across_event_loops():
+    """Test one batcher serves callers on successive and concurrent event loops"""
+    import threading
+    
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_window_ms=3)
+    
+    async def run(offset):
+        return await asyncio.gather(*(batcher.submit(offset + i) for i in range(20)))
+    
+    assert asyncio.run(run(0)) == [i * 2 for i in range(20)]
+    assert asyncio.run(run(100)) == [(100 + i) * 2 for i in range(20)]
+    
+    results = {}
+    def worker(offset):
+        for _ in range(5):
+            results[offset] = asyncio.run(run(offset))
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in (1000, 2000, 3000, 4000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert results[2000] == [(2000 + i) * 2 for i in range(20)]
@@ -0,0 +1,98 @@
+from model_manager import ModelManager
+
+FEATURES = {"in_1": 135.0, "in_2": 130.0, "in_3": 125.0}
+
+def test_series_models_are_independent():
+    """Test each series gets its own lazily created model"""
+    manager = ModelManager(max_series=10)
+    for _ in range(20):
+        manager.predict_learn(FEATURES, 140.0, series_id="trained")
+    
+    assert manager.get_model("trained") is not manager.get_model("fresh")
+    assert manager.predict_many(FEATURES, steps=1, series_id="fresh") == [0.0]
+    assert manager.predict_many(FEATURES, steps=1, series_id="trained")[0] != 0.0
+
+def test_lru_eviction_by_count():
+    """Test least recently used series are evicted once the count budget is exceeded"""
+    manager = ModelManager(max_series=2)
+    manager.get_model("a")
+    manager.get_model("b")
+    manager.get_model("a")  # "b" is now least recently used
+    manager.get_model("c")
+    
+    assert list(manager.series_models) == ["a", "c"]
+    assert manager.get_registry_info()["evictions"] == 1
+
+def test_eviction_drops_series_metrics():
+    """Test evicted series leave the metrics, so metrics state stays within the registry budget"""
+    from metrics_manager import MetricsManager
+    
+    manager, metrics = ModelManager(max_series=2), MetricsManager()
+    manager.eviction_listeners.append(metrics.remove_series)
+    for series_id in ["a", "b", "c"]:
+        metrics.add(series_id, 140.0, manager.predict_learn(FEATURES, 140.0, series_id=series_id))
+        metrics.add_predict_many(series_id, manager.predict_many(FEATURES, steps=2, series_id=series_id))
+    
+    assert metrics.series_ids() == ["b", "c"]
+    assert set(metrics.get_metrics()) == {"b", "c"}
+    assert "a" not in metrics.series_sketches and "a" not in metrics.last_forecast
+
+def test_lru_eviction_by_memory():
+    """Test the memory budget bounds the registry even with a large count budget"""
+    manager = ModelManager(max_series=1000, max_memory_mb=0.001)
+    for series_id in ["a", "b", "c"]:
+        manager.predict_learn(FEATURES, 140.0, series_id=series_id)
+    
+    assert len(manager.series_models) < 3
+    assert "c" in manager.series_models
+
+def test_multi_model_hosting():
+    """Test MODEL_NAMES hosts independent clones of each listed model per series"""
+    manager = ModelManager(model_names="linear_regression,bagging_regressor")
+    assert manager.multi_model
+    assert manager.model_name == "linear_regression"
+    
+    models = manager.get_models("series_a")
+    assert list(models) == ["linear_regression", "bagging_regressor"]
+    assert manager.get_model("series_a") is models["linear_regression"]
+    assert manager.get_models("series_b")["bagging_regressor"] is not models["bagging_regressor"]
+
+def test_multi_model_unknown_name():
+    """Test unknown names in MODEL_NAMES fail fast"""
+    try:
+        ModelManager(model_names="linear_regression,missing_model")
+    except ValueError as e:
+        assert "missing_model" in str(e)
+    else:
+        assert False, "Expected ValueError"
+
+def test_direct_forecast_strategy():
+    """Test the direct strategy trains one model per horizon on lagged features"""
+    manager = ModelManager(forecast_strategy="direct", forecast_horizon=3)
+    for i in range(50):
+        manager.predict_learn({"in_1": float(i)}, float(i + 1), series_id="ramp")
+    
+    model = manager.get_model("ramp")
+    assert len(model.horizon_models) == 2
+    forecast = manager.predict_many({"in_1": 50.0}, steps=3, series_id="ramp")
+    assert len(forecast) == 3
+    assert forecast[0] < forecast[1] < forecast[2]  # h-step models learned y = in_1 + h
+    
+    try:
+        manager.predict_many({"in_1": 50.0}, steps=4, series_id="ramp")
+    except ValueError as e:
+        assert "FORECAST_HORIZON" in str(e)
+    else:
+        assert False, "Expected ValueError"
+
+def test_direct_restore_requires_same_horizon():
+    """Test a direct-strategy snapshot is only restored with the FORECAST_HORIZON it was taken with"""
+    manager = ModelManager(forecast_strategy="direct", forecast_horizon=3)
+    manager.predict_learn({"in_1": 1.0}, 2.0, series_id="a")
+    state = manager.state_dict()
+    
+    assert ModelManager(forecast_strategy="direct", forecast_horizon=3).load_state_dict(state) == 1
+    assert ModelManager(forecast_strategy="direct", forecast_horizon=5).load_state_dict(state) == 0
+    assert ModelManager(forecast_strategy="direct", forecast_horizon=5).load_state_dict(
+        {key: value for key, value in state.items() if key != "forecast_horizon"}
+    ) == 0
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from models.numpy_models import NumpyLinearModel, RecursiveLeastSquares, OnlineRidge, SGDRegressor
+
+def make_data(n=200, seed=0):
+    """n rows of three features with a noiseless linear target"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    y = X @ [2.0, -1.0, 0.5] + 3.0
+    return [{"in_1": row[0], "in_2": row[1], "in_3": row[2]} for row in X], y.tolist()
+
+@pytest.mark.parametrize("model", [RecursiveLeastSquares(), OnlineRidge(alpha=1e-6)])
+def test_exact_models_recover_linear_target(model):
+    """Test the exact solvers recover the weights and intercept of a linear target"""
+    features_list, targets = make_data()
+    model.predict_learn_many(features_list, targets)
+    assert model.predict_one({"in_1": 1.0, "in_2": 1.0, "in_3": 1.0}) == pytest.approx(4.5, abs=1e-3)
+
+def test_rls_block_update_matches_sequential():
+    """Test the Woodbury block update gives the same weights as learning rows one by one"""
+    features_list, targets = make_data(50)
+    sequential, batched = RecursiveLeastSquares(), RecursiveLeastSquares()
+    for features, target in zip(features_list, targets):
+        sequential.learn_one(features, target)
+    batched.predict_learn_many(features_list, targets)
+    np.testing.assert_allclose(sequential.weights, batched.weights, rtol=1e-6, atol=1e-6)
+
+def test_sgd_learns_and_clones_untrained():
+    """Test SGD converges, bumps its version on learning and clones without state"""
+    features_list, targets = make_data(2000)
+    model = SGDRegressor(learning_rate=0.05)
+    predictions = model.predict_learn_many(features_list, targets)
+    assert predictions[0] == 0.0
+    assert abs(predictions[-1] - targets[-1]) < 0.5
+    version = model.version
+    model.learn_one(features_list[0], targets[0])
+    assert model.version != version
+    
+    clone = model.clone()
+    assert clone.predict_one(features_list[0]) == 0.0
+    assert len(model.predict_many(features_list[0], steps=3)) == 3
+
+def test_base_requires_array_methods():
+    """Test NumpyLinearModel cannot be instantiated without the array-level methods"""
+    with pytest.raises(TypeError):
+        NumpyLinearModel("incomplete")
+
+@pytest.mark.parametrize("size", ["0", "-1"])
+def test_mini_batch_size_validated_at_import(size):
+    """Test a MINI_BATCH_SIZE below 1 fails at import with a message naming it"""
+    service_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, MINI_BATCH_SIZE=size, PYTHONPATH=service_dir)
+    result = subprocess.run([sys.executable, "-c", "import models.numpy_models"], cwd=service_dir, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert f"MINI_BATCH_SIZE must be at least 1, got {size}" in result.stderr
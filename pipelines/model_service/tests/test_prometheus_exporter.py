@@ -0,0 +1,25 @@
+from prometheus_exporter import PrometheusExporter
+
+def test_render_cached_until_state_key_changes():
+    """Test collect only runs when the state key changes"""
+    exporter = PrometheusExporter()
+    family = exporter.register("ml_test_value", "Test value")
+    calls = []
+    
+    def collect():
+        calls.append(1)
+        family.add(len(calls), series='a"b')
+    
+    first = exporter.render(1, collect)
+    assert exporter.render(1, collect) is first
+    assert len(calls) == 1
+    assert first == b'# HELP ml_test_value Test value\n# TYPE ml_test_value gauge\nml_test_value{series="a\\"b"} 1\n'
+    
+    assert exporter.render(2, collect).endswith(b"} 2\n")
+    assert exporter.renders == 2
+
+def test_render_empty():
+    """Test families without samples are omitted"""
+    exporter = PrometheusExporter()
+    exporter.register("ml_test_value", "Test value")
+    assert exporter.render(0, lambda: None) == b"# No predictions available yet\n"
@@ -0,0 +1,32 @@
+import random
+from quantile_sketch import TDigest
+
+def test_quantiles_close_to_exact_with_bounded_centroids():
+    """Test quantiles stay within 3% of exact while centroids stay bounded by the compression"""
+    rng = random.Random(0)
+    values = [rng.expovariate(1.0) for _ in range(20000)]
+    sketch = TDigest(compression=100)
+    for value in values:
+        sketch.add(value)
+    
+    values.sort()
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * len(values))]
+        assert abs(sketch.quantile(q) - exact) / exact < 0.03
+    assert len(sketch.centroids[0]) <= 100
+    assert sketch.count == 20000
+
+def test_decay_follows_recent_values_and_state_roundtrip():
+    """Test a half-life makes quantiles follow recent values, and state survives a roundtrip"""
+    sketch = TDigest(compression=50, half_life=100)
+    for _ in range(2000):
+        sketch.add(1.0)
+    for _ in range(1000):
+        sketch.add(10.0)
+    assert sketch.quantile(0.5) == 10.0
+    
+    restored = TDigest(compression=50, half_life=100)
+    restored.load_state_dict(sketch.state_dict())
+    assert restored.quantiles([0.5, 0.9]) == sketch.quantiles([0.5, 0.9])
+    assert restored.count == 3000
+    assert TDigest().quantile(0.5) == 0.0
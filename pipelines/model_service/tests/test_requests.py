@@ -129,3 +129,361 @@ def test_model_metrics_detailed():
         # Check that we have mae, mse, rmse, mape for each window size
         for window in ['5', '10', '20']:
             assert any(k.endswith(f'_{window}') for k in metrics.keys())
+
+
+def test_predict_learn_batch():
+    """Test predict_learn_batch returns one prediction per observation in order"""
+    payload = {
+        "observations": [
+            {"features": {"in_1": 100.0 + i, "in_2": 95.0 + i}, "target": 105.0 + i}
+            for i in range(5)
+        ]
+    }
+    response = client.post("/predict_learn_batch", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 5
+    assert len(data["predictions"]) == 5
+    assert all(isinstance(pred, (int, float)) for pred in data["predictions"])
+
+def test_predict_learn_batch_invalid_target():
+    """Test predict_learn_batch rejects a batch with a non-numeric target"""
+    payload = {
+        "observations": [
+            {"features": {"in_1": 100.0}, "target": 105.0},
+            {"features": {"in_1": 105.0}, "target": "invalid"}
+        ]
+    }
+    response = client.post("/predict_learn_batch", json=payload)
+    assert response.status_code == 422
+
+def test_predict_learn_series_id():
+    """Test predict_learn tracks metrics per series_id"""
+    payload = {
+        "features": {"in_1": 135.0, "in_2": 130.0},
+        "target": 140.0,
+        "series_id": "series_a"
+    }
+    response = client.post("/predict_learn", json=payload)
+    assert response.status_code == 200
+    
+    data = client.get("/model_metrics").json()
+    assert data["series_a"]["count"] == 1
+    assert data["model_info"]["registry"]["series_models"] >= 1
+
+def test_prometheus_metrics_cached_and_grouped():
+    """Test /metrics is served from cache until state changes and uses per-step forecast gauges"""
+    client.post("/predict_learn", json={"features": {"in_1": 135.0, "in_2": 130.0}, "target": 140.0})
+    client.post("/predict_many", json={"features": {"in_1": 135.0, "in_2": 130.0}})
+    import service
+    first = client.get("/metrics").text
+    renders = service.exporter.renders
+    client.get("/metrics")  # Request latency histograms change on every scrape, the model metrics don't
+    assert service.exporter.renders == renders
+    
+    assert first.count("# TYPE ml_model_last_prediction gauge") == 1
+    assert 'ml_model_forecast{series="default",model="linear_regression",step="5"}' in first
+    assert "# TYPE ml_model_abs_error summary" in first
+    assert 'ml_model_abs_error{series="default",model="linear_regression",quantile="0.99"}' in first
+    assert 'ml_model_ape_count{series="default",model="linear_regression"}' in first
+    assert "values=" not in first
+    
+    client.post("/predict_learn", json={"features": {"in_1": 1.0}, "target": 2.0})
+    assert client.get("/metrics").text != first
+
+def test_predict_learn_multi_model(monkeypatch):
+    """Test multi-model mode fans one payload out to every hosted model"""
+    import service
+    from model_manager import ModelManager
+    from metrics_manager import MetricsManager
+    
+    multi_manager = ModelManager(model_names="linear_regression,knn_regressor")
+    monkeypatch.setattr(service, "model_manager", multi_manager)
+    monkeypatch.setattr(service, "metrics_managers", {name: MetricsManager() for name in multi_manager.model_names})
+    
+    payload = {"features": {"in_1": 135.0, "in_2": 130.0}, "target": 140.0}
+    data = client.post("/predict_learn", json=payload).json()
+    assert set(data["predictions"]) == {"linear_regression", "knn_regressor"}
+    assert data["prediction"] == data["predictions"]["linear_regression"]
+    assert data["metrics"]["knn_regressor"]["count"] == 1
+    assert data["errors"] == {}
+    
+    data = client.post("/predict_many", json={"features": payload["features"]}).json()
+    assert len(data["forecasts"]["knn_regressor"]) == 5
+
+def test_predict_learn_micro_batched(monkeypatch):
+    """Test /predict_learn returns the same response shape when routed through the micro-batcher"""
+    import service
+    from micro_batcher import MicroBatcher
+    
+    monkeypatch.setattr(service, "micro_batcher", MicroBatcher(service._predict_learn_micro_batch, max_window_ms=2))
+    response = client.post("/predict_learn", json={"features": {"in_1": 135.0}, "target": 140.0})
+    assert response.status_code == 200
+    assert isinstance(response.json()["prediction"], (int, float))
+    assert service.micro_batcher.stats["micro_batches_total"] == 1
+    
+    response = client.post("/predict_learn", json={"features": {"in_1": 135.0}, "target": "invalid"})
+    assert response.status_code == 422
+
+def test_predict_learn_msgpack():
+    """Test msgpack request bodies and Accept-negotiated msgpack responses"""
+    import msgpack
+    
+    body = msgpack.packb({"features": {"in_1": 135.0, "in_2": 130.0}, "target": 140.0})
+    response = client.post("/predict_learn", content=body, headers={
+        "Content-Type": "application/msgpack",
+        "Accept": "application/msgpack"
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert isinstance(msgpack.unpackb(response.content)["prediction"], (int, float))
+    
+    # msgpack request, default JSON response
+    response = client.post("/predict_learn", content=body, headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 200
+    assert "prediction" in response.json()
+    
+    # Invalid payloads are still rejected by validation
+    body = msgpack.packb({"features": {"in_1": 135.0}, "target": "invalid"})
+    response = client.post("/predict_learn", content=body, headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 422
+
+def test_shadow_promotion(monkeypatch):
+    """Test a shadow candidate learns the live stream and is promoted with its state"""
+    import service
+    from model_manager import ModelManager
+    from metrics_manager import MetricsManager
+    
+    single_manager = ModelManager(model_names="")
+    monkeypatch.setattr(service, "model_manager", single_manager)
+    monkeypatch.setattr(service, "metrics_managers", {single_manager.model_name: MetricsManager()})
+    monkeypatch.setattr(service, "shadow", None)
+    
+    assert client.get("/admin/shadow").status_code == 404
+    assert client.post("/admin/shadow", json={"model_name": "unknown"}).status_code == 404
+    assert client.post("/admin/shadow", json={"model_name": "knn_regressor"}).status_code == 200
+    
+    for i in range(5):
+        client.post("/predict_learn", json={"features": {"in_1": float(i)}, "target": float(i + 1), "series_id": "a"})
+    
+    data = client.post("/admin/promote").json()
+    assert data["model_name"] == "knn_regressor"
+    assert data["previous_model_name"] == "linear_regression"
+    assert service.shadow is None
+    assert single_manager.model_name == "knn_regressor"
+    assert list(service.metrics_managers) == ["knn_regressor"]
+    assert service.metrics_managers["knn_regressor"].series_counts["a"] == 5
+    assert "a" in single_manager.series_models
+    
+    response = client.post("/predict_learn", json={"features": {"in_1": 5.0}, "target": 6.0, "series_id": "a"})
+    assert response.status_code == 200
+    assert client.post("/admin/promote").status_code == 404
+
+def test_shadow_promotion_drains_backlog_before_pausing_traffic(monkeypatch):
+    """Test the candidate's backlog is learned before promotion holds every series lock"""
+    import contextlib
+    import time
+    import service
+    from model_manager import ModelManager
+    from metrics_manager import MetricsManager
+    
+    single_manager = ModelManager(model_names="")
+    monkeypatch.setattr(service, "model_manager", single_manager)
+    monkeypatch.setattr(service, "metrics_managers", {single_manager.model_name: MetricsManager()})
+    monkeypatch.setattr(service, "shadow", None)
+    assert client.post("/admin/shadow", json={"model_name": "knn_regressor"}).status_code == 200
+    candidate = service.shadow
+    add = candidate.metrics_manager.add
+    
+    def slow_add(*args):
+        time.sleep(0.005)  # An expensive candidate: the backlog outlives the requests
+        add(*args)
+    
+    monkeypatch.setattr(candidate.metrics_manager, "add", slow_add)
+    for i in range(20):
+        client.post("/predict_learn", json={"features": {"in_1": float(i)}, "target": float(i), "series_id": "drain"})
+    
+    learned_at_pause = []
+    hold_all = service.series_locks.hold_all
+    
+    @contextlib.contextmanager
+    def recording_hold_all():
+        learned_at_pause.append(candidate.metrics_manager.series_counts["drain"])
+        with hold_all():
+            yield
+    
+    monkeypatch.setattr(service.series_locks, "hold_all", recording_hold_all)
+    assert client.post("/admin/promote").status_code == 200
+    assert learned_at_pause == [20]
+
+def test_shadow_promotion_under_load_keeps_every_observation(monkeypatch):
+    """Test observations racing a promotion reach either the candidate or the promoted model"""
+    import threading
+    import service
+    from model_manager import ModelManager
+    from metrics_manager import MetricsManager
+
+    single_manager = ModelManager(model_names="")
+    monkeypatch.setattr(service, "model_manager", single_manager)
+    monkeypatch.setattr(service, "metrics_managers", {single_manager.model_name: MetricsManager()})
+    monkeypatch.setattr(service, "shadow", None)
+    assert client.post("/admin/shadow", json={"model_name": "knn_regressor"}).status_code == 200
+
+    def send(series_id):
+        for i in range(50):
+            payload = {"features": {"in_1": float(i)}, "target": float(i + 1), "series_id": series_id}
+            assert client.post("/predict_learn", json=payload).status_code == 200
+
+    threads = [threading.Thread(target=send, args=(f"race_{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    assert client.post("/admin/promote").status_code == 200
+    for thread in threads:
+        thread.join()
+
+    counts = service.metrics_managers["knn_regressor"].series_counts
+    assert [counts[f"race_{n}"] for n in range(4)] == [50] * 4
+
+def test_series_evicted_mid_request_leaves_no_metrics(monkeypatch):
+    """Test metrics a request records after its series was evicted are dropped, not orphaned"""
+    import service
+    from model_manager import ModelManager
+    from metrics_manager import MetricsManager
+    
+    single_manager = ModelManager(max_series=1, model_names="")
+    single_manager.eviction_listeners.append(service._evict_series_metrics)
+    metrics = MetricsManager()
+    monkeypatch.setattr(service, "model_manager", single_manager)
+    monkeypatch.setattr(service, "metrics_managers", {single_manager.model_name: metrics})
+    
+    class EvictedWhileLearning:
+        def predict_learn(self, features, target):
+            single_manager.get_models("other")  # Another request's series takes the only slot
+            return 0.0
+    
+    single_manager.get_models("evicted")[single_manager.model_name] = EvictedWhileLearning()
+    payload = {"features": {"in_1": 1.0}, "target": 1.0, "series_id": "evicted"}
+    assert client.post("/predict_learn", json=payload).status_code == 200
+    
+    assert single_manager.hosted_series() == ["other"]
+    assert "evicted" not in metrics.series_ids()
+
+def test_predict_learn_write_behind(monkeypatch):
+    """Test write-behind mode returns predictions and learns them in the background"""
+    import service
+    
+    monkeypatch.setattr(service, "LEARN_MODE", "write_behind")
+    payload = {"features": {"in_1": 1.0, "in_2": 2.0}, "target": 3.0, "series_id": "write_behind"}
+    for _ in range(3):
+        response = client.post("/predict_learn", json=payload)
+        assert response.status_code == 200
+        assert isinstance(response.json()["prediction"], (int, float))
+    
+    learner = service.learners[service.model_manager.model_name]
+    learner.join()
+    assert learner.stats()["learn_queue_depth"] == 0
+    assert "ml_model_learn_lag_seconds" in client.get("/metrics").text
+
+def test_write_behind_batch_follows_single_updates(monkeypatch):
+    """Test a batch is learned after its series' queued single update, without waiting on other series"""
+    import threading
+    import service
+    from model_manager import ModelManager
+    
+    class RecordingModel:
+        def __init__(self, gate=None):
+            self.learned = []
+            self.gate = gate
+        
+        def predict_one(self, features):
+            return 0.0
+        
+        def learn_one(self, features, target):
+            if self.gate is not None:
+                self.gate.wait()
+            self.learned.append(target)
+        
+        def predict_learn_many(self, features_list, targets):
+            self.learned.extend(targets)
+            return [0.0] * len(targets)
+    
+    gate = threading.Event()
+    models = {"slow": RecordingModel(gate), "ordered": RecordingModel()}
+    single_manager = ModelManager(model_names="")
+    monkeypatch.setattr(single_manager, "get_models", lambda series_id: {single_manager.model_name: models[series_id]})
+    monkeypatch.setattr(service, "model_manager", single_manager)
+    monkeypatch.setattr(service, "learners", {})
+    monkeypatch.setattr(service, "LEARN_MODE", "write_behind")
+    
+    def predict_learn(series_id, target):
+        payload = {"features": {"in_1": 1.0}, "target": target, "series_id": series_id}
+        assert client.post("/predict_learn", json=payload).status_code == 200
+    
+    predict_learn("slow", 0.0)  # The learner blocks on this series
+    predict_learn("ordered", 1.0)  # Queued behind it
+    batch = threading.Thread(target=client.post, args=("/predict_learn_batch",), kwargs={"json": {
+        "series_id": "ordered", "observations": [{"features": {"in_1": 1.0}, "target": 2.0}, {"features": {"in_1": 1.0}, "target": 3.0}]
+    }})
+    batch.start()
+    batch.join(timeout=2)
+    finished = not batch.is_alive()
+    gate.set()
+    batch.join()
+    service.learners[single_manager.model_name].stop()
+    
+    assert finished
+    assert models["ordered"].learned == [1.0, 2.0, 3.0]
+    assert models["slow"].learned == [0.0]
+
+def test_predict_many_steps():
+    """Test steps is a validated request parameter"""
+    payload = {"features": {"in_1": 135.0, "in_2": 130.0}}
+    assert len(client.post("/predict_many", json=payload).json()["forecast"]) == 5
+    assert len(client.post("/predict_many", json={**payload, "steps": 2}).json()["forecast"]) == 2
+    assert client.post("/predict_many", json={**payload, "steps": 0}).status_code == 422
+    assert client.post("/predict_many", json={**payload, "steps": 1000}).status_code == 422
+
+def test_predict_many_cached():
+    """Test repeated forecasts between learn events are served from the cache"""
+    import service
+    
+    payload = {"features": {"in_1": 135.0, "in_2": 130.0}, "series_id": "cached"}
+    hits = service.forecast_cache.hits
+    first = client.post("/predict_many", json=payload).json()
+    assert client.post("/predict_many", json=payload).json() == first
+    assert service.forecast_cache.hits == hits + 1
+    assert "ml_model_forecast_cache_hits_total" in client.get("/metrics").text
+
+def test_latency_histograms():
+    """Test request and model operation latencies are exported as histograms"""
+    client.post("/predict_learn", json={"features": {"in_1": 135.0}, "target": 140.0})
+    client.get("/metrics")
+    text = client.get("/metrics").text
+    
+    assert text.count("# TYPE ml_http_request_duration_seconds histogram") == 1
+    assert 'ml_http_request_duration_seconds_count{endpoint="/predict_learn",method="POST",status="200"}' in text
+    assert 'ml_model_operation_duration_seconds_bucket{model="linear_regression",operation="predict_learn",le="+Inf"}' in text
+
+def test_long_forecast_exported_in_full():
+    """Test forecasts beyond 5 steps reach /model_metrics and the per-step gauges"""
+    payload = {"features": {"in_1": 135.0, "in_2": 130.0}, "steps": 12, "series_id": "long_forecast"}
+    client.post("/predict_learn", json={"features": payload["features"], "target": 140.0, "series_id": "long_forecast"})
+    assert len(client.post("/predict_many", json=payload).json()["forecast"]) == 12
+    
+    assert len(client.get("/model_metrics").json()["long_forecast"]["forecast"]) == 12
+    assert 'ml_model_forecast{series="long_forecast",model="linear_regression",step="12"}' in client.get("/metrics").text
+
+def test_error_summaries_use_one_snapshot(monkeypatch):
+    """Test a first observation landing after get_metrics() cannot break /metrics"""
+    import service
+    from metrics_manager import MetricsManager
+    
+    manager = MetricsManager()
+    manager.add("race_series", 10.0, 9.0)
+    before_first_error = {"race_series": {"count": 0, "forecast": []}}
+    monkeypatch.setattr(manager, "get_metrics", lambda: before_first_error)  # Sketch updated after the read
+    monkeypatch.setitem(service.metrics_managers, service.model_manager.model_name, manager)
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'ml_model_abs_error_count{series="race_series"' not in response.text
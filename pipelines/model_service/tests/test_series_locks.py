@@ -0,0 +1,74 @@
+import threading
+import time
+from series_locks import SeriesLocks
+
+def test_same_series_serialized_other_series_parallel():
+    """Test one series runs one request at a time while another series is not blocked"""
+    locks = SeriesLocks()
+    active, overlaps = [], []
+    release = threading.Event()
+    
+    def worker(series_id):
+        with locks.hold(series_id):
+            active.append(series_id)
+            if active.count(series_id) > 1:
+                overlaps.append(series_id)
+            release.wait(timeout=2)
+            active.remove(series_id)
+    
+    threads = [threading.Thread(target=worker, args=("a",)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    
+    stats = locks.stats()
+    assert stats["series_queue_depth"] == 2
+    assert stats["series_queue_depth_max"] == 3
+    
+    with locks.hold("b"):  # Not blocked by series "a"
+        pass
+    
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert overlaps == []
+    assert locks.stats() == {"series_active": 0, "series_queue_depth": 0, "series_queue_depth_max": 0,
+                             "series_lock_waits_total": 2}
+
+def test_hold_all_waits_for_holders_and_blocks_new_ones():
+    """Test hold_all starts once in-flight series are released and holds off new ones until it exits"""
+    locks = SeriesLocks()
+    events = []
+    release = threading.Event()
+    
+    def holder():
+        with locks.hold("a"):
+            release.wait(timeout=2)
+            events.append("a released")
+    
+    def exclusive():
+        with locks.hold_all():
+            events.append("exclusive")
+            time.sleep(0.05)
+            events.append("exclusive done")
+    
+    def late():
+        with locks.hold("b"):
+            events.append("b")
+    
+    first = threading.Thread(target=holder)
+    first.start()
+    time.sleep(0.02)
+    threads = [threading.Thread(target=exclusive)]
+    threads[0].start()
+    time.sleep(0.02)
+    threads.append(threading.Thread(target=late))
+    threads[1].start()
+    time.sleep(0.02)
+    assert events == []
+    
+    release.set()
+    for thread in [first] + threads:
+        thread.join()
+    assert events == ["a released", "exclusive", "exclusive done", "b"]
+    assert locks.stats()["series_active"] == 0
@@ -0,0 +1,54 @@
+from shadow_evaluator import ShadowEvaluator
+from models.river_models import linear_regression
+
+def test_shadow_learns_per_series_in_background():
+    """Test the worker learns one model per series, stop() drains the queue, and later observations are ignored"""
+    shadow = ShadowEvaluator("linear_regression", linear_regression(), max_series=10)
+    for i in range(4):
+        shadow.observe("a", {"in_1": float(i)}, float(i))
+    shadow.observe("b", {"in_1": 1.0}, 1.0)
+    shadow.stop()
+    
+    assert set(shadow.series_models) == {"a", "b"}
+    assert shadow.metrics_manager.series_counts["a"] == 4
+    info = shadow.get_info()
+    assert info["queue_depth"] == 0
+    assert info["dropped"] == 0
+    
+    shadow.observe("a", {"in_1": 1.0}, 1.0)  # Ignored once stopped
+    assert shadow.metrics_manager.series_counts["a"] == 4
+
+def test_shadow_bounds_series_and_queue():
+    """Test a full queue drops observations and the least recently used series model is evicted"""
+    shadow = ShadowEvaluator("linear_regression", linear_regression(), max_series=2, queue_size=1)
+    shadow.stop()
+    shadow._stopped = False  # Worker gone: the queue fills up instead of draining
+    shadow.observe("a", {"in_1": 1.0}, 1.0)
+    shadow.observe("a", {"in_1": 1.0}, 1.0)
+    assert shadow.dropped >= 1
+    
+    for series_id in ["a", "b", "c"]:
+        shadow._get_model(series_id)
+    assert list(shadow.series_models) == ["b", "c"]
+
+def test_shadow_eviction_drops_series_metrics():
+    """Test a series evicted from the candidate also leaves its metrics, so they stay bounded"""
+    shadow = ShadowEvaluator("linear_regression", linear_regression(), max_series=2)
+    for series_id in ["a", "b", "c"]:
+        shadow.observe(series_id, {"in_1": 1.0}, 1.0)
+    shadow.stop()
+    
+    assert list(shadow.series_models) == ["b", "c"]
+    assert sorted(shadow.metrics_manager.series_ids()) == ["b", "c"]
+
+def test_shadow_join_waits_for_queued_observations_only():
+    """Test join returns once earlier observations are learned, and observe keeps working afterwards"""
+    shadow = ShadowEvaluator("linear_regression", linear_regression(), max_series=10)
+    for i in range(50):
+        shadow.observe("a", {"in_1": float(i)}, float(i))
+    shadow.join()
+    assert shadow.metrics_manager.series_counts["a"] == 50
+    
+    shadow.observe("a", {"in_1": 1.0}, 1.0)
+    shadow.stop()
+    assert shadow.metrics_manager.series_counts["a"] == 51
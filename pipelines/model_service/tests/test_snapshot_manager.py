@@ -0,0 +1,57 @@
+from model_manager import ModelManager
+from metrics_manager import MetricsManager
+from snapshot_manager import SnapshotManager
+
+FEATURES = {"in_1": 135.0, "in_2": 130.0, "in_3": 125.0}
+
+def test_snapshot_disabled_by_default():
+    """Test snapshots are a no-op and the service is ready without SNAPSHOT_DIR"""
+    manager = SnapshotManager(ModelManager(), {"linear_regression": MetricsManager()}, snapshot_dir="")
+    assert manager.ready
+    assert manager.snapshot() == 0
+    assert manager.restore() is False
+
+def test_snapshot_restore_roundtrip(tmp_path):
+    """Test a restored service continues from the snapshotted models and metrics"""
+    models, metrics = ModelManager(), MetricsManager()
+    for target in [140.0, 145.0, 150.0]:
+        metrics.add("series_a", target, models.predict_learn(FEATURES, target, series_id="series_a"))
+    
+    writer = SnapshotManager(models, {"linear_regression": metrics}, snapshot_dir=str(tmp_path))
+    assert writer.snapshot() > 0
+    assert writer.snapshot() == 0  # Unchanged state is not rewritten
+    
+    restored_models, restored_metrics = ModelManager(), MetricsManager()
+    reader = SnapshotManager(restored_models, {"linear_regression": restored_metrics}, snapshot_dir=str(tmp_path))
+    assert not reader.ready
+    assert reader.restore()
+    assert reader.ready
+    assert reader.stats["restored_series"] == 1
+    
+    assert restored_models.predict_many(FEATURES, steps=1, series_id="series_a") == \
+        models.predict_many(FEATURES, steps=1, series_id="series_a")
+    assert restored_metrics.get_metrics()["series_a"]["count"] == 3
+    assert not list(tmp_path.glob(".snapshot-*"))
+
+def test_snapshot_waits_for_series_lock(tmp_path):
+    """Test a series is captured only between updates, never while its lock is held"""
+    import threading
+    from series_locks import SeriesLocks
+    
+    models, metrics, locks = ModelManager(), MetricsManager(), SeriesLocks()
+    metrics.add("series_a", 140.0, models.predict_learn(FEATURES, 140.0, series_id="series_a"))
+    writer = SnapshotManager(models, {"linear_regression": metrics}, snapshot_dir=str(tmp_path), series_locks=locks)
+    
+    done = threading.Event()
+    with locks.hold("series_a"):
+        thread = threading.Thread(target=lambda: (writer.snapshot(force=True), done.set()))
+        thread.start()
+        assert not done.wait(0.2)  # Blocked mid-"learn_one"
+        metrics.add("series_a", 145.0, models.predict_learn(FEATURES, 145.0, series_id="series_a"))
+    thread.join(timeout=5)
+    assert done.is_set()
+    
+    restored_models, restored_metrics = ModelManager(), MetricsManager()
+    reader = SnapshotManager(restored_models, {"linear_regression": restored_metrics}, snapshot_dir=str(tmp_path))
+    assert reader.restore()
+    assert restored_metrics.get_metrics()["series_a"]["count"] == 2
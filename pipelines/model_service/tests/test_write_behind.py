@@ -0,0 +1,87 @@
+import threading
+import time
+import pytest
+from series_locks import SeriesLocks
+from write_behind import WriteBehindLearner, LearnQueueFull
+
+class RecordingModel:
+    def __init__(self, gate=None):
+        self.learned = []
+        self.gate = gate
+    
+    def learn_one(self, features, target):
+        if self.gate is not None:
+            self.gate.wait()
+        self.learned.append(target)
+
+def test_learns_in_order_in_background():
+    """Test queued updates are learned in submission order and join() waits for them"""
+    model = RecordingModel()
+    learner = WriteBehindLearner("model", SeriesLocks(), queue_size=100)
+    for target in range(20):
+        learner.submit("a", model, {"in_1": 1.0}, float(target))
+    learner.join()
+    
+    assert model.learned == [float(target) for target in range(20)]
+    assert learner.stats()["learned_total"] == 20
+    assert learner.stats()["learn_queue_depth"] == 0
+    learner.stop()
+
+def test_drop_oldest_and_reject_when_full():
+    """Test a full queue drops the oldest update or rejects the new one, per policy"""
+    gate = threading.Event()
+    model = RecordingModel(gate)
+    
+    learner = WriteBehindLearner("model", SeriesLocks(), queue_size=2, backpressure="drop_oldest")
+    for target in range(5):
+        learner.submit("a", model, {}, float(target))
+    stats = learner.stats()
+    assert stats["learn_dropped_total"] >= 2
+    assert stats["learn_lag_seconds"] >= 0
+    gate.set()
+    learner.stop()
+    assert model.learned[-2:] == [3.0, 4.0]
+    
+    gate.clear()
+    learner = WriteBehindLearner("model", SeriesLocks(), queue_size=1, backpressure="reject")
+    with pytest.raises(LearnQueueFull):
+        for target in range(3):
+            learner.submit("a", model, {}, float(target))
+    assert learner.stats()["learn_rejected_total"] == 1
+    gate.set()
+    learner.stop()
+
+def test_unknown_backpressure_policy():
+    """Test an unknown backpressure policy is rejected"""
+    with pytest.raises(ValueError):
+        WriteBehindLearner("model", SeriesLocks(), backpressure="spill")
+
+def test_drain_series_learns_its_backlog_in_order():
+    """Test drain_series learns one series' updates, including one the worker popped, without waiting on others"""
+    locks = SeriesLocks()
+    gate = threading.Event()
+    slow, model = RecordingModel(gate), RecordingModel()
+    learner = WriteBehindLearner("model", locks, queue_size=100)
+    
+    learner.submit("b", slow, {}, 0.0)  # The worker blocks learning b
+    learner.submit("b", slow, {}, 1.0)
+    learner.submit("a", model, {}, 1.0)
+    with locks.hold("a"):
+        learner.drain_series("a")
+        assert model.learned == [1.0]
+        assert learner.stats()["learn_queue_depth"] == 2  # b's backlog is left to the worker
+    gate.set()
+    learner.join()
+    
+    with locks.hold("a"):
+        learner.submit("a", model, {}, 2.0)
+        while learner._items:
+            time.sleep(0.001)  # Wait until the worker has popped it and blocks on the lock
+        learner.submit("a", model, {}, 3.0)
+        learner.drain_series("a")
+    learner.join()
+    
+    assert model.learned == [1.0, 2.0, 3.0]  # The popped update is not learned twice
+    assert slow.learned == [0.0, 1.0]
+    assert learner.stats()["learned_total"] == 5
+    learner.stop()
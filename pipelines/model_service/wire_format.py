@@ -0,0 +1,77 @@
+"""
+Wire format negotiation: msgpack or orjson-encoded JSON for requests and responses.
+
+Requests with `Content-Type: application/msgpack` are decoded with msgpack,
+everything else with orjson. Responses are msgpack when the client sends
+`Accept: application/msgpack`, otherwise orjson JSON. Install on an app with:
+
+    app = FastAPI(default_response_class=WireResponse)
+    app.router.route_class = WireFormatRoute
+"""
+
+from contextvars import ContextVar
+from typing import Any, Callable
+
+import msgpack
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Negotiated response format for the request being handled
+_accepts_msgpack: ContextVar[bool] = ContextVar("accepts_msgpack", default=False)
+
+def _is_msgpack(header_value: str) -> bool:
+    return any(media_type in header_value for media_type in MSGPACK_MEDIA_TYPES)
+
+class WireRequest(Request):
+    """Request whose body is decoded with msgpack or orjson instead of the stdlib parser"""
+
+    def __init__(self, scope, receive):
+        headers = dict(scope.get("headers", []))
+        self.msgpack_body = _is_msgpack(headers.get(b"content-type", b"").decode("latin-1"))
+        if self.msgpack_body:
+            # FastAPI only parses JSON content types; decoding happens in json() below
+            scope = dict(scope)
+            scope["headers"] = [
+                (key, b"application/json" if key == b"content-type" else value)
+                for key, value in scope["headers"]
+            ]
+        super().__init__(scope, receive)
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            self._json = msgpack.unpackb(body) if self.msgpack_body else orjson.loads(body)
+        return self._json
+
+class WireResponse(ORJSONResponse):
+    """orjson response that switches to msgpack when the client accepts it"""
+
+    def __init__(self, content: Any = None, *args, **kwargs):
+        if _accepts_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return msgpack.packb(content)
+        return super().render(content)
+
+class WireFormatRoute(APIRoute):
+    """Route class wiring WireRequest decoding and Accept-based response negotiation"""
+
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            token = _accepts_msgpack.set(_is_msgpack(request.headers.get("accept", "")))
+            try:
+                return await original_handler(WireRequest(request.scope, request.receive))
+            finally:
+                _accepts_msgpack.reset(token)
+
+        return handler
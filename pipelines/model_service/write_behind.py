@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+# "sync" learns before responding; "write_behind" responds with the prediction and learns in the background
+LEARN_MODE = os.getenv("LEARN_MODE", "sync")
+LEARN_QUEUE_SIZE = int(os.getenv("LEARN_QUEUE_SIZE", "10000"))
+# What a full learn queue does to new updates: block, drop_oldest or reject
+LEARN_BACKPRESSURE = os.getenv("LEARN_BACKPRESSURE", "block")
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "reject")
+
+class LearnQueueFull(Exception):
+    """Raised by submit() when the learn queue is full under the reject policy"""
+
+class WriteBehindLearner:
+    """Single background learner applying one model's deferred learn_one updates in order.
+
+    Updates are queued FIFO, so each series is learned in request order, and
+    every update is applied under that series' lock so it never interleaves
+    with a prediction on the same model. submit() never blocks, since callers
+    hold the series lock the learner needs. Under the block policy, callers
+    wait for room with wait_for_room() before taking the lock instead, so the
+    queue can overshoot its size by at most the number of concurrent requests.
+    A caller holding a series lock can learn that series' backlog itself with
+    drain_series(), e.g. before a batch that must follow it.
+    """
+
+    def __init__(self, model_name, series_locks, queue_size=LEARN_QUEUE_SIZE, backpressure=LEARN_BACKPRESSURE,
+                 latency=None):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown learn backpressure policy {backpressure}. Available: {list(BACKPRESSURE_POLICIES)}")
+        self.model_name = model_name
+        self.series_locks = series_locks
+        self.latency = latency  # Optional LatencyRecorder for learn_one timings
+        self.queue_size = max(queue_size, 1)
+        self.backpressure = backpressure
+        self.learned = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.errors = 0
+        self._items = deque()
+        self._pending = defaultdict(int)  # Queued or popped-but-unclaimed updates per series
+        self._in_flight = 0
+        self._current = None  # Update popped by the worker but not yet claimed under its series lock
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"learner-{model_name}", daemon=True)
+        self._thread.start()
+
+    def wait_for_room(self):
+        """Block until the queue has room (block policy only); call before taking the series lock"""
+        if self.backpressure != "block":
+            return
+        with self._cond:
+            while len(self._items) >= self.queue_size and not self._stopping:
+                self._cond.wait()
+
+    def submit(self, series_id, model, features, target):
+        """Queue a learn update; raises LearnQueueFull under the reject policy"""
+        with self._cond:
+            if len(self._items) >= self.queue_size:
+                if self.backpressure == "reject":
+                    self.rejected += 1
+                    raise LearnQueueFull(f"Learn queue for {self.model_name} is full ({self.queue_size} updates)")
+                if self.backpressure == "drop_oldest":
+                    self._release(self._items.popleft()[1])
+                    self.dropped += 1
+            self._items.append((time.monotonic(), series_id, model, features, target))
+            self._pending[series_id] += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._items and not self._stopping:
+                    self._cond.wait()
+                if not self._items:
+                    return
+                item = self._current = self._items.popleft()
+                self._in_flight = 1
+                self._cond.notify_all()
+
+            series_id, claimed = item[1], False
+            try:
+                with self.series_locks.hold(series_id):
+                    with self._cond:
+                        # drain_series may have learned it while we waited for the lock
+                        claimed = self._current is item
+                        self._current = None
+                    if claimed:
+                        self._learn(item)
+            finally:
+                with self._cond:
+                    if claimed:
+                        self._release(series_id)
+                    self._in_flight = 0
+                    self._cond.notify_all()
+
+    def _release(self, series_id):
+        """Count one update of series_id as no longer pending; call with self._cond held"""
+        self._pending[series_id] -= 1
+        if not self._pending[series_id]:
+            del self._pending[series_id]
+
+    def _learn(self, item):
+        _, series_id, model, features, target = item
+        try:
+            start = time.perf_counter()
+            model.learn_one(features, target)
+            if self.latency is not None:
+                self.latency.observe(
+                    "ml_model_operation_duration_seconds", time.perf_counter() - start,
+                    model=self.model_name, operation="learn_one"
+                )
+            self.learned += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"LEARN: {self.model_name} failed on series {series_id}: {e}")
+
+    def drain_series(self, series_id):
+        """Learn series_id's pending updates in order on the calling thread; call holding its series lock.
+
+        Other series' backlogs are left to the worker, so this only waits on this series.
+        """
+        with self._cond:
+            if not self._pending.get(series_id):
+                return
+            items = []
+            # Holding the series lock, the worker cannot have claimed a popped update of this series
+            if self._current is not None and self._current[1] == series_id:
+                items.append(self._current)
+                self._current = None
+            items.extend(item for item in self._items if item[1] == series_id)
+            self._items = deque(item for item in self._items if item[1] != series_id)
+            del self._pending[series_id]
+            self._cond.notify_all()  # Frees queue room for wait_for_room()
+        for item in items:
+            self._learn(item)
+
+    def join(self):
+        """Wait until every queued update has been learned"""
+        with self._cond:
+            while self._items or self._in_flight:
+                self._cond.wait()
+
+    def stop(self):
+        """Learn the remaining backlog, then stop the worker"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def stats(self):
+        """Backlog size and lag: age of the oldest update not yet learned"""
+        with self._cond:
+            depth = len(self._items) + self._in_flight
+            oldest = self._items[0][0] if self._items else None
+        return {
+            "learn_queue_depth": depth,
+            "learn_lag_seconds": round(time.monotonic() - oldest, 6) if oldest is not None else 0.0,
+            "learned_total": self.learned,
+            "learn_dropped_total": self.dropped,
+            "learn_rejected_total": self.rejected,
+            "learn_errors_total": self.errors
+        }